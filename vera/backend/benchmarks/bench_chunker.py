@@ -0,0 +1,73 @@
+# chunker benchmark
+
+"""
+Measures chunker throughput on the bundled PDFs. Each document is also chunked at 2x, 4x, ...
+its size (pages repeated) so a super-linear slowdown shows up as falling MB/s.
+Text is extracted once up front; only chunking is timed.
+
+    cd vera/backend
+    python -m benchmarks.bench_chunker
+    python -m benchmarks.bench_chunker --scale 1 16 --chunk-size 250 --unit tokens
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.file_chunker import iter_chunks  # noqa: E402
+from utils.pdf_extract import iter_pdf_pages, shutdown_pool  # noqa: E402
+
+PDF_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "pdfs_")
+
+
+def bench(pages: list[str], repeat: int, **options) -> tuple[float, list]:
+    best, chunks = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(iter_chunks(pages, **options))
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="*", default=sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf"))))
+    parser.add_argument("--scale", nargs="*", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--chunk-overlap", type=int, default=None)
+    parser.add_argument("--unit", choices=("chars", "tokens"), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    options = dict(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, unit=args.unit)
+
+    for path in args.pdf:
+        pages = list(iter_pdf_pages(path))
+        for scale in args.scale:
+            scaled = pages * scale
+            size = sum(len(page) + 1 for page in scaled)
+            elapsed, chunks = bench(scaled, args.repeat, **options)
+            lengths = [len(chunk.text) for chunk in chunks]
+            print(json.dumps({
+                "pdf": os.path.basename(path),
+                "scale": scale,
+                "chars": size,
+                "chunks": len(chunks),
+                "seconds": round(elapsed, 4),
+                "mb_per_s": round(size / elapsed / 1e6, 2) if elapsed else None,
+                "chunks_per_s": round(len(chunks) / elapsed) if elapsed else None,
+                "avg_chunk_chars": round(sum(lengths) / len(lengths)) if lengths else 0,
+                "max_chunk_chars": max(lengths, default=0),
+                "sectioned": round(sum(chunk.section is not None for chunk in chunks) / len(chunks), 3) if chunks else 0,
+            }))
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
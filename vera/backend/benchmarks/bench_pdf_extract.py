@@ -0,0 +1,83 @@
+# pdf extraction benchmark
+
+"""
+Times serial vs multi-process pdfplumber extraction on the bundled PDFs and checks that
+the parallel output is identical to the serial one.
+
+    cd vera/backend
+    python -m benchmarks.bench_pdf_extract                 # all pdfs_/*.pdf, workers 1,2,4,...,cpu
+    python -m benchmarks.bench_pdf_extract --workers 1 8 --pdf ../pdfs_/ipc.pdf
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from utils.pdf_extract import count_pdf_pages, iter_pdf_pages, shutdown_pool  # noqa: E402
+
+PDF_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "pdfs_")
+
+
+def _default_workers() -> list[int]:
+    cpus = os.cpu_count() or 1
+    levels, n = [], 1
+    while n < cpus:
+        levels.append(n)
+        n *= 2
+    return levels + [cpus]
+
+
+def bench(path: str, workers: int, repeat: int) -> tuple[float, list[str]]:
+    best, pages = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = list(iter_pdf_pages(path, workers=workers))
+        best = min(best, time.perf_counter() - start)
+    return best, pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="*", default=sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf"))))
+    parser.add_argument("--workers", nargs="*", type=int, default=_default_workers())
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    results = []
+    for path in args.pdf:
+        total_pages = count_pdf_pages(path)
+        baseline_s, baseline = None, None
+        for workers in args.workers:
+            # warm the pool outside the timed region; spawn start-up is a one-off cost
+            shutdown_pool()
+            if workers > 1:
+                list(iter_pdf_pages(path, workers=workers))
+            elapsed, pages = bench(path, workers, args.repeat)
+            if baseline is None:
+                baseline_s, baseline = elapsed, pages
+            result = {
+                "pdf": os.path.basename(path),
+                "pages": total_pages,
+                "workers": workers,
+                "seconds": round(elapsed, 3),
+                "pages_per_s": round(total_pages / elapsed, 1) if elapsed else None,
+                "speedup": round(baseline_s / elapsed, 2) if elapsed else None,
+                "identical": pages == baseline,
+            }
+            results.append(result)
+            print(json.dumps(result))
+    shutdown_pool()
+
+    if not all(r["identical"] for r in results):
+        sys.exit("parallel extraction output differs from serial output")
+
+
+if __name__ == "__main__":
+    main()
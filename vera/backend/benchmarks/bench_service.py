@@ -0,0 +1,352 @@
+# end-to-end service benchmark
+
+"""
+Ingest throughput and chat latency of the whole app, offline and reproducible.
+
+The app runs under uvicorn on loopback against benchmarks.fake_gemini (a separate process with
+configurable latency/errors) and an in-memory Qdrant, or a local server via --qdrant-url. Each
+PDF is uploaded through POST /api/v1/upload (pages/s, chunks/s), then /chat and /chat/stream are
+driven at each concurrency level (p50/p95/p99 latency, time to first token, requests/s).
+Per-stage means are read back from /metrics. The result is one JSON document; pass a previous
+one with --compare to print the relative change of every headline number.
+
+    cd vera/backend
+    python -m benchmarks.bench_service --output bench.json
+    python -m benchmarks.bench_service --concurrency 1 8 32 --requests 200 --compare bench.json
+    python -m benchmarks.bench_service --pdf ../pdfs_/ipc.pdf --error-rate 0.05 --skip-chat
+    python -m benchmarks.bench_service --qdrant-url http://localhost:6333 --snapshot snapshots/vera_bench
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fake_gemini import (  # noqa: E402
+    FakeGeminiServer,
+    FakeGenerativeModel,
+    add_config_arguments,
+    config_from_args,
+)
+
+PDF_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "pdfs_")
+
+QUESTIONS = (
+    "What is the punishment for murder under the Indian Penal Code?",
+    "Which article of the Constitution guarantees equality before law?",
+    "What does the Information Technology Act say about hacking?",
+    "Define criminal breach of trust.",
+    "What are the fundamental duties of citizens?",
+    "How is theft defined?",
+    "What is the penalty for publishing obscene material in electronic form?",
+    "Who appoints the Governor of a State?",
+    "What is the right of private defence of the body?",
+    "What powers does the President have to grant pardons?",
+    "What is an electronic signature?",
+    "When does an act done by a child not amount to an offence?",
+    "What is the procedure for amending the Constitution?",
+    "What constitutes defamation?",
+    "What are the functions of the Cyber Appellate Tribunal?",
+    "What is the punishment for cheating?",
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", nargs="*", default=sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf"))))
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=64, help="chat requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=4)
+    parser.add_argument("--endpoint", nargs="*", choices=("chat", "stream"), default=["chat", "stream"])
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--skip-chat", action="store_true")
+    parser.add_argument("--qdrant-url", default=None, help="local Qdrant server (default: in-memory)")
+    parser.add_argument(
+        "--snapshot",
+        default=None,
+        help="seed the collection on --qdrant-url from a snapshot directory (tools.snapshot_collection) instead of ingesting --pdf",
+    )
+    parser.add_argument("--embedding-cache", action="store_true", help="keep the embedding cache on")
+    parser.add_argument("--answer-cache", action="store_true", help="keep the semantic answer cache on")
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    parser.add_argument("--compare", default=None, help="earlier result to compare against")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    # the app reads its configuration at import time
+    data_dir = tempfile.mkdtemp(prefix="vera-bench-")
+    os.environ.update(
+        {
+            "GEMINI_API_KEY": "bench",
+            "VERA_DATA_DIR": data_dir,
+            "QDRANT_COLLECTION": "vera_bench",
+            "EMBEDDING_CACHE_ENABLED": str(args.embedding_cache).lower(),
+            "ANSWER_CACHE_ENABLED": str(args.answer_cache).lower(),
+            "TRACE_SAMPLE_RATE": "0",
+        }
+    )
+    if args.qdrant_url:
+        os.environ["QDRANT_URL"] = args.qdrant_url
+
+    with FakeGeminiServer(config_from_args(args)) as gemini:
+        result = asyncio.run(run(args, gemini))
+        result["fake_gemini"] = {"config": vars(gemini.config), "stats": gemini.stats()}
+
+    document = json.dumps(result, indent=2)
+    print(document)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(document + "\n")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+
+
+async def run(args: argparse.Namespace, gemini: FakeGeminiServer) -> dict:
+    import logging
+
+    import httpx
+    import uvicorn
+    from google import genai
+    from google.genai import types
+
+    # upstream failures are expected under --error-rate and counted; keep stdout for the JSON
+    logging.disable(logging.ERROR)
+
+    import core.gemini_client as gemini_client
+    import core.qdrant_client as qdrant
+    import main as app_module
+    from core.config import gemini_model, qdrant_collection
+    from utils.pdf_extract import count_pdf_pages
+
+    gemini_client.embedding_client = genai.Client(
+        api_key="bench", http_options=types.HttpOptions(base_url=gemini.url)
+    )
+    generative_model = FakeGenerativeModel(gemini.url, gemini_model)
+    gemini_client._generative_model = generative_model
+    if not args.qdrant_url:
+        from qdrant_client import AsyncQdrantClient, QdrantClient
+
+        qdrant.client = QdrantClient(location=":memory:")
+        qdrant.async_client = AsyncQdrantClient(location=":memory:")
+
+    result = {"meta": _meta(args), "ingest": [], "chat": [], "stages": {}}
+    if args.snapshot:
+        if not args.qdrant_url:
+            # the in-memory sync and async clients are separate stores: the app wouldn't see the restored points
+            raise SystemExit("--snapshot needs --qdrant-url")
+        from services.collection_snapshots import import_collection
+
+        result["seed"] = import_collection(args.snapshot, qdrant_collection, replace=True)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600, limits=limits) as http:
+            if args.skip_ingest and not args.qdrant_url:
+                raise SystemExit("--skip-ingest needs --qdrant-url with an already populated collection")
+            if not (args.skip_ingest or args.snapshot):
+                for path in args.pdf:
+                    result["ingest"].append(await bench_ingest(http, path, count_pdf_pages(path)))
+            if not args.skip_chat:
+                for endpoint in args.endpoint:
+                    for concurrency in args.concurrency:
+                        result["chat"].append(
+                            await bench_chat(http, endpoint, concurrency, args.requests, args.warmup)
+                        )
+            result["stages"] = _stage_means((await http.get("/metrics")).text)
+            if args.qdrant_url and not args.skip_ingest:
+                await http.delete("/api/v1/collections", params={"collection_id": qdrant_collection})
+    finally:
+        server.should_exit = True
+        await serving
+        await generative_model.aclose()
+    return result
+
+
+async def bench_ingest(http, path: str, pages: int) -> dict:
+    with open(path, "rb") as f:
+        content = f.read()
+    started = time.perf_counter()
+    response = await http.post(
+        "/api/v1/upload",
+        files={"file": (os.path.basename(path), content, "application/pdf")},
+        data={"domain_form": "legal"},
+    )
+    elapsed = time.perf_counter() - started
+    body = response.json()
+    chunks = body.get("total_chunks", 0)
+    return {
+        "pdf": os.path.basename(path),
+        "status": response.status_code,
+        "bytes": len(content),
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 2),
+        "chunks_per_s": round(chunks / elapsed, 2),
+        "timings": body.get("timings"),
+    }
+
+
+async def bench_chat(http, endpoint: str, concurrency: int, requests: int, warmup: int) -> dict:
+    async def one(i: int) -> Optional[tuple[float, Optional[float]]]:
+        question = QUESTIONS[i % len(QUESTIONS)]
+        started = time.perf_counter()
+        first_token = None
+        if endpoint == "chat":
+            response = await http.post("/api/v1/chat", json={"question": question})
+            ok = response.status_code == 200 and "answer" in response.json()
+        else:
+            ok = True
+            async with http.stream("POST", "/api/v1/chat/stream", json={"question": question}) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: token") and first_token is None:
+                        first_token = time.perf_counter() - started
+                    elif line.startswith("event: error"):
+                        ok = False
+            ok = ok and response.status_code == 200
+        return (time.perf_counter() - started, first_token) if ok else None
+
+    for i in range(warmup):
+        await one(i)
+
+    pending = iter(range(requests))
+    samples: list[Optional[tuple[float, Optional[float]]]] = []
+
+    async def worker() -> None:
+        for i in pending:
+            samples.append(await one(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies = [sample[0] for sample in samples if sample]
+    first_tokens = [sample[1] for sample in samples if sample and sample[1] is not None]
+    row = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(sample is None for sample in samples),
+        "requests_per_s": round(requests / wall, 2),
+        "latency_ms": _distribution(latencies),
+    }
+    if endpoint == "stream":
+        row["first_token_ms"] = _distribution(first_tokens)
+    return row
+
+
+def _distribution(seconds: list[float]) -> dict:
+    if not seconds:
+        return {}
+    ms = sorted(s * 1000 for s in seconds)
+    cuts = statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else [ms[0]] * 99
+    return {
+        "mean": round(statistics.fmean(ms), 1),
+        "p50": round(cuts[49], 1),
+        "p95": round(cuts[94], 1),
+        "p99": round(cuts[98], 1),
+        "max": round(ms[-1], 1),
+    }
+
+
+def _stage_means(exposition: str) -> dict:
+    """Mean milliseconds and count per stage, from the vera_stage_duration_seconds histogram."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    sums, counts = {}, {}
+    for family in text_string_to_metric_families(exposition):
+        if family.name != "vera_stage_duration_seconds":
+            continue
+        for sample in family.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                sums[stage] = sample.value
+            elif sample.name.endswith("_count"):
+                counts[stage] = sample.value
+    return {
+        stage: {"count": int(count), "mean_ms": round(sums.get(stage, 0.0) / count * 1000, 2)}
+        for stage, count in sorted(counts.items())
+        if count
+    }
+
+
+def _meta(args: argparse.Namespace) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "qdrant": args.qdrant_url or ":memory:",
+        "snapshot": args.snapshot,
+        "embedding_cache": args.embedding_cache,
+        "answer_cache": args.answer_cache,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _headline(result: dict) -> dict[str, float]:
+    numbers = {}
+    for row in result.get("ingest", []):
+        numbers[f"ingest {row['pdf']} pages/s"] = row["pages_per_s"]
+        numbers[f"ingest {row['pdf']} chunks/s"] = row["chunks_per_s"]
+    for row in result.get("chat", []):
+        name = f"{row['endpoint']} c={row['concurrency']}"
+        numbers[f"{name} req/s"] = row["requests_per_s"]
+        for quantile in ("p50", "p95", "p99"):
+            if quantile in row["latency_ms"]:
+                numbers[f"{name} {quantile} ms"] = row["latency_ms"][quantile]
+        if row.get("first_token_ms"):
+            numbers[f"{name} first token p50 ms"] = row["first_token_ms"]["p50"]
+    return numbers
+
+
+def print_comparison(baseline: dict, current: dict) -> None:
+    """Relative change per headline number; for throughput higher is better, for latency lower."""
+    before, after = _headline(baseline), _headline(current)
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):", file=sys.stderr)
+    for name, value in after.items():
+        if name not in before or not before[name]:
+            continue
+        change = (value - before[name]) / before[name] * 100
+        better = change > 0 if name.endswith("/s") else change < 0
+        marker = "" if abs(change) < 5 else ("  better" if better else "  WORSE")
+        print(f"  {name:<48} {before[name]:>10} -> {value:>10}  {change:+6.1f}%{marker}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
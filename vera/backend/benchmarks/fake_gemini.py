@@ -0,0 +1,313 @@
+# deterministic fake gemini server
+
+"""
+A local stand-in for the Gemini API so benchmarks run offline and repeatably.
+
+Embeddings are served over the same REST routes google-genai calls (`:batchEmbedContents`,
+`:embedContent`, model metadata), so the real SDK, retries and batching are exercised. Vectors
+are feature-hashed bags of words: deterministic, unit length, and similar for similar text.
+Generation is served at `:generateContent` / `:streamGenerateContent` (SSE); google.generativeai
+has no async REST transport, so the app is given a `FakeGenerativeModel` that calls these routes.
+
+Latency and failures are configurable, and a requests-per-minute quota can be enforced the way the
+real API does (429 RESOURCE_EXHAUSTED with a Retry-After header and a RetryInfo detail). A failure is decided from a hash of the request body and
+how many times that body has been seen, so the same workload fails the same way on every run.
+The server runs in its own process so its CPU work does not compete with the app for the GIL.
+
+    cd vera/backend
+    python -m benchmarks.fake_gemini --port 8089 --embed-latency-ms 80 --error-rate 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Optional
+
+import httpx
+import numpy as np
+
+DEFAULT_DIMENSIONS = 3072
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class FakeGeminiConfig:
+    embed_latency_ms: float = 60.0  # per request
+    embed_item_ms: float = 0.5  # per text in a batch
+    first_token_ms: float = 250.0  # generation: time to the first token
+    token_ms: float = 15.0  # generation: time between tokens
+    answer_tokens: int = 60
+    error_rate: float = 0.0  # share of requests answered with 503
+    quota_rpm: float = 0.0  # POST requests per rolling minute before answering 429 (0 = no quota)
+    seed: int = 0
+
+
+def embed_text(text: str, dimensions: int = DEFAULT_DIMENSIONS) -> list[float]:
+    """Feature-hashed bag of words, L2-normalised."""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in _WORD.findall(text.lower()):
+        h = zlib.crc32(word.encode("utf-8"))
+        vector[h % dimensions] += 1.0 if h & 0x80000000 else -1.0
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        vector[0], norm = 1.0, 1.0
+    return np.round(vector / norm, 6).tolist()
+
+
+def answer_words(prompt: str, count: int) -> list[str]:
+    words = _WORD.findall(prompt.rsplit("Question:", 1)[-1]) or ["answer"]
+    return [f"{words[i % len(words)]} " for i in range(count)]
+
+
+class _FakeGemini(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeGeminiConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.seen: dict[str, int] = {}
+        self.admitted: deque[float] = deque()
+        self.stats = {
+            "embed_requests": 0, "embed_texts": 0, "generate_requests": 0, "stream_requests": 0,
+            "errors": 0, "throttled": 0,
+        }
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+    def throttle(self) -> Optional[float]:
+        """Seconds until the rolling window admits another request, or None if this one is admitted."""
+        if self.config.quota_rpm <= 0:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            while self.admitted and now - self.admitted[0] >= 60.0:
+                self.admitted.popleft()
+            if len(self.admitted) < self.config.quota_rpm:
+                self.admitted.append(now)
+                return None
+            self.stats["throttled"] += 1
+            return 60.0 - (now - self.admitted[0])
+
+    def should_fail(self, body: bytes) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            attempt = self.seen.get(digest, 0)
+            self.seen[digest] = attempt + 1
+        roll = zlib.crc32(f"{self.config.seed}:{digest}:{attempt}".encode()) / 0xFFFFFFFF
+        if roll < self.config.error_rate:
+            self.count("errors")
+            return True
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _FakeGemini
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/_stats"):
+            with self.server.lock:
+                self._json(200, dict(self.server.stats))
+        else:
+            # model metadata, used by the readiness probe
+            self._json(200, {"name": self.path.rsplit("/", 1)[-1].split("?")[0]})
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        config = self.server.config
+        wait = self.server.throttle()
+        if wait is not None:
+            retry_info = {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{wait:.0f}s"}
+            self._json(
+                429,
+                {"error": {"code": 429, "message": "quota exceeded", "status": "RESOURCE_EXHAUSTED", "details": [retry_info]}},
+                headers={"retry-after": f"{max(1, round(wait))}"},
+            )
+            return
+        if self.server.should_fail(body):
+            time.sleep(config.embed_latency_ms / 1000)
+            self._json(503, {"error": {"code": 503, "message": "fake overload", "status": "UNAVAILABLE"}})
+            return
+        request = json.loads(body or b"{}")
+        path = self.path.split("?")[0]
+
+        if path.endswith(":batchEmbedContents") or path.endswith(":embedContent"):
+            items = request.get("requests") or [request]
+            self.server.count("embed_requests")
+            self.server.count("embed_texts", len(items))
+            time.sleep((config.embed_latency_ms + config.embed_item_ms * len(items)) / 1000)
+            embeddings = [
+                {"values": embed_text(_text(item), item.get("outputDimensionality") or DEFAULT_DIMENSIONS)}
+                for item in items
+            ]
+            self._json(200, {"embeddings": embeddings} if "requests" in request else {"embedding": embeddings[0]})
+        elif path.endswith(":streamGenerateContent"):
+            self.server.count("stream_requests")
+            self._stream(answer_words(_text(request["contents"][-1]), config.answer_tokens))
+        elif path.endswith(":generateContent"):
+            self.server.count("generate_requests")
+            words = answer_words(_text(request["contents"][-1]), config.answer_tokens)
+            time.sleep((config.first_token_ms + config.token_ms * (len(words) - 1)) / 1000)
+            self._json(200, _candidate("".join(words)))
+        else:
+            self._json(404, {"error": {"code": 404, "message": f"unknown route {path}", "status": "NOT_FOUND"}})
+
+    def _stream(self, words: list[str]) -> None:
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        time.sleep(self.server.config.first_token_ms / 1000)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.config.token_ms / 1000)
+            event = f"data: {json.dumps(_candidate(word))}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _json(self, status: int, payload: dict, headers: Optional[dict] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _text(content: dict) -> str:
+    content = content.get("content", content)
+    return " ".join(part.get("text", "") for part in content.get("parts", []))
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+def serve(port: int, config: FakeGeminiConfig, ready=None) -> None:
+    server = _FakeGemini(("127.0.0.1", port), config)
+    if ready is not None:
+        ready.send(server.server_port)
+    server.serve_forever()
+
+
+class FakeGeminiServer:
+    """Runs the fake server in a child process: `with FakeGeminiServer(config) as server: server.url`."""
+
+    def __init__(self, config: Optional[FakeGeminiConfig] = None, port: int = 0):
+        self.config = config or FakeGeminiConfig()
+        self.port = port
+        self.url = ""
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> "FakeGeminiServer":
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(target=serve, args=(self.port, self.config, sender), daemon=True)
+        self._process.start()
+        if not receiver.poll(30):
+            self._process.terminate()
+            raise RuntimeError("fake gemini server did not start")
+        self.url = f"http://127.0.0.1:{receiver.recv()}"
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(5)
+
+    def stats(self) -> dict:
+        return httpx.get(f"{self.url}/_stats").json()
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """The slice of google.generativeai.GenerativeModel used by core.gemini_client, over HTTP."""
+
+    def __init__(self, base_url: str, model_name: str):
+        self._url = f"{base_url}/v1beta/models/{model_name}"
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _async_client(self) -> httpx.AsyncClient:
+        # created lazily so it binds to the event loop that serves the app
+        if self._client is None:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+            self._client = httpx.AsyncClient(timeout=120, limits=limits)
+        return self._client
+
+    def generate_content(self, prompt: str) -> _Response:
+        response = httpx.post(f"{self._url}:generateContent", json=_request(prompt), timeout=120)
+        response.raise_for_status()
+        return _Response(_text(response.json()["candidates"][0]))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            return self._stream(prompt)
+        response = await self._async_client().post(f"{self._url}:generateContent", json=_request(prompt))
+        response.raise_for_status()
+        return _Response(_text(response.json()["candidates"][0]))
+
+    async def _stream(self, prompt: str) -> AsyncIterator[_Response]:
+        async with self._async_client().stream(
+            "POST", f"{self._url}:streamGenerateContent", params={"alt": "sse"}, json=_request(prompt)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    yield _Response(_text(json.loads(line[6:])["candidates"][0]))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _request(prompt: str) -> dict:
+    return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    print(f"fake gemini listening on http://127.0.0.1:{args.port}")
+    serve(args.port, config_from_args(args))
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeGeminiConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeGeminiConfig:
+    return FakeGeminiConfig(**{name: getattr(args, name) for name in asdict(FakeGeminiConfig())})
+
+
+if __name__ == "__main__":
+    main()
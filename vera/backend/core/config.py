@@ -8,10 +8,146 @@ qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
 qdrant_api_key = os.getenv("QDRANT_API_KEY")
 qdrant_collection = os.getenv("QDRANT_COLLECTION", "vera_docs")
 
-# Gemini embedding returns 3072-dim vectors by default. Keep this constant to ensure collection compatibility.
-QDRANT_VECTOR_SIZE = 3072
+# Embedding provider the configured collection is built with: gemini (API) | local (hashed n-grams on the CPU,
+# no network or API key). Each collection records its provider, model and dimension in its qdrant metadata.
+embedding_provider = os.getenv("EMBEDDING_PROVIDER", "gemini").lower()
+
+# Gemini embedding returns 3072-dim vectors by default; 1536 and 768 are Matryoshka truncations of the same
+# vector. Changing this on an existing collection requires `python -m tools.migrate_collection`.
+# The local provider accepts any dimension (768 is plenty for it).
+SUPPORTED_VECTOR_SIZES = (768, 1536, 3072)
+QDRANT_VECTOR_SIZE = int(os.getenv("EMBEDDING_DIMENSIONS", "3072"))
+if embedding_provider == "gemini" and QDRANT_VECTOR_SIZE not in SUPPORTED_VECTOR_SIZES:
+    raise RuntimeError(f"EMBEDDING_DIMENSIONS must be one of {SUPPORTED_VECTOR_SIZES}, got {QDRANT_VECTOR_SIZE}")
+if QDRANT_VECTOR_SIZE <= 0:
+    raise RuntimeError(f"EMBEDDING_DIMENSIONS must be positive, got {QDRANT_VECTOR_SIZE}")
+
+# Vector storage layout: none | scalar (int8, 4x smaller) | binary (32x smaller). Quantized vectors stay in RAM,
+# originals go to disk and are only read to rescore the oversampled candidates.
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+qdrant_quantization = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+if qdrant_quantization not in QUANTIZATION_MODES:
+    raise RuntimeError(f"QDRANT_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {qdrant_quantization!r}")
+qdrant_vectors_on_disk = os.getenv("QDRANT_VECTORS_ON_DISK", "true" if qdrant_quantization != "none" else "false").lower() in ("1", "true", "yes")
+qdrant_search_oversampling = float(os.getenv("QDRANT_SEARCH_OVERSAMPLING", "2.0"))
+qdrant_search_rescore = os.getenv("QDRANT_SEARCH_RESCORE", "true").lower() in ("1", "true", "yes")
+
+# Collection schema is validated at start-up and then re-checked at most this often on the request path.
+collection_state_ttl_seconds = float(os.getenv("COLLECTION_STATE_TTL_SECONDS", "300"))
 
 gemini_api_key = os.getenv("GEMINI_API_KEY")
 gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
 gemini_embedding_model = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
 
+
+# Content-addressed embedding cache (sqlite on disk). Re-ingesting an amended document only pays for changed chunks.
+DATA_DIR = os.getenv("VERA_DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "data"))
+embedding_cache_enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "embedding_cache.sqlite3"))
+embedding_cache_max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Semantic answer cache for /chat. Near-duplicate questions (cosine >= threshold) reuse the cached answer when their
+# search retrieved the same top ANSWER_CACHE_MATCH_TOP_N points (0: all retrieved points must match).
+answer_cache_enabled = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+answer_cache_similarity_threshold = float(os.getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.95"))
+answer_cache_max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+answer_cache_ttl_seconds = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+answer_cache_match_top_n = int(os.getenv("ANSWER_CACHE_MATCH_TOP_N", "3"))
+
+# Chat sessions: the last SESSION_HISTORY_TURNS turns are kept verbatim (within SESSION_HISTORY_TOKENS), older ones
+# are folded into a rolling summary of SESSION_SUMMARY_TOKENS. Up to SESSION_MAX_CHUNKS retrieved chunks are cached per
+# session; a follow-up within SESSION_REUSE_SIMILARITY (cosine) of the previous turn reuses them without a search.
+# Sessions idle for SESSION_TTL_SECONDS are dropped; beyond SESSION_MAX_SESSIONS the least recently used go first.
+session_ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+session_max_sessions = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+session_history_turns = int(os.getenv("SESSION_HISTORY_TURNS", "4"))
+session_history_tokens = int(os.getenv("SESSION_HISTORY_TOKENS", "1000"))
+session_summary_tokens = int(os.getenv("SESSION_SUMMARY_TOKENS", "300"))
+session_max_chunks = int(os.getenv("SESSION_MAX_CHUNKS", "30"))
+session_reuse_similarity = float(os.getenv("SESSION_REUSE_SIMILARITY", "0.9"))
+
+# Query embeddings of concurrent requests are coalesced: a batch is sent QUERY_EMBED_BATCH_WAIT_MS after its first
+# question, or as soon as it holds QUERY_EMBED_BATCH_MAX texts (0 ms disables batching).
+query_embed_batch_wait_ms = float(os.getenv("QUERY_EMBED_BATCH_WAIT_MS", "5"))
+query_embed_batch_max = int(os.getenv("QUERY_EMBED_BATCH_MAX", "100"))
+
+# Concurrency limits per upstream for the async request path.
+gemini_embed_concurrency = int(os.getenv("GEMINI_EMBED_CONCURRENCY", "4"))
+gemini_generate_concurrency = int(os.getenv("GEMINI_GENERATE_CONCURRENCY", "8"))
+
+# Client-side Gemini quotas per process (0 = unlimited): calls are spaced to stay under requests/min and tokens/min.
+# Whatever the quotas, a 429 pauses every caller for the server's retry-after hint.
+gemini_embed_rpm = float(os.getenv("GEMINI_EMBED_RPM", "0"))
+gemini_embed_tpm = float(os.getenv("GEMINI_EMBED_TPM", "0"))
+gemini_generate_rpm = float(os.getenv("GEMINI_GENERATE_RPM", "0"))
+gemini_generate_tpm = float(os.getenv("GEMINI_GENERATE_TPM", "0"))
+# Retries back off exponentially with jitter, capped at GEMINI_BACKOFF_MAX_SECONDS; retry-after hints take precedence.
+gemini_backoff_max_seconds = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60"))
+gemini_generate_retries = int(os.getenv("GEMINI_GENERATE_RETRIES", "3"))
+# Estimated tokens per embedding request; batches also shrink on their own when the API rejects them as too large.
+gemini_embed_batch_tokens = int(os.getenv("GEMINI_EMBED_BATCH_TOKENS", "20000"))
+qdrant_concurrency = int(os.getenv("QDRANT_CONCURRENCY", "16"))
+
+# Ingest pipeline: embedding batches in flight at once per ingest (upserts overlap with the next embeddings).
+ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "50"))
+ingest_pipeline_depth = int(os.getenv("INGEST_PIPELINE_DEPTH", "4"))
+
+# Streaming ingest: extract page by page and embed batches as they fill (flat memory for large PDFs).
+ingest_streaming = os.getenv("INGEST_STREAMING", "true").lower() in ("1", "true", "yes")
+upload_spool_chunk_bytes = int(os.getenv("UPLOAD_SPOOL_CHUNK_BYTES", str(1024 * 1024)))
+
+# Chunking budget, in characters or approximate tokens (CHUNK_SIZE_UNIT=chars|tokens).
+chunk_size = int(os.getenv("CHUNK_SIZE", "1000"))
+chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "150"))
+chunk_size_unit = os.getenv("CHUNK_SIZE_UNIT", "chars").lower()
+
+# Multi-process PDF extraction. 0 workers = one per CPU; documents with <= pages-per-task pages are read in-process.
+pdf_extract_workers = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+pdf_extract_pages_per_task = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "16"))
+
+# Background ingest jobs: worker pool size and persistent job state. A process holds a lease on each job it runs;
+# jobs whose lease lapses for INGEST_JOB_LEASE_SECONDS (their process died) are resumed by another process.
+ingest_job_workers = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+ingest_job_lease_seconds = float(os.getenv("INGEST_JOB_LEASE_SECONDS", "60"))
+ingest_job_db_path = os.getenv("INGEST_JOB_DB_PATH", os.path.join(DATA_DIR, "ingest_jobs.sqlite3"))
+
+# Per-source manifest of deterministic point ids; re-ingests only embed/upsert/delete the chunks that changed.
+ingest_manifest_path = os.getenv("INGEST_MANIFEST_PATH", os.path.join(DATA_DIR, "ingest_manifest.sqlite3"))
+
+# Registry of indexed documents (one row per collection + source), served by GET /docs.
+document_registry_path = os.getenv("DOCUMENT_REGISTRY_PATH", os.path.join(DATA_DIR, "documents.sqlite3"))
+
+# Collection snapshots (vectors.npy + columnar payload sidecar) are written to and restored from SNAPSHOT_DIR; restores
+# bulk-load SNAPSHOT_UPLOAD_BATCH_SIZE points per request over SNAPSHOT_UPLOAD_PARALLEL processes.
+snapshot_dir = os.getenv("SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+snapshot_upload_batch_size = int(os.getenv("SNAPSHOT_UPLOAD_BATCH_SIZE", "256"))
+snapshot_upload_parallel = int(os.getenv("SNAPSHOT_UPLOAD_PARALLEL", "4"))
+
+# Hybrid retrieval: dense + sparse BM25 legs searched concurrently and merged with weighted reciprocal-rank fusion.
+hybrid_search_enabled = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() in ("1", "true", "yes")
+hybrid_dense_top_k = int(os.getenv("HYBRID_DENSE_TOP_K", "10"))
+hybrid_sparse_top_k = int(os.getenv("HYBRID_SPARSE_TOP_K", "10"))
+hybrid_dense_weight = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+hybrid_sparse_weight = float(os.getenv("HYBRID_SPARSE_WEIGHT", "1.0"))
+hybrid_rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# Context assembly: RETRIEVAL_TOP_K passages are chosen by MMR among CONTEXT_CANDIDATES hits (lambda 1.0 ranks by
+# relevance only and skips fetching vectors), neighbouring chunks are de-overlapped and merged, and the result is
+# packed into CONTEXT_TOKEN_BUDGET approximate tokens.
+retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+context_candidates = int(os.getenv("CONTEXT_CANDIDATES", "10"))
+context_mmr_lambda = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+context_token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Fan-out retrieval: a question may name several collections. They are searched concurrently; one that hasn't answered
+# within FANOUT_TIMEOUT_SECONDS is left out of that answer.
+fanout_timeout_seconds = float(os.getenv("FANOUT_TIMEOUT_SECONDS", "2.0"))
+fanout_max_collections = int(os.getenv("FANOUT_MAX_COLLECTIONS", "8"))
+
+# POST /chat/batch: questions per request, generations in flight per batch, and searches per Qdrant batch call.
+chat_batch_max_questions = int(os.getenv("CHAT_BATCH_MAX_QUESTIONS", "1000"))
+chat_batch_concurrency = int(os.getenv("CHAT_BATCH_CONCURRENCY", "4"))
+chat_batch_search_size = int(os.getenv("CHAT_BATCH_SEARCH_SIZE", "64"))
+
+# Fraction of instrumented stage executions that also log a one-line trace (0 disables tracing).
+trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
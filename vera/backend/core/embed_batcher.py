@@ -0,0 +1,110 @@
+# query embedding micro-batcher
+
+"""
+Coalesces the question embeddings of concurrent requests into shared provider calls.
+
+Each /chat embeds a single question; under load that is hundreds of one-text requests per second,
+and the provider's request-rate quota runs out long before its token quota. Requests for the same
+(provider, dimensions, task_type) that arrive within QUERY_EMBED_BATCH_WAIT_MS of the first one
+are sent as one call of up to QUERY_EMBED_BATCH_MAX texts (sent at once when full), and each caller
+gets its own vectors back. Identical questions in a batch are embedded once.
+
+Only network-bound embedders are batched; local ones answer faster than the wait would cost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.config import query_embed_batch_max, query_embed_batch_wait_ms
+from core.embedders import Embedder
+from core.logger import get_logger
+from core.metrics import QUERY_EMBED_BATCH_SIZE
+
+logger = get_logger("vera.embed_batcher")
+
+
+@dataclass
+class _Batch:
+    embedder: Embedder
+    dimensions: int
+    task_type: Optional[str]
+    # (texts, future of their vectors) per waiting caller
+    waiters: list[tuple[list[str], asyncio.Future]] = field(default_factory=list)
+    size: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class EmbedBatcher:
+    def __init__(self, max_wait_ms: float, max_items: int):
+        self.max_wait = max_wait_ms / 1000
+        self.max_items = max(1, max_items)
+        self._open: dict[tuple, _Batch] = {}
+        # flushes in flight; referenced so they aren't garbage-collected mid-call
+        self._flushes: set[asyncio.Task] = set()
+
+    async def embed(
+        self,
+        embedder: Embedder,
+        texts: list[str],
+        *,
+        dimensions: int,
+        task_type: Optional[str] = None,
+    ) -> list[list[float]]:
+        """Embed `texts`, sharing a provider call with concurrent callers where possible."""
+        if self.max_wait <= 0 or not embedder.remote or len(texts) >= self.max_items:
+            # nothing to gain: batching disabled, a local embedder, or the request fills a batch on its own
+            return await embedder.embed(texts, dimensions=dimensions, task_type=task_type)
+
+        key = (embedder.name, dimensions, task_type)
+        batch = self._open.get(key)
+        if batch is not None and batch.size + len(texts) > self.max_items:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = self._open[key] = _Batch(embedder, dimensions, task_type)
+            batch.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+
+        future = asyncio.get_running_loop().create_future()
+        batch.waiters.append((texts, future))
+        batch.size += len(texts)
+        if batch.size >= self.max_items:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple) -> None:
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _send(self, batch: _Batch) -> None:
+        waiters = [(texts, future) for texts, future in batch.waiters if not future.done()]
+        if not waiters:
+            return
+        unique = list(dict.fromkeys(text for texts, _ in waiters for text in texts))
+        QUERY_EMBED_BATCH_SIZE.observe(len(unique))
+        try:
+            vectors = await batch.embedder.embed(unique, dimensions=batch.dimensions, task_type=batch.task_type)
+            if len(vectors) != len(unique):
+                raise RuntimeError(f"embedder returned {len(vectors)} vectors for {len(unique)} texts")
+        except Exception as exc:
+            logger.warning("Batched query embedding of %s texts failed: %s", len(unique), exc)
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        by_text = dict(zip(unique, vectors))
+        for texts, future in waiters:
+            # a caller that gave up (client disconnected) has a cancelled future
+            if not future.done():
+                future.set_result([by_text[text] for text in texts])
+
+
+query_batcher = EmbedBatcher(query_embed_batch_wait_ms, query_embed_batch_max)
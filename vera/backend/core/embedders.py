@@ -0,0 +1,139 @@
+# embedding providers
+
+"""
+Pluggable text -> vector providers. EMBEDDING_PROVIDER picks the one the configured collection is
+built with; every collection records the provider, model and dimension it was built with in its
+qdrant metadata (an EmbeddingSpec), so questions against it are always embedded the same way.
+
+- gemini: the Gemini embedding API, batched, retried and cached (core.gemini_client)
+- local:  hashed character n-grams on the CPU (utils.ngram_embedding); no network, no API key
+
+Further providers subclass Embedder and register with @register_provider("name").
+"""
+
+from __future__ import annotations
+
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+from core.config import QDRANT_VECTOR_SIZE, embedding_provider, gemini_embedding_model
+from core.logger import get_logger
+
+logger = get_logger("vera.embedders")
+
+# batchEmbedContents accepts at most 100 texts per call
+EMBED_BATCH_LIMIT = 100
+
+# collections created before providers were recorded were all embedded by gemini
+LEGACY_PROVIDER = "gemini"
+
+
+@dataclass(frozen=True)
+class EmbeddingSpec:
+    """How a collection's vectors were produced; stored under "embedding" in the collection metadata."""
+
+    provider: str
+    model: str
+    dimensions: int
+
+    def as_metadata(self) -> dict:
+        return {"embedding": {"provider": self.provider, "model": self.model, "dimensions": self.dimensions}}
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[dict]) -> Optional["EmbeddingSpec"]:
+        recorded = (metadata or {}).get("embedding")
+        if not recorded:
+            return None
+        return cls(recorded["provider"], recorded["model"], int(recorded["dimensions"]))
+
+
+class Embedder(ABC):
+    """One embedding provider. `embed` returns one vector of `dimensions` floats per text."""
+
+    name: str = ""
+    model: str = ""
+    # calls go over the network, so concurrent queries are worth coalescing (core.embed_batcher)
+    remote: bool = False
+
+    @abstractmethod
+    async def embed(self, texts: list[str], *, dimensions: int, task_type: Optional[str] = None) -> list[list[float]]:
+        """Embed `texts`; `task_type` is a hint that providers without task-specific models ignore."""
+
+    async def warm(self) -> None:
+        """Open connections / load models ahead of the first request (readiness probe)."""
+
+
+_providers: dict[str, type[Embedder]] = {}
+_instances: dict[str, Embedder] = {}
+
+
+def register_provider(name: str):
+    def register(cls: type[Embedder]) -> type[Embedder]:
+        cls.name = name
+        _providers[name] = cls
+        return cls
+    return register
+
+
+def get_embedder(provider: Optional[str] = None) -> Embedder:
+    """The (shared) embedder of `provider`, EMBEDDING_PROVIDER by default."""
+    provider = provider or embedding_provider
+    if provider not in _instances:
+        if provider not in _providers:
+            raise LookupError(f"Unknown embedding provider {provider!r}; registered: {sorted(_providers)}")
+        _instances[provider] = _providers[provider]()
+    return _instances[provider]
+
+
+def configured_spec() -> EmbeddingSpec:
+    """What the configured collection must have been built with."""
+    return EmbeddingSpec(embedding_provider, get_embedder().model, QDRANT_VECTOR_SIZE)
+
+
+def legacy_spec(dimensions: int) -> EmbeddingSpec:
+    return EmbeddingSpec(LEGACY_PROVIDER, gemini_embedding_model, dimensions)
+
+
+@register_provider("gemini")
+class GeminiEmbedder(Embedder):
+    model = gemini_embedding_model
+    remote = True
+
+    async def embed(self, texts: list[str], *, dimensions: int, task_type: Optional[str] = None) -> list[list[float]]:
+        # imported on use so the local provider works without the gemini SDKs configured
+        from core.gemini_client import embed_chunks_batched_async
+
+        return await embed_chunks_batched_async(
+            texts,
+            batch_size=EMBED_BATCH_LIMIT,
+            task_type=task_type,
+            output_dimensionality=dimensions,
+        )
+
+    async def warm(self) -> None:
+        from core.gemini_client import warm_gemini
+
+        await warm_gemini()
+
+
+# below this many characters a batch is encoded inline; a thread hop would cost more than the work
+_LOCAL_INLINE_CHARS = 20_000
+
+
+@register_provider("local")
+class LocalEmbedder(Embedder):
+    """Symmetric lexical embedder: task_type is ignored, questions and chunks are encoded alike."""
+
+    def __init__(self):
+        from utils.ngram_embedding import NGRAM_MODEL
+
+        self.model = NGRAM_MODEL
+
+    async def embed(self, texts: list[str], *, dimensions: int, task_type: Optional[str] = None) -> list[list[float]]:
+        from utils.ngram_embedding import encode
+
+        if sum(len(text) for text in texts) <= _LOCAL_INLINE_CHARS:
+            return encode(texts, dimensions).tolist()
+        return (await asyncio.to_thread(encode, texts, dimensions)).tolist()
@@ -0,0 +1,160 @@
+# persistent embedding cache
+
+"""
+Content-addressed cache sitting in front of the embedding API.
+Keys are a hash of (model, task_type, output_dimensionality, text), values are float32 vectors
+stored in sqlite so they survive restarts. Size is bounded and the least recently used rows are evicted.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Optional
+
+from core.config import (
+    embedding_cache_enabled,
+    embedding_cache_max_entries,
+    embedding_cache_path,
+)
+from core.logger import get_logger
+
+logger = get_logger("vera.embedding_cache")
+
+# sqlite caps bound parameters per statement; stay well below the limit
+_SQL_CHUNK = 500
+
+
+def cache_key(text: str, *, model: str, task_type: Optional[str], output_dimensionality: Optional[int]) -> str:
+    """Stable key for one embedding request."""
+    h = hashlib.sha256()
+    # labelled so vectors cached before task_type was sent to the API (embedded without it) aren't served
+    task = f"task_type={task_type}" if task_type else ""
+    for part in (model, task, str(output_dimensionality or "")):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """Bounded LRU embedding store backed by sqlite. Safe to share between threads."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return the cached vectors for the given keys and bump their recency."""
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), _SQL_CHUNK):
+                part = unique[start:start + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part
+                ).fetchall()
+                for key, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[key] = vec.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors, evicting the least recently used rows when over capacity."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, len(vec), array("f", vec).tobytes(), now) for key, vec in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._size += self._conn.total_changes - before
+
+                overflow = self._size - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._size -= overflow
+                    self.evictions += overflow
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide cache, or None if disabled / unavailable."""
+    global _cache, _cache_failed
+    if not embedding_cache_enabled or _cache_failed:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = EmbeddingCache(embedding_cache_path, embedding_cache_max_entries)
+                    logger.info("Embedding cache opened at %s (%s entries)", embedding_cache_path, _cache._size)
+                except sqlite3.Error as exc:
+                    # a broken cache must never take down embedding itself
+                    logger.error("Embedding cache unavailable, continuing without it: %s", exc)
+                    _cache_failed = True
+                    return None
+    return _cache
@@ -1,10 +1,36 @@
 # gemini client
 
-from typing import Any
+import asyncio
+from typing import Any, AsyncIterator, Optional
 import google.generativeai as genai
-from core.config import gemini_api_key, gemini_model, gemini_embedding_model
+from core.config import (
+    gemini_api_key,
+    gemini_backoff_max_seconds,
+    gemini_embed_batch_tokens,
+    gemini_embed_concurrency,
+    gemini_embed_rpm,
+    gemini_embed_tpm,
+    gemini_embedding_model,
+    gemini_generate_concurrency,
+    gemini_generate_retries,
+    gemini_generate_rpm,
+    gemini_generate_tpm,
+    gemini_model,
+)
 import time
+from core.embedding_cache import EmbeddingCache, cache_key, get_embedding_cache
 from core.logger import get_logger
+from core.metrics import CACHE_LOOKUPS, EMBEDDING_CHUNKS, EMBEDDING_RETRIES, EMBEDDING_SPLITS, observe, track
+from core.rate_limit import (
+    AdaptiveBatchSize,
+    RateLimiter,
+    backoff_delay,
+    is_oversize,
+    is_retryable,
+    retry_after,
+    status_code,
+)
+from utils.file_chunker import CHARS_PER_TOKEN
 
 logger = get_logger("vera.gemini_client")
 
@@ -15,20 +41,83 @@ class GenerationError(RuntimeError):
     pass
 
 
-# SDK configuration
-if not gemini_api_key:
-    raise RuntimeError("GEMINI_API_KEY is not set in environment variables")
-
 # Use new Client-based API for embeddings
 try:
     from google import genai as genai_new
-    embedding_client = genai_new.Client(api_key=gemini_api_key)
+    from google.genai import types as genai_types
 except (ImportError, AttributeError) as e:
     logger.error(f"Failed to import new genai client: {e}. Please ensure 'google-genai' package is installed.")
     raise RuntimeError(f"Failed to initialize embedding client: {e}")
 
-# Keep old API for generation
-genai.configure(api_key=gemini_api_key)
+# SDK clients are built by init_gemini() (app lifespan), or on first use outside the app
+embedding_client: Optional["genai_new.Client"] = None
+_generative_model: Optional[genai.GenerativeModel] = None
+
+
+def init_gemini() -> None:
+    """
+    Configure the SDKs: the Client-based API for embeddings, the old API for generation.
+    Without GEMINI_API_KEY nothing is configured and the service still starts (e.g. with the local
+    embedder); gemini calls then fail with EmbeddingError / GenerationError.
+    """
+    global embedding_client, _generative_model
+    if not gemini_api_key:
+        logger.warning("GEMINI_API_KEY is not set; gemini embeddings and generation are unavailable")
+        return
+    if embedding_client is None:
+        embedding_client = genai_new.Client(api_key=gemini_api_key)
+    if _generative_model is None:
+        genai.configure(api_key=gemini_api_key)
+        _generative_model = genai.GenerativeModel(gemini_model)
+
+
+def get_embedding_client() -> "genai_new.Client":
+    if embedding_client is None:
+        if not gemini_api_key:
+            raise EmbeddingError("GEMINI_API_KEY is not set in environment variables")
+        init_gemini()
+    return embedding_client
+
+
+def get_generative_model() -> genai.GenerativeModel:
+    if _generative_model is None:
+        if not gemini_api_key:
+            raise GenerationError("GEMINI_API_KEY is not set in environment variables")
+        init_gemini()
+    return _generative_model
+
+
+async def warm_gemini() -> None:
+    """Open the HTTP connection with a metadata call (no tokens billed); used by the readiness probe."""
+    await get_embedding_client().aio.models.get(model=gemini_embedding_model)
+
+# per-upstream concurrency limits for the async path
+embed_semaphore = asyncio.Semaphore(gemini_embed_concurrency)
+generate_semaphore = asyncio.Semaphore(gemini_generate_concurrency)
+
+# per-upstream quotas (requests/min, tokens/min), shared by the sync and async paths
+embed_limiter = RateLimiter("embed", gemini_embed_rpm, gemini_embed_tpm)
+generate_limiter = RateLimiter("generate", gemini_generate_rpm, gemini_generate_tpm)
+
+# batchEmbedContents accepts at most 100 texts; fewer while gemini is rejecting batches as too large
+embed_batch_size = AdaptiveBatchSize(100)
+# first retry delay of generation calls (embedding callers pass their own `backoff`)
+GENERATE_BACKOFF_SECONDS = 2.0
+
+
+def _estimate_tokens(texts: list[str]) -> int:
+    return sum(len(text) for text in texts) // CHARS_PER_TOKEN + len(texts)
+
+
+def _retry_delay(limiter: RateLimiter, exc: Exception, attempt: int, retries: int, backoff: float) -> Optional[float]:
+    """Seconds to wait before retrying after `exc`, or None when retrying is pointless or attempts are used up."""
+    if attempt >= retries - 1 or not is_retryable(exc):
+        return None
+    delay = backoff_delay(attempt, backoff, gemini_backoff_max_seconds, retry_after(exc))
+    if status_code(exc) == 429:
+        # quota exhausted: hold back every caller, not just this one
+        limiter.pause(delay)
+    return delay
 
 
 # ------------- Embedding Batched file chunks -------------
@@ -98,6 +187,7 @@ def embed_chunks_batched(
 
     """
     embeds a list of strings in batches with validation and retry logic.
+    Vectors already present in the embedding cache are reused; only misses hit the API.
     Returns list of embeddings or raise EmbeddingError.
     
     Args:
@@ -112,48 +202,97 @@ def embed_chunks_batched(
     if not chunks:
         raise EmbeddingError("No chunks provided to embedding.")
 
-    all_vectors: list[list[float]] = []
-    for start in range(0, len(chunks), batch_size):
-        batch = chunks[start:start + batch_size]
+    # content-addressed cache: only chunks we have never embedded go over the wire
+    cache = get_embedding_cache()
+    if cache is None:
+        return _embed_uncached(chunks, batch_size, retries, backoff, task_type, output_dimensionality)
 
-        last_error = None
-        for attempt in range(retries):
-            try:
-                logger.info(f"Embedding batch {start}-{start+len(batch)-1} (size={len(batch)}) attempt {attempt}/{retries}")
-                
-                # Use Client-based API: client.models.embed_content with contents parameter
-                # Note: task_type and output_dimensionality are not supported by this API
-                result = embedding_client.models.embed_content(
-                    model=gemini_embedding_model,
-                    contents=batch
-                )
-                
-                # Log the result type and structure for debugging
-                logger.info(f"Embedding response type: {type(result)}, has embeddings attr: {hasattr(result, 'embeddings')}, dir: {[x for x in dir(result) if not x.startswith('_')][:10]}")
-                if hasattr(result, 'embeddings'):
-                    logger.info(f"embeddings type: {type(result.embeddings)}, is list: {isinstance(result.embeddings, list)}")
-                
-                vectors = parse_embedding_response(result)
-                if len(vectors) != len(batch):
-                    raise EmbeddingError(f"mismatch: got {len(vectors)} vectors, expected {len(batch)} input")
-                
-                all_vectors.extend(vectors)
-                break
-            
-            except Exception as e:
-                last_error = e
-                logger.warning(f"Embedding batch failed: (attempt: {attempt}/{retries}): {str(e)}")
-                # Log more details on the last attempt
-                if attempt == retries - 1:
-                    logger.error(f"Final attempt failed. Error type: {type(e)}, Error: {e}")
+    keys, found, missing = _split_cached(cache, chunks, task_type, output_dimensionality)
+    if missing:
+        fresh = _embed_uncached(list(missing.values()), batch_size, retries, backoff, task_type, output_dimensionality)
+        _remember(cache, missing, fresh, found)
+    return _assemble(keys, found, len(missing))
 
-                if attempt < retries - 1:
-                    time.sleep(backoff * (attempt + 1))
-        
-        else:
-            # exhausted all retries ->
-            raise EmbeddingError(f"Failed to embed batch after {retries} attempts: {last_error}")
 
+async def embed_chunks_batched_async(
+    chunks: list[str],
+    batch_size: int = 50,
+    retries: int = 3,
+    backoff: float = 2.0,
+    task_type: str | None = None,
+    output_dimensionality: int | None = None) -> list[list[float]]:
+
+    """
+    Event-loop friendly twin of embed_chunks_batched.
+    Uses the SDK's async client, awaits backoff instead of sleeping, runs batches concurrently
+    (bounded by GEMINI_EMBED_CONCURRENCY) and does cache I/O in a worker thread.
+    """
+
+    if not chunks:
+        raise EmbeddingError("No chunks provided to embedding.")
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return await _embed_uncached_async(chunks, batch_size, retries, backoff, task_type, output_dimensionality)
+
+    keys, found, missing = await asyncio.to_thread(_split_cached, cache, chunks, task_type, output_dimensionality)
+    if missing:
+        fresh = await _embed_uncached_async(
+            list(missing.values()), batch_size, retries, backoff, task_type, output_dimensionality
+        )
+        await asyncio.to_thread(_remember, cache, missing, fresh, found)
+    return _assemble(keys, found, len(missing))
+
+
+def _split_cached(
+    cache: EmbeddingCache,
+    chunks: list[str],
+    task_type: str | None,
+    output_dimensionality: int | None,
+) -> tuple[list[str], dict[str, list[float]], dict[str, str]]:
+    """Return (key per chunk, cached vectors by key, uncached text by key)."""
+    keys = [
+        cache_key(chunk, model=gemini_embedding_model, task_type=task_type, output_dimensionality=output_dimensionality)
+        for chunk in chunks
+    ]
+    found = cache.get_many(keys)
+    missing: dict[str, str] = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in found and key not in missing:
+            missing[key] = chunk
+    return keys, found, missing
+
+
+def _remember(
+    cache: EmbeddingCache,
+    missing: dict[str, str],
+    fresh: list[list[float]],
+    found: dict[str, list[float]],
+) -> None:
+    new_entries = dict(zip(missing.keys(), fresh))
+    cache.put_many(new_entries)
+    found.update(new_entries)
+
+
+def _assemble(keys: list[str], found: dict[str, list[float]], embedded: int) -> list[list[float]]:
+    CACHE_LOOKUPS.labels("embedding", "hit").inc(len(keys) - embedded)
+    CACHE_LOOKUPS.labels("embedding", "miss").inc(embedded)
+    all_vectors = [found[key] for key in keys]
+    dim = len(all_vectors[0])
+    if any(len(v) != dim for v in all_vectors):
+        raise EmbeddingError("Inconsistent emmbedding dimensions across cached and fresh results.")
+    return all_vectors
+
+
+def _validate_batch(result: Any, batch: list[str]) -> list[list[float]]:
+    vectors = parse_embedding_response(result)
+    EMBEDDING_CHUNKS.inc(len(vectors))
+    if len(vectors) != len(batch):
+        raise EmbeddingError(f"mismatch: got {len(vectors)} vectors, expected {len(batch)} input")
+    return vectors
+
+
+def _check_vectors(all_vectors: list[list[float]], batch_size: int) -> list[list[float]]:
     # Check if we got any vectors
     if not all_vectors:
         raise EmbeddingError("No vectors were generated from any batch")
@@ -164,24 +303,276 @@ def embed_chunks_batched(
         raise EmbeddingError("Inconsistent emmbedding dimensions across results.")
 
     num_batches = (len(all_vectors) + batch_size - 1) // batch_size if batch_size > 0 else 1
-    logger.info(f"Successfully embedded {len(all_vectors)} chunks in {num_batches} batches, dimension: {dim}")
+    logger.debug(f"Successfully embedded {len(all_vectors)} chunks in {num_batches} batches, dimension: {dim}")
     return all_vectors
 
 
+def _embed_config(task_type: str | None, output_dimensionality: int | None) -> genai_types.EmbedContentConfig | None:
+    # gemini-embedding-001 truncates Matryoshka-style to 768 / 1536 / 3072 dimensions
+    if task_type is None and output_dimensionality is None:
+        return None
+    return genai_types.EmbedContentConfig(task_type=task_type, output_dimensionality=output_dimensionality)
+
+
+def _plan_batches(chunks: list[str], batch_size: int) -> list[list[str]]:
+    """
+    Split `chunks` into requests of at most `batch_size` texts (fewer while the adaptive limit is
+    shrunk) and GEMINI_EMBED_BATCH_TOKENS estimated tokens, so large chunks travel in smaller batches.
+    """
+    limit = max(1, min(batch_size, embed_batch_size.current))
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    tokens = 0
+    for chunk in chunks:
+        cost = _estimate_tokens([chunk])
+        if batch and (len(batch) >= limit or tokens + cost > gemini_embed_batch_tokens):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append(chunk)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _split_oversize(batch: list[str], error: Exception) -> int:
+    embed_batch_size.shrink(len(batch))
+    EMBEDDING_SPLITS.inc()
+    logger.warning(f"Embedding batch of {len(batch)} texts rejected as too large, splitting it: {error}")
+    return len(batch) // 2
+
+
+def _log_embed_failure(error: Exception, attempt: int, retries: int, delay: Optional[float]) -> None:
+    logger.warning(f"Embedding batch failed: (attempt: {attempt}/{retries}): {str(error)}")
+    if delay is None:
+        logger.error(f"Final attempt failed. Error type: {type(error)}, Error: {error}")
+    else:
+        EMBEDDING_RETRIES.inc()
+
+
+def _embed_uncached(
+    chunks: list[str],
+    batch_size: int,
+    retries: int,
+    backoff: float,
+    task_type: str | None = None,
+    output_dimensionality: int | None = None,
+) -> list[list[float]]:
+    """Call the embedding API for every chunk, batch by batch, with retries."""
+
+    client = get_embedding_client()  # a missing API key fails here, not after every retry
+
+    def embed_batch(batch: list[str]) -> list[list[float]]:
+        last_error = None
+        for attempt in range(retries):
+            embed_limiter.acquire_sync(_estimate_tokens(batch))
+            try:
+                with track("embed_batch", size=len(batch), attempt=attempt):
+                    # Use Client-based API: client.models.embed_content with contents parameter
+                    result = client.models.embed_content(
+                        model=gemini_embedding_model,
+                        contents=batch,
+                        config=_embed_config(task_type, output_dimensionality),
+                    )
+                    vectors = _validate_batch(result, batch)
+                embed_batch_size.grow()
+                return vectors
+
+            except Exception as e:
+                if is_oversize(e) and len(batch) > 1:
+                    half = _split_oversize(batch, e)
+                    return embed_batch(batch[:half]) + embed_batch(batch[half:])
+                last_error = e
+                delay = _retry_delay(embed_limiter, e, attempt, retries, backoff)
+                _log_embed_failure(e, attempt, retries, delay)
+                if delay is None:
+                    break
+                time.sleep(delay)
+
+        # exhausted all retries, or the error is not worth retrying ->
+        raise EmbeddingError(f"Failed to embed batch after {attempt + 1} attempts: {last_error}")
+
+    all_vectors: list[list[float]] = []
+    for batch in _plan_batches(chunks, batch_size):
+        all_vectors.extend(embed_batch(batch))
+    return _check_vectors(all_vectors, batch_size)
+
+
+async def _embed_uncached_async(
+    chunks: list[str],
+    batch_size: int,
+    retries: int,
+    backoff: float,
+    task_type: str | None = None,
+    output_dimensionality: int | None = None,
+) -> list[list[float]]:
+    """Async variant of _embed_uncached; batches run concurrently under the embedding semaphore."""
+
+    client = get_embedding_client()
+
+    async def embed_batch(batch: list[str]) -> list[list[float]]:
+        last_error = None
+        for attempt in range(retries):
+            # waiting for quota happens outside the semaphore so it doesn't hold a connection slot
+            await embed_limiter.acquire(_estimate_tokens(batch))
+            try:
+                async with embed_semaphore, track("embed_batch", size=len(batch), attempt=attempt):
+                    result = await client.aio.models.embed_content(
+                        model=gemini_embedding_model,
+                        contents=batch,
+                        config=_embed_config(task_type, output_dimensionality),
+                    )
+                    vectors = _validate_batch(result, batch)
+                embed_batch_size.grow()
+                return vectors
+
+            except Exception as e:
+                if is_oversize(e) and len(batch) > 1:
+                    half = _split_oversize(batch, e)
+                    first, second = await asyncio.gather(embed_batch(batch[:half]), embed_batch(batch[half:]))
+                    return first + second
+                last_error = e
+                delay = _retry_delay(embed_limiter, e, attempt, retries, backoff)
+                _log_embed_failure(e, attempt, retries, delay)
+                if delay is None:
+                    break
+                # the semaphore is released while we back off so other batches keep flowing
+                await asyncio.sleep(delay)
+
+        raise EmbeddingError(f"Failed to embed batch after {attempt + 1} attempts: {last_error}")
+
+    results = await asyncio.gather(*(embed_batch(batch) for batch in _plan_batches(chunks, batch_size)))
+    all_vectors = [vector for batch_vectors in results for vector in batch_vectors]
+    return _check_vectors(all_vectors, batch_size)
+
+
 def generate_response(prompt: str):
     """Generate a contextual response from gemini model"""
 
-    try:
-        model = genai.GenerativeModel(gemini_model)
-        # generate_content accepts the prompt as a positional argument or contents parameter
-        response = model.generate_content(prompt)
-        text = getattr(response, "text", None)
-        
-        if not text or not text.strip():
+    model = get_generative_model()
+    reserved = _estimate_tokens([prompt])
+    for attempt in range(max(1, gemini_generate_retries)):
+        generate_limiter.acquire_sync(reserved)
+        try:
+            # generate_content accepts the prompt as a positional argument or contents parameter
+            with track("generate", prompt_chars=len(prompt), attempt=attempt):
+                response = model.generate_content(prompt)
+        except Exception as e:
+            delay = _retry_delay(generate_limiter, e, attempt, gemini_generate_retries, GENERATE_BACKOFF_SECONDS)
+            if delay is None:
+                logger.error(f"Generation failed: {str(e)}")
+                raise GenerationError(f"Failed to generate: {str(e)}")
+            logger.warning(f"Generation failed (attempt {attempt}), retrying in {delay:.1f}s: {str(e)}")
+            time.sleep(delay)
+            continue
+        generate_limiter.settle(reserved, _used_tokens(response))
+        return _response_text(response)
+
+
+async def generate_response_async(prompt: str) -> str:
+    """
+    Generate a contextual response without blocking the event loop.
+    Calls are paced by the generation rate limiter; throttled and transient failures are retried
+    with jittered backoff (honouring retry-after), up to GEMINI_GENERATE_RETRIES attempts.
+    """
+
+    model = get_generative_model()
+    reserved = _estimate_tokens([prompt])
+    for attempt in range(max(1, gemini_generate_retries)):
+        await generate_limiter.acquire(reserved)
+        try:
+            async with generate_semaphore, track("generate", prompt_chars=len(prompt), attempt=attempt):
+                response = await model.generate_content_async(prompt)
+        except Exception as e:
+            delay = _retry_delay(generate_limiter, e, attempt, gemini_generate_retries, GENERATE_BACKOFF_SECONDS)
+            if delay is None:
+                logger.error(f"Generation failed: {str(e)}")
+                raise GenerationError(f"Failed to generate: {str(e)}")
+            logger.warning(f"Generation failed (attempt {attempt}), retrying in {delay:.1f}s: {str(e)}")
+            await asyncio.sleep(delay)
+            continue
+        generate_limiter.settle(reserved, _used_tokens(response))
+        return _response_text(response)
+
+
+async def _open_stream(model: genai.GenerativeModel, prompt: str, reserved: int):
+    """
+    Start a streamed generation; only opening the stream is retried, never a half-sent answer.
+    Returns holding a generate_semaphore slot, which the caller releases once the stream is consumed.
+    """
+    for attempt in range(max(1, gemini_generate_retries)):
+        # waiting for quota happens outside the semaphore so it doesn't hold a connection slot
+        await generate_limiter.acquire(reserved)
+        await generate_semaphore.acquire()
+        opened = False
+        try:
+            response = await model.generate_content_async(prompt, stream=True)
+            opened = True
+            return response
+        except Exception as e:
+            delay = _retry_delay(generate_limiter, e, attempt, gemini_generate_retries, GENERATE_BACKOFF_SECONDS)
+            if delay is None:
+                logger.error(f"Generation failed: {str(e)}")
+                raise GenerationError(f"Failed to generate: {str(e)}")
+            logger.warning(f"Generation failed (attempt {attempt}), retrying in {delay:.1f}s: {str(e)}")
+        finally:
+            if not opened:
+                generate_semaphore.release()
+        # the slot is released while we back off so other generations keep flowing
+        await asyncio.sleep(delay)
+
+
+async def stream_response_async(prompt: str) -> AsyncIterator[str]:
+    """
+    Yield text pieces as gemini produces them. Closing the generator (e.g. the client hung up)
+    closes the upstream stream, so we stop paying for tokens nobody will read.
+    """
+
+    model = get_generative_model()
+    reserved = _estimate_tokens([prompt])
+    async with track("generate_stream", prompt_chars=len(prompt)):
+        started = time.perf_counter()
+        response = await _open_stream(model, prompt, reserved)
+
+        upstream = response.__aiter__()
+        produced = False
+        output_chars = 0
+        try:
+            async for chunk in upstream:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # chunks without text parts (e.g. the final finish_reason chunk)
+                    continue
+                if text:
+                    if not produced:
+                        observe("generate_first_token", time.perf_counter() - started)
+                    produced = True
+                    output_chars += len(text)
+                    yield text
+        except Exception as e:
+            logger.error(f"Generation stream failed: {str(e)}")
+            raise GenerationError(f"Failed to generate: {str(e)}")
+        finally:
+            generate_semaphore.release()
+            generate_limiter.settle(reserved, reserved + output_chars // CHARS_PER_TOKEN)
+            close = getattr(upstream, "aclose", None)
+            if close is not None:
+                await close()
+
+        if not produced:
             raise GenerationError("Gemini returned empty or invalid response")
-        return text
 
-    except Exception as e:
-        logger.error(f"Generation failed: {str(e)}")
-        raise GenerationError(f"Failed to generate: {str(e)}")
 
+def _used_tokens(response: Any) -> Optional[int]:
+    """Prompt + output tokens gemini billed for a response, when it reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def _response_text(response: Any) -> str:
+    text = getattr(response, "text", None)
+
+    if not text or not text.strip():
+        raise GenerationError("Gemini returned empty or invalid response")
+    return text
@@ -0,0 +1,120 @@
+# prometheus metrics & sampled tracing
+
+"""
+Per-stage latency histograms, retry / fallback / cache counters and in-flight gauges, exposed
+at GET /metrics. `track(stage)` times a block (sync or async) and, for a TRACE_SAMPLE_RATE
+fraction of calls, logs one trace line with its attributes instead of logging every call.
+Under several uvicorn workers set PROMETHEUS_MULTIPROC_DIR so /metrics aggregates all of them.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from core.config import trace_sample_rate
+from core.logger import get_logger
+
+trace_logger = get_logger("vera.trace")
+
+# 5 ms .. 2 min: covers a cache hit up to a large PDF extraction
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = Histogram(
+    "vera_stage_duration_seconds",
+    "Duration of one pipeline stage (extract, chunk, embed_batch, qdrant_search, qdrant_upsert, prompt, generate, ...)",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+STAGE_ERRORS = Counter("vera_stage_errors_total", "Stage executions that raised", ["stage"])
+IN_FLIGHT = Gauge("vera_stage_in_flight", "Stage executions currently running", ["stage"], multiprocess_mode="livesum")
+
+HTTP_SECONDS = Histogram(
+    "vera_http_request_duration_seconds",
+    "HTTP request duration by route template",
+    ["method", "route", "status"],
+    buckets=_BUCKETS,
+)
+
+EMBEDDING_RETRIES = Counter("vera_embedding_retries_total", "Embedding batch attempts that failed and were retried")
+EMBEDDING_CHUNKS = Counter("vera_embedding_chunks_total", "Chunks sent to the embedding API")
+CACHE_LOOKUPS = Counter("vera_cache_lookups_total", "Cache lookups", ["cache", "result"])
+QUERY_FALLBACKS = Counter("vera_query_fallbacks_total", "Queries answered without retrieved context", ["reason"])
+INGEST_CHUNKS = Counter("vera_ingest_chunks_total", "Chunks processed by ingests", ["result"])
+FANOUT_FAILURES = Counter("vera_fanout_failures_total", "Collections left out of a fan-out search", ["reason"])
+RATE_LIMIT_WAIT = Counter("vera_rate_limit_wait_seconds_total", "Time callers were held back by a client-side rate limiter", ["api"])
+UPSTREAM_THROTTLED = Counter("vera_upstream_throttled_total", "429 responses from upstream APIs", ["api"])
+EMBEDDING_SPLITS = Counter("vera_embedding_batch_splits_total", "Embedding batches split after being rejected as too large")
+QUERY_EMBED_BATCH_SIZE = Histogram(
+    "vera_query_embed_batch_size",
+    "Distinct questions per coalesced query-embedding call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 100),
+)
+CONTEXT_TOKENS = Counter("vera_context_tokens_total", "Approximate prompt context tokens, before and after packing", ["kind"])
+
+
+class track:
+    """
+    Time a stage: `with track("qdrant_search"):` or `async with track("generate", model=...):`.
+    Observes the stage histogram, maintains the in-flight gauge and counts errors.
+    """
+
+    __slots__ = ("stage", "attrs", "_started")
+
+    def __init__(self, stage: str, **attrs):
+        self.stage = stage
+        self.attrs = attrs
+        self._started = 0.0
+
+    def __enter__(self) -> "track":
+        IN_FLIGHT.labels(self.stage).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._started
+        IN_FLIGHT.labels(self.stage).dec()
+        STAGE_SECONDS.labels(self.stage).observe(elapsed)
+        if exc_type is not None and exc_type is not GeneratorExit:
+            STAGE_ERRORS.labels(self.stage).inc()
+        if trace_sample_rate > 0 and random.random() < trace_sample_rate:
+            _trace(self.stage, elapsed, exc, self.attrs)
+
+    async def __aenter__(self) -> "track":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record a stage measured elsewhere (e.g. interleaved work timed by the ingest pipeline)."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def _trace(stage: str, elapsed: float, exc: Optional[BaseException], attrs: dict) -> None:
+    fields = " ".join(f"{key}={value}" for key, value in attrs.items())
+    status = f"error={type(exc).__name__}" if exc is not None else "ok"
+    trace_logger.info("stage=%s duration_ms=%.1f %s %s", stage, elapsed * 1000, status, fields)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition payload and content type for GET /metrics."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
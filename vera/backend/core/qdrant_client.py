@@ -1,51 +1,309 @@
 # qdrant client
 
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import replace
+from typing import Optional
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    Modifier,
+    PayloadSchemaType,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
 
 from core.config import (
     QDRANT_VECTOR_SIZE,
+    collection_state_ttl_seconds,
+    hybrid_search_enabled,
     qdrant_api_key,
+    qdrant_concurrency,
     qdrant_collection,
+    qdrant_quantization,
+    qdrant_search_oversampling,
+    qdrant_search_rescore,
     qdrant_url,
+    qdrant_vectors_on_disk,
 )
+from core.embedders import EmbeddingSpec, configured_spec, legacy_spec
 from core.logger import get_logger
+from utils.keyed_lock import KeyedLock
 
 logger = get_logger("vera.qdrant_client")
 
-# Initialize Qdrant client with API key if provided (for cloud instances)
-if qdrant_api_key:
-    client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-    logger.info("Qdrant client initialized with API key (cloud instance)")
-else:
-    client = QdrantClient(url=qdrant_url)
-    logger.info("Qdrant client initialized without API key (local instance)")
+# Clients are built by the app lifespan (or on first use by scripts), not at import time:
+# constructing one talks to the server, which used to slow down every worker start.
+client: Optional[QdrantClient] = None
+# Async twin used by the request path so searches/upserts don't block the event loop
+async_client: Optional[AsyncQdrantClient] = None
+qdrant_semaphore = asyncio.Semaphore(qdrant_concurrency)
+
+
+def _client_options() -> dict:
+    # API key if provided (for cloud instances)
+    return {"url": qdrant_url, "api_key": qdrant_api_key} if qdrant_api_key else {"url": qdrant_url}
+
+
+def get_client() -> QdrantClient:
+    global client
+    if client is None:
+        client = QdrantClient(**_client_options())
+        logger.info("Qdrant client initialized (%s)", "cloud instance" if qdrant_api_key else "local instance")
+    return client
+
+
+def get_async_client() -> AsyncQdrantClient:
+    global async_client
+    if async_client is None:
+        async_client = AsyncQdrantClient(**_client_options())
+    return async_client
+
+
+async def close_clients() -> None:
+    global client, async_client
+    if async_client is not None:
+        await async_client.close()
+    if client is not None:
+        client.close()
+    client = async_client = None
+
+
+# Name of the sparse (BM25) vector stored next to the unnamed dense vector
+SPARSE_VECTOR_NAME = "bm25"
+
+# payload fields /chat can filter on; keyword-indexed so filtered searches don't scan the collection
+PAYLOAD_INDEXES = ("domain", "source")
+
+# collection name -> whether it carries the sparse vector (filled in by ensure_collection*)
+sparse_collections: dict[str, bool] = {}
+# collection name -> the embedder its vectors came from (filled in by ensure_collection*)
+collection_specs: dict[str, EmbeddingSpec] = {}
+
+# collection name -> monotonic time it was last validated; within the TTL ensure_collection* is free
+_validated_at: dict[str, float] = {}
+# one lock per collection: a slow collection must not hold up validating the others
+# (dropped once nobody waits on it, since fan-out names come from requests)
+_validate_locks = KeyedLock()
+
+
+def _is_fresh(name: str) -> bool:
+    checked = _validated_at.get(name)
+    return checked is not None and time.monotonic() - checked < collection_state_ttl_seconds
+
+
+def forget_collection(name: Optional[str] = None) -> None:
+    """Drop cached state so the next ensure_collection* re-validates (e.g. after a delete)."""
+    if name is None:
+        _validated_at.clear()
+        sparse_collections.clear()
+        collection_specs.clear()
+    else:
+        _validated_at.pop(name, None)
+        sparse_collections.pop(name, None)
+        collection_specs.pop(name, None)
+
+
+def collection_schema(
+    dimensions: int = QDRANT_VECTOR_SIZE,
+    quantization: str = qdrant_quantization,
+    on_disk: bool = qdrant_vectors_on_disk,
+    hybrid: bool = hybrid_search_enabled,
+    embedding: Optional[EmbeddingSpec] = None,
+) -> dict:
+    """
+    Keyword arguments for create_collection describing the vector layout.
+    `embedding` is recorded in the collection metadata (default: the configured provider).
+    """
+    embedding = embedding or replace(configured_spec(), dimensions=dimensions)
+    schema = {
+        "vectors_config": VectorParams(size=dimensions, distance=Distance.COSINE, on_disk=on_disk),
+        "metadata": embedding.as_metadata(),
+    }
+    if quantization == "scalar":
+        schema["quantization_config"] = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif quantization == "binary":
+        schema["quantization_config"] = BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    if hybrid:
+        schema["sparse_vectors_config"] = {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+    return schema
+
+
+def dense_search_params() -> SearchParams | None:
+    """Oversample quantized candidates and rescore them against the original vectors."""
+    if qdrant_quantization == "none":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=qdrant_search_rescore,
+            oversampling=qdrant_search_oversampling,
+        )
+    )
+
+
+def split_vectors(vector) -> tuple[list[float], Optional[SparseVector]]:
+    """A stored point's vector is either the bare dense list or {"": dense, "bm25": sparse}."""
+    if isinstance(vector, dict):
+        return vector[""], vector.get(SPARSE_VECTOR_NAME)
+    return vector, None
 
 
-def ensure_collection() -> None:
+def embedding_spec(info) -> EmbeddingSpec:
+    """The embedder a collection was built with; collections that predate the record used gemini."""
+    return EmbeddingSpec.from_metadata(info.config.metadata) or legacy_spec(info.config.params.vectors.size)
+
+
+def _check_collection(info, name: str = qdrant_collection) -> None:
+    """
+    The configured collection must match EMBEDDING_PROVIDER / EMBEDDING_DIMENSIONS; any other
+    collection (a fan-out target) is searched with whatever embedder it records.
+    """
+    existing_dim = info.config.params.vectors.size
+    spec = embedding_spec(info)
+    if name == qdrant_collection:
+        expected = configured_spec()
+        if (spec.provider, spec.model) != (expected.provider, expected.model):
+            raise RuntimeError(
+                f"Qdrant collection '{name}' was embedded with {spec.provider}/{spec.model}, but "
+                f"EMBEDDING_PROVIDER selects {expected.provider}/{expected.model}. Set EMBEDDING_PROVIDER "
+                "to match, or point QDRANT_COLLECTION at a new collection and re-ingest."
+            )
+        if existing_dim != QDRANT_VECTOR_SIZE:
+            raise RuntimeError(
+                f"Qdrant collection '{name}' has dimension={existing_dim}, "
+                f"expected {QDRANT_VECTOR_SIZE}. Rebuild it with `python -m tools.migrate_collection` "
+                "(no re-embedding needed), drop/recreate it, or use a new name."
+            )
+    collection_specs[name] = spec
+
+    has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    if hybrid_search_enabled and not has_sparse and name not in sparse_collections:
+        logger.warning(
+            "Collection '%s' has no '%s' sparse vector; hybrid search is disabled for it until it is rebuilt.",
+            name,
+            SPARSE_VECTOR_NAME,
+        )
+    sparse_collections[name] = hybrid_search_enabled and has_sparse
+    _validated_at[name] = time.monotonic()
+
+
+def _missing_metadata(info) -> Optional[dict]:
+    # written once for collections created before the embedder was recorded
+    if EmbeddingSpec.from_metadata(info.config.metadata) is None:
+        return embedding_spec(info).as_metadata()
+    return None
+
+
+def _missing_indexes(info) -> list[str]:
+    schema = info.payload_schema or {}
+    return [name for name in PAYLOAD_INDEXES if name not in schema]
+
+
+def create_payload_indexes(qdrant: QdrantClient, name: str, fields=PAYLOAD_INDEXES, wait: bool = True) -> None:
+    for field in fields:
+        qdrant.create_payload_index(name, field, field_schema=PayloadSchemaType.KEYWORD, wait=wait)
+
+
+def _created(name: str = qdrant_collection) -> None:
+    sparse_collections[name] = hybrid_search_enabled
+    collection_specs[name] = configured_spec()
+    _validated_at[name] = time.monotonic()
+
+
+def ensure_collection(force: bool = False) -> None:
     """
-    Ensure the configured collection exists and respects the expected vector size
-    used by Gemini embeddings (3072 dimensions by default).
+    Ensure the configured collection exists and was built with the configured embedder
+    (provider, model and vector size; gemini at 3072 dimensions by default).
+    New collections also get the sparse BM25 vector used by hybrid search; keyword indexes
+    on the filterable payload fields are created when missing.
+    The result is cached for COLLECTION_STATE_TTL_SECONDS; a refresh costs one round trip.
     """
 
-    exists = client.collection_exists(qdrant_collection)
-    if not exists:
+    if not force and _is_fresh(qdrant_collection):
+        return
+
+    qdrant = get_client()
+    try:
+        info = qdrant.get_collection(qdrant_collection)
+    except Exception:
+        if qdrant.collection_exists(qdrant_collection):
+            raise
         logger.info(
             "Creating qdrant collection '%s' with dimensions: %s",
             qdrant_collection,
             QDRANT_VECTOR_SIZE,
         )
-        client.recreate_collection(
-            collection_name=qdrant_collection,
-            vectors_config=VectorParams(size=QDRANT_VECTOR_SIZE, distance=Distance.COSINE),
-        )
+        # create, never recreate: if another worker created it meanwhile this fails instead of dropping it
+        qdrant.create_collection(collection_name=qdrant_collection, **collection_schema())
+        create_payload_indexes(qdrant, qdrant_collection)
+        _created()
         return
 
-    info = client.get_collection(qdrant_collection)
-    existing_dim = info.config.params.vectors.size
-    if existing_dim != QDRANT_VECTOR_SIZE:
-        raise RuntimeError(
-            f"Qdrant collection '{qdrant_collection}' has dimension={existing_dim}, "
-            f"expected {QDRANT_VECTOR_SIZE}. Drop/recreate the collection or use a new name."
-        )
+    _check_collection(info)
+    metadata = _missing_metadata(info)
+    if metadata:
+        qdrant.update_collection(qdrant_collection, metadata=metadata)
+    missing = _missing_indexes(info)
+    if missing:
+        logger.info("Indexing payload fields %s of '%s' in the background", missing, qdrant_collection)
+        create_payload_indexes(qdrant, qdrant_collection, missing, wait=False)
+
+
+async def ensure_collection_async(force: bool = False, name: Optional[str] = None, create: bool = False) -> None:
+    """
+    Async variant of ensure_collection() for use inside request handlers.
+    `name` validates another collection (e.g. a fan-out search target). A missing collection is
+    created, with the configured embedder, only when it is the configured one or `create` is set
+    (an ingest target); otherwise it raises LookupError.
+    """
+
+    name = name or qdrant_collection
+    if not force and _is_fresh(name):
+        return
+
+    async with _validate_locks.hold(name):
+        # another request may have refreshed the state while we waited
+        if not force and _is_fresh(name):
+            return
+
+        qdrant = get_async_client()
+        async with qdrant_semaphore:
+            try:
+                info = await qdrant.get_collection(name)
+            except Exception:
+                if await qdrant.collection_exists(name):
+                    raise
+                if name != qdrant_collection and not create:
+                    raise LookupError(f"Qdrant collection '{name}' does not exist")
+                logger.info("Creating qdrant collection '%s' with dimensions: %s", name, QDRANT_VECTOR_SIZE)
+                await qdrant.create_collection(collection_name=name, **collection_schema())
+                for field in PAYLOAD_INDEXES:
+                    await qdrant.create_payload_index(name, field, field_schema=PayloadSchemaType.KEYWORD, wait=True)
+                _created(name)
+                return
 
+            _check_collection(info, name)
+            metadata = _missing_metadata(info)
+            if metadata:
+                await qdrant.update_collection(name, metadata=metadata)
+            missing = _missing_indexes(info)
+            if missing:
+                logger.info("Indexing payload fields %s of '%s' in the background", missing, name)
+            for field in missing:
+                # existing points are indexed in the background; filters work meanwhile, just slower
+                await qdrant.create_payload_index(
+                    name, field, field_schema=PayloadSchemaType.KEYWORD, wait=False
+                )
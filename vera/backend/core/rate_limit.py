@@ -0,0 +1,179 @@
+# upstream rate limiting & backoff
+
+"""
+Client-side quota enforcement for the Gemini APIs.
+
+RateLimiter holds two token buckets, requests/min and tokens/min. `acquire()` reserves capacity up
+front and sleeps off any deficit. Reservations are made in arrival order and spaced at the quota
+rate, so a burst is smoothed down to the ceiling instead of turning into a wave of 429s. Token costs
+are estimated before a call and settled against the reported usage afterwards.
+
+A 429 pauses the whole limiter for the server's retry-after hint (or the backoff delay), so every
+caller in the process cools down at once instead of each discovering the quota on its own and
+retrying in lockstep. Waiters are released with jitter, which also de-synchronises worker processes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+from core.logger import get_logger
+from core.metrics import RATE_LIMIT_WAIT, UPSTREAM_THROTTLED
+
+logger = get_logger("vera.rate_limit")
+
+# a bucket holds one second of quota: calls are paced evenly rather than bursting after idle periods,
+# so any rolling minute sees at most the quota plus one second's worth
+BURST_SECONDS = 1.0
+# waiters released by the end of a pause are spread over this fraction of the pause
+PAUSE_JITTER = 0.2
+
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+_RETRY_DELAY_RE = re.compile(r"retry[_ ]?delay\W+(?:seconds\W+)?(\d+(?:\.\d+)?)", re.IGNORECASE)
+_OVERSIZE_RE = re.compile(r"too large|payload size|exceeds|too many|at most \d+", re.IGNORECASE)
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` (possibly into debt); return how long the caller must wait for it."""
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+        # a single call larger than the bucket waits for a full bucket rather than forever
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimiter:
+    """Requests/min + tokens/min limiter shared by every caller of one API (0 disables a bucket)."""
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.name = name
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            pause = max(0.0, self._paused_until - now)
+            # reservations made during a pause are spaced from its end, not from now
+            start = now + pause
+            delay = pause + random.uniform(0, PAUSE_JITTER * pause) if pause else 0.0
+            if self._requests is not None:
+                delay = max(delay, pause + self._requests.reserve(1, start))
+            if self._tokens is not None and tokens:
+                delay = max(delay, pause + self._tokens.reserve(tokens, start))
+        if delay > 0:
+            RATE_LIMIT_WAIT.labels(self.name).inc(delay)
+        return delay
+
+    async def acquire(self, tokens: int = 0) -> None:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, tokens: int = 0) -> None:
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Correct a token reservation once the real usage is known (refunds when it was overestimated)."""
+        if self._tokens is None or used is None or used == reserved:
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level - (used - reserved))
+
+    def pause(self, seconds: float) -> None:
+        """The server said slow down: hold every caller of this limiter for `seconds`."""
+        UPSTREAM_THROTTLED.labels(self.name).inc()
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                logger.warning("%s API is throttling us; pausing calls for %.1fs", self.name, seconds)
+
+
+class AdaptiveBatchSize:
+    """
+    Upper bound on texts per request: halved when the API rejects a batch as too large,
+    then grown back by one per successful request up to the configured maximum.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = max(1, maximum)
+        self.current = self.maximum
+
+    def shrink(self, rejected: int) -> None:
+        self.current = max(1, min(self.current, rejected // 2))
+
+    def grow(self) -> None:
+        if self.current < self.maximum:
+            self.current += 1
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error (google-genai APIError, google.api_core exceptions, httpx), if any."""
+    for attribute in ("code", "status_code"):
+        value = getattr(exc, attribute, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait: a Retry-After header or a google.rpc.RetryInfo detail."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            value = headers.get("retry-after")
+            if value is not None:
+                return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+    # google.api_core exceptions carry RetryInfo protos with a Duration
+    for detail in getattr(exc, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return delay.seconds + getattr(delay, "nanos", 0) / 1e9
+    # google-genai errors keep the JSON body: ..."retryDelay": "12s"...
+    match = _RETRY_DELAY_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient failures and throttling; unknown errors (network, malformed response) are retried too."""
+    status = status_code(exc)
+    return status is None or status in RETRYABLE_STATUSES
+
+
+def is_oversize(exc: BaseException) -> bool:
+    """The request was rejected for its size (too many texts, too many tokens or bytes)."""
+    return status_code(exc) in (400, 413) and bool(_OVERSIZE_RE.search(str(exc)))
+
+
+def backoff_delay(attempt: int, base: float, cap: float, hint: Optional[float] = None) -> float:
+    """
+    Exponential backoff with "equal jitter": half of base * 2**attempt is fixed, half random, so
+    retries are both spaced out and de-synchronised. A server hint replaces the computed delay.
+    """
+    if hint is not None:
+        return min(cap, hint) + random.uniform(0, min(1.0, 0.1 * hint))
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -1,7 +1,14 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.applications import BaseHTTPMiddleware
 from fastapi.middleware.cors import CORSMiddleware
-from routes.route import router
+from core.embedders import get_embedder
+from core.gemini_client import init_gemini
+from core.metrics import HTTP_SECONDS
+from core.qdrant_client import close_clients, ensure_collection_async, get_async_client, get_client
+from routes.route import metrics_router, router
+from services.ingest_jobs import job_queue
+from utils.pdf_extract import shutdown_pool
 import logging
 import time
 
@@ -15,14 +22,42 @@ logging.basicConfig(
 # ------------ Logging Middleware ------------
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request, call_next):
-        start_time = time.time()
+        start_time = time.perf_counter()
         response = await call_next(request)
-        duration = time.time() - start_time
-        logging.info(f"Request: {request.method} {request.url.path} - Duration: {duration:.2f}s")
+        # for streamed responses this is the time to the first byte
+        duration = time.perf_counter() - start_time
+        route = request.scope.get("route")
+        HTTP_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+        ).observe(duration)
+        logging.info(f"Request: {request.method} {request.url.path} - Duration: {duration * 1000:.1f}ms")
         return response
 
 
-app = FastAPI(title="Vera[backend]: Legal AI Assistant")
+# ------------ Lifespan ------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # clients and schema validation happen once per worker, not on import or per request
+    init_gemini()
+    get_embedder()  # an unknown EMBEDDING_PROVIDER fails the start-up
+    get_client()
+    get_async_client()
+    try:
+        await ensure_collection_async()
+    except RuntimeError:
+        raise  # schema mismatch: refuse to serve a collection we can't use
+    except Exception as exc:
+        logging.warning(f"Qdrant not reachable at start-up ({exc}); see /api/v1/ready")
+    await job_queue.start()
+
+    yield
+
+    await job_queue.stop()
+    shutdown_pool()
+    await close_clients()
+
+
+app = FastAPI(title="Vera[backend]: Legal AI Assistant", lifespan=lifespan)
 
 # ------------ CORS Middleware ------------
 # allow local frontend to access the API
@@ -36,4 +71,5 @@ app.add_middleware( # everything is allowd 🤣
 app.add_middleware(LoggingMiddleware)
 
 app.include_router(router) # include all routes from the router
+app.include_router(metrics_router)
 
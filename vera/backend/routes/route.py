@@ -2,17 +2,32 @@
 
 from __future__ import annotations
 from typing import Optional
-from fastapi import APIRouter, Body, File, Form, Query, UploadFile
+from fastapi import APIRouter, Body, File, Form, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from core.metrics import render_metrics
 from services.collections_service import (
     delete_collections,
     get_collection,
     list_collections,
 )
+from services.cache_stats import get_cache_stats
+from services.collection_snapshots import create_snapshot, list_snapshots, restore_snapshot
 from services.docs import get_indexed_docs
+from services.ingest_jobs import get_job, job_queue, list_jobs
 from services.ingest_service import ingest_document
-from services.query_service import handle_query
+from services.query_service import (
+    batch_query,
+    create_session,
+    delete_session,
+    get_session,
+    handle_query,
+    stream_query,
+)
+from services.readiness import check_readiness
 
 router = APIRouter(prefix="/api/v1")
+# served at the root, where prometheus scrapes by default
+metrics_router = APIRouter()
 
 
 # ------------ Health Check ------------
@@ -21,29 +36,157 @@ def health():
     return {"status": "VERA[backend]: Legal AI Assistant is running 🚀"}
 
 
+@router.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: validates the collection and warms qdrant / gemini connections (503 if not ready)."""
+    is_ready, report = await check_readiness()
+    if not is_ready:
+        response.status_code = 503
+    return report
+
+
 # ------------ Ingest ------------
-@router.post("/ingest")
-@router.post("/upload")  # backwards compatibility for existing clients
+@router.post("/ingest", status_code=202)
 async def ingest(
     file: Optional[UploadFile] = File(default=None),
     domain_form: Optional[str] = Form(default=None),
     url: Optional[str] = Query(default=None),
     domain_query: Optional[str] = Query(default=None, alias="domain"),
+    stream: Optional[bool] = Query(default=None),
+    collection_form: Optional[str] = Form(default=None, alias="collection"),
+    collection_query: Optional[str] = Query(default=None, alias="collection"),
 ):
+    """
+    Queue a background ingest job; poll GET /ingest/{job_id} for progress.
+    `collection` (default: the configured one) is created on first use, e.g. one per jurisdiction.
+    """
     domain = domain_form or domain_query or "general"
-    return await ingest_document(file=file, url=url, domain=domain)
+    collection = collection_form or collection_query
+    return await job_queue.submit(file=file, url=url, domain=domain, stream=stream, collection=collection)
+
+
+@router.post("/upload")  # backwards compatibility for existing clients: ingests synchronously
+async def upload(
+    file: Optional[UploadFile] = File(default=None),
+    domain_form: Optional[str] = Form(default=None),
+    url: Optional[str] = Query(default=None),
+    domain_query: Optional[str] = Query(default=None, alias="domain"),
+    stream: Optional[bool] = Query(default=None),
+    collection_form: Optional[str] = Form(default=None, alias="collection"),
+    collection_query: Optional[str] = Query(default=None, alias="collection"),
+):
+    domain = domain_form or domain_query or "general"
+    collection = collection_form or collection_query
+    return await ingest_document(file=file, url=url, domain=domain, stream=stream, collection=collection)
+
+
+@router.get("/ingest")
+def get_ingest_jobs(status: Optional[str] = Query(default=None), limit: int = Query(default=50, ge=1, le=500)):
+    return list_jobs(status=status, limit=limit)
+
+
+@router.get("/ingest/{job_id}")
+def get_ingest_job(job_id: str):
+    return get_job(job_id)
+
+
+@router.delete("/ingest/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    return await job_queue.cancel(job_id)
 
 
 # ------------ Query ------------
 @router.post("/chat")
-async def chat(question: str = Body(..., embed=True)):
-    return await handle_query(question)
+async def chat(
+    question: str = Body(..., embed=True),
+    domain: Optional[str] = Body(default=None),
+    source: Optional[str] = Body(default=None),
+    collections: Optional[list[str]] = Body(default=None),
+    session_id: Optional[str] = Body(default=None),
+):
+    """
+    Answer a question. Optional `domain` / `source` restrict retrieval to matching documents;
+    `collections` searches several collections concurrently (default: the configured one).
+    `session_id` (from POST /sessions) answers it as a follow-up in that conversation.
+    """
+    return await handle_query(question, domain=domain, source=source, collections=collections, session_id=session_id)
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: Request,
+    question: str = Body(..., embed=True),
+    domain: Optional[str] = Body(default=None),
+    source: Optional[str] = Body(default=None),
+    collections: Optional[list[str]] = Body(default=None),
+    session_id: Optional[str] = Body(default=None),
+):
+    """Same as /chat, streamed as Server-Sent Events: sources first, then answer tokens."""
+    return StreamingResponse(
+        stream_query(
+            question,
+            domain=domain,
+            source=source,
+            collections=collections,
+            session_id=session_id,
+            is_disconnected=request.is_disconnected,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(
+    questions: list[str] = Body(..., embed=True),
+    domain: Optional[str] = Body(default=None),
+    source: Optional[str] = Body(default=None),
+    collections: Optional[list[str]] = Body(default=None),
+):
+    """Answer many questions at once; results stream back as NDJSON in completion order."""
+    return StreamingResponse(
+        batch_query(questions, domain=domain, source=source, collections=collections),
+        media_type="application/x-ndjson",
+    )
+
+
+# ------------ Chat Sessions ------------
+@router.post("/sessions", status_code=201)
+def start_session(
+    domain: Optional[str] = Body(default=None),
+    source: Optional[str] = Body(default=None),
+    collections: Optional[list[str]] = Body(default=None),
+):
+    """Start a conversation; pass its `session_id` to /chat or /chat/stream for follow-up questions."""
+    return create_session(domain=domain, source=source, collections=collections)
+
+
+@router.get("/sessions/{session_id}")
+def get_chat_session(session_id: str):
+    return get_session(session_id)
+
+
+@router.delete("/sessions/{session_id}")
+def end_session(session_id: str):
+    return delete_session(session_id)
 
 
 # ------------ Indexed Docs ------------
 @router.get("/docs")
-def get_docs():
-    return get_indexed_docs()
+def get_docs(
+    collection: Optional[str] = Query(default=None),
+    domain: Optional[str] = Query(default=None),
+    source: Optional[str] = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+):
+    return get_indexed_docs(collection=collection, domain=domain, source=source, limit=limit, offset=offset)
+
+
+# ------------ Caches ------------
+@router.get("/cache/stats")
+def cache_stats():
+    return get_cache_stats()
 
 
 # ------------ Collections ------------
@@ -67,3 +210,35 @@ def get_collection_by_id(collection_id: str):
 @router.delete("/collections")
 def delete_collection_endpoint(collection_id: Optional[str] = Query(default=None)):
     return delete_collections(collection_id)
+
+
+# ------------ Snapshots ------------
+@router.get("/snapshots")
+def get_snapshots():
+    return list_snapshots()
+
+
+@router.post("/snapshots", status_code=201)
+def export_snapshot(
+    collection: Optional[str] = Body(default=None),
+    name: Optional[str] = Body(default=None),
+):
+    """Export a collection (default: the configured one) with its vectors and payloads to SNAPSHOT_DIR/<name>."""
+    return create_snapshot(collection=collection, name=name)
+
+
+@router.post("/snapshots/{name}/restore")
+def import_snapshot(
+    name: str,
+    collection: Optional[str] = Body(default=None),
+    replace: bool = Body(default=False),
+):
+    """Load a snapshot into `collection` (default: the one it was exported from) without re-embedding."""
+    return restore_snapshot(name, collection=collection, replace=replace)
+
+
+# ------------ Metrics ------------
+@metrics_router.get("/metrics", include_in_schema=False)
+def metrics():
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
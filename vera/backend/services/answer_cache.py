@@ -0,0 +1,271 @@
+# semantic answer cache
+
+"""
+Caches (question embedding, retrieved point ids, answer) per collection and search scope
+(the payload filters a question was asked with).
+A new question gets a cached answer back without another generation call when its embedding
+is within the configured cosine threshold of the cached one *and* its search retrieved the same
+top ANSWER_CACHE_MATCH_TOP_N points. Questions that differ in one token ("section 420" vs
+"section 302") can be close in embedding space, but they retrieve different sections.
+Any ingest, delete or restore of a collection drops every answer produced from it, including
+answers retrieved from several collections at once (see collection_key()). The process that made
+the change drops them at once; every other worker process notices on its next lookup, because
+each entry records the collection generations (kept in the document registry) it was built under.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from core.config import (
+    answer_cache_enabled,
+    answer_cache_match_top_n,
+    answer_cache_max_entries,
+    answer_cache_similarity_threshold,
+    answer_cache_ttl_seconds,
+)
+from core.logger import get_logger
+from services.document_registry import document_registry
+
+logger = get_logger("vera.answer_cache")
+
+# (epoch, local invalidation counts, shared generations) of a collection key
+Version = tuple[int, tuple[int, ...], tuple[int, ...]]
+
+
+def collection_key(collections: Sequence[str]) -> str:
+    """Cache key of a question searched across `collections` (a JSON list: names may hold any character)."""
+    return json.dumps(sorted(collections))
+
+
+def _members(key: str) -> list[str]:
+    return json.loads(key)
+
+
+@dataclass
+class CachedAnswer:
+    collection: str
+    question: str
+    vector: np.ndarray  # unit-normalized question embedding
+    point_ids: list[str]  # retrieved points, best first
+    answer: str
+    sources: list[str]
+    scope: str = ""
+    version: Optional[Version] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    """Bounded LRU of answers, searched by cosine similarity of the question embedding and checked against the retrieved points."""
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+        match_top_n: int = 3,
+        generations: Optional[Callable[[Sequence[str]], tuple[int, ...]]] = None,
+    ):
+        self.threshold = threshold
+        self.match_top_n = match_top_n
+        # shared per-collection change counters; None in a single-process setup (tests)
+        self._generations = generations
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, CachedAnswer] = OrderedDict()
+        self._next_id = 0
+        self._versions: dict[str, int] = {}
+        self._epoch = 0  # bumped when every collection is invalidated at once
+        # per (collection, scope): (entry ids, stacked vectors), rebuilt lazily after inserts/evictions
+        self._matrices: dict[tuple[str, str], tuple[list[int], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, collection: str) -> Version:
+        """
+        Current generation of a collection key; changes on every invalidation that covers one of its
+        members, in this process or another. Reads the shared counters, so call it off the event loop.
+        """
+        members = _members(collection)
+        shared = self._generations(members) if self._generations else ()
+        return (*self._local_version(members), shared)
+
+    def _local_version(self, members: Sequence[str]) -> tuple[int, tuple[int, ...]]:
+        return (self._epoch, tuple(self._versions.get(member, 0) for member in members))
+
+    def lookup(
+        self,
+        collection: str,
+        question_vector: list[float],
+        point_ids: Sequence[str],
+        scope: str = "",
+        version: Optional[Version] = None,
+    ) -> Optional[CachedAnswer]:
+        """
+        The most similar cached answer above the threshold whose top retrieved points match `point_ids`.
+        Entries built under another `version` (default: the current one) are stale and dropped.
+        """
+        query = _normalize(question_vector)
+        retrieved = self._top(point_ids)
+        if version is None:
+            version = self.version(collection)
+        with self._lock:
+            self._expire()
+            ids, matrix = self._matrix_for(collection, scope)
+            if not retrieved or not ids or matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            stale = [entry_id for entry_id in ids if self._entries[entry_id].version != version]
+            if stale:
+                # another process changed one of the collections since these answers were generated
+                for entry_id in stale:
+                    del self._entries[entry_id]
+                self._matrices.pop((collection, scope), None)
+                ids, matrix = self._matrix_for(collection, scope)
+                if not ids:
+                    self.misses += 1
+                    return None
+
+            scores = matrix @ query
+            for best in np.argsort(-scores):
+                if scores[best] < self.threshold:
+                    break
+                entry = self._entries[ids[best]]
+                if self._top(entry.point_ids) != retrieved:
+                    continue
+                self._entries.move_to_end(ids[best])
+                self.hits += 1
+                logger.info("Answer cache hit (cosine=%.4f) for collection '%s'", float(scores[best]), collection)
+                return entry
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        *,
+        collection: str,
+        version: Version,
+        question: str,
+        question_vector: list[float],
+        point_ids: list[str],
+        answer: str,
+        sources: list[str],
+        scope: str = "",
+    ) -> None:
+        """Store an answer unless the collection changed since `version` was read."""
+        with self._lock:
+            if self._local_version(_members(collection)) != version[:2]:
+                # an ingest/delete landed while we were generating; the answer may be stale
+                # (a change made by another process is caught by the next lookup)
+                return
+            self._entries[self._next_id] = CachedAnswer(
+                collection=collection,
+                question=question,
+                vector=_normalize(question_vector),
+                point_ids=point_ids,
+                answer=answer,
+                sources=sources,
+                scope=scope,
+                version=version,
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._matrices.pop((evicted.collection, evicted.scope), None)
+            self._matrices.pop((collection, scope), None)
+
+    def invalidate(self, collection: Optional[str] = None) -> int:
+        """Drop answers derived from `collection` (or from every collection). Returns the count dropped."""
+        with self._lock:
+            if collection is None:
+                dropped = len(self._entries)
+                self._epoch += 1
+                self._entries.clear()
+                self._matrices.clear()
+            else:
+                self._versions[collection] = self._versions.get(collection, 0) + 1
+                for key in [key for key in self._matrices if collection in _members(key[0])]:
+                    del self._matrices[key]
+                stale = [i for i, e in self._entries.items() if collection in _members(e.collection)]
+                for entry_id in stale:
+                    del self._entries[entry_id]
+                dropped = len(stale)
+        if dropped:
+            logger.info("Answer cache invalidated %s entries for %s", dropped, collection or "all collections")
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _top(self, point_ids: Sequence[str]) -> frozenset[str]:
+        # a set: near-tied hits may swap places between two phrasings of the same question
+        return frozenset(point_ids[: self.match_top_n] if self.match_top_n > 0 else point_ids)
+
+    def _expire(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        # entries are in LRU order, not insertion order, so scan them all
+        expired = [i for i, e in self._entries.items() if e.created_at < cutoff]
+        for entry_id in expired:
+            entry = self._entries.pop(entry_id)
+            self._matrices.pop((entry.collection, entry.scope), None)
+
+    def _matrix_for(self, collection: str, scope: str) -> tuple[list[int], np.ndarray]:
+        cached = self._matrices.get((collection, scope))
+        if cached is None:
+            ids = [i for i, e in self._entries.items() if e.collection == collection and e.scope == scope]
+            matrix = np.stack([self._entries[i].vector for i in ids]) if ids else np.empty((0, 0), dtype=np.float32)
+            cached = (ids, matrix)
+            self._matrices[(collection, scope)] = cached
+        return cached
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    arr = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm else arr
+
+
+answer_cache: Optional[AnswerCache] = (
+    AnswerCache(
+        answer_cache_similarity_threshold,
+        answer_cache_max_entries,
+        answer_cache_ttl_seconds,
+        answer_cache_match_top_n,
+        document_registry.generations,
+    )
+    if answer_cache_enabled
+    else None
+)
+
+
+def invalidate_answers(collection: Optional[str] = None) -> None:
+    """
+    Invalidate cached answers after a collection's contents changed, here and (through the shared
+    generation counter) in every other worker process. Writes sqlite; call it off the event loop.
+    """
+    try:
+        document_registry.bump_generation(collection)
+    except Exception as exc:
+        logger.warning("Could not record the change of %s for other workers: %s", collection or "all collections", exc)
+    if answer_cache is not None:
+        answer_cache.invalidate(collection)
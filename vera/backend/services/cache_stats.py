@@ -0,0 +1,14 @@
+# cache statistics
+from core.embedding_cache import get_embedding_cache
+from services.answer_cache import answer_cache
+from services.chat_sessions import chat_sessions
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for the embedding and answer caches (None when disabled), and chat session counts."""
+    embedding_cache = get_embedding_cache()
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "chat_sessions": chat_sessions.stats(),
+    }
@@ -0,0 +1,307 @@
+# chat sessions
+
+"""
+Server-side conversations for /chat and /chat/stream (`session_id`), so a follow-up such as
+"and what's the punishment?" is answered in the context of the turns before it.
+
+Each session keeps, bounded in size:
+- its search scope (domain / source / collections), used by every turn that doesn't name its own;
+- the last SESSION_HISTORY_TURNS turns verbatim. Older turns are folded into a rolling summary of at
+  most SESSION_SUMMARY_TOKENS by the generation model, in the background (an extractive summary if that
+  fails), so the prompt stays the same size however long the conversation runs;
+- the candidate chunks retrieved by earlier turns (SESSION_MAX_CHUNKS, least recently retrieved dropped
+  first), stored without their vectors;
+- each chunk's dense vector, once, as a float32 unit vector (12 KB at 3072 dimensions, against ~100 KB
+  as the hit's list of floats).
+
+A follow-up is searched with the previous question prepended, so it finds what it refers to. If its
+search vector is within SESSION_REUSE_SIMILARITY of the previous turn's, the cached chunks are
+re-ranked against it and no search is made; otherwise they compete with the new hits.
+
+Sessions idle for SESSION_TTL_SECONDS are dropped, and at most SESSION_MAX_SESSIONS are kept (least
+recently used evicted first). They live in process memory, so with several workers a client must be
+routed to the same one for the whole conversation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from core.config import (
+    session_history_tokens,
+    session_history_turns,
+    session_max_chunks,
+    session_max_sessions,
+    session_reuse_similarity,
+    session_summary_tokens,
+    session_ttl_seconds,
+)
+from core.gemini_client import generate_response_async
+from core.logger import get_logger
+from utils.context_packer import estimate_tokens
+from utils.file_chunker import CHARS_PER_TOKEN
+
+if TYPE_CHECKING:
+    from services.query_service import SearchScope
+
+logger = get_logger("vera.chat_sessions")
+
+# a history turn isn't worth including when fewer tokens than this are left for it
+MIN_TURN_TOKENS = 32
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+
+
+@dataclass
+class ChatSession:
+    id: str
+    scope: "SearchScope"
+    turns: list[Turn] = field(default_factory=list)
+    summary: str = ""
+    # point id -> hit without its vector, least recently retrieved first
+    chunks: OrderedDict[str, Any] = field(default_factory=OrderedDict)
+    # point id -> float32 unit dense vector, for the cached hits whose search fetched vectors
+    vectors: dict[str, np.ndarray] = field(default_factory=dict)
+    # unit search vector of the last turn, in the scope's first collection
+    last_vector: Optional[np.ndarray] = None
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    # turns of one session run one at a time, so each sees the previous answer
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    folding: Optional[asyncio.Task] = None
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.turns or self.summary)
+
+    def rescope(self, scope: "SearchScope") -> None:
+        """Search a different scope from now on; chunks cached for the old one no longer apply."""
+        if scope != self.scope:
+            self.scope = scope
+            self.forget_chunks()
+
+    def forget_chunks(self) -> None:
+        self.chunks.clear()
+        self.vectors.clear()
+        self.last_vector = None
+
+    def search_text(self, question: str) -> str:
+        """What a follow-up is embedded and searched as: the previous question carries its subject."""
+        return f"{self.turns[-1].question}\n{question}" if self.turns else question
+
+    def reusable(self, vector: Optional[list[float]]) -> bool:
+        """Is this turn close enough to the previous one to answer from the cached chunks alone?"""
+        query = _unit(vector)
+        if not self.chunks or query is None or self.last_vector is None or query.shape != self.last_vector.shape:
+            return False
+        return float(query @ self.last_vector) >= session_reuse_similarity
+
+    def cached_hits(self, vector: Optional[list[float]]) -> list:
+        """
+        Cached chunks ranked for a new search vector: a chunk with a stored vector is scored by its
+        cosine similarity to `vector` (comparable with fresh dense scores); others keep their old score.
+        Hits come back with their unit vector, which is all the packer's MMR needs.
+        """
+        query = _unit(vector)
+        ranked = []
+        for key, hit in self.chunks.items():
+            chunk = self.vectors.get(key)
+            if chunk is not None:
+                update: dict[str, Any] = {"vector": chunk}
+                if query is not None and chunk.shape == query.shape:
+                    update["score"] = float(chunk @ query)
+                hit = hit.model_copy(update=update)
+            ranked.append(hit)
+        return sorted(ranked, key=lambda hit: hit.score or 0.0, reverse=True)
+
+    def remember_hits(self, hits: list, vector: Optional[list[float]]) -> None:
+        """Cache a turn's candidate hits (best first) and its search vector."""
+        # best last, so that when the cache overflows the weakest of the newest hits go before the strongest
+        for hit in reversed(hits):
+            key = str(hit.id)
+            self.chunks.pop(key, None)
+            self.chunks[key] = hit.model_copy(update={"vector": None})
+            chunk = _unit(_dense_vector(hit))
+            if chunk is not None:
+                self.vectors[key] = chunk
+            else:
+                self.vectors.pop(key, None)
+        while len(self.chunks) > session_max_chunks:
+            key, _ = self.chunks.popitem(last=False)
+            self.vectors.pop(key, None)
+        self.last_vector = _unit(vector)
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.turns.append(Turn(question, answer))
+        if len(self.turns) > session_history_turns and self.folding is None:
+            self.folding = asyncio.get_running_loop().create_task(_fold(self))
+
+    def history(self) -> str:
+        """The summary plus the most recent turns that fit SESSION_HISTORY_TOKENS, oldest first."""
+        remaining = session_history_tokens
+        rendered: list[str] = []
+        for turn in reversed(self.turns[-session_history_turns:] if session_history_turns > 0 else []):
+            question = f"User: {turn.question}\n"
+            room = remaining - estimate_tokens(question)
+            if room < MIN_TURN_TOKENS:
+                break
+            answer = f"VERA: {_clip(turn.answer, room)}"
+            rendered.append(question + answer)
+            remaining -= estimate_tokens(question + answer)
+        parts = [f"Summary of earlier turns: {self.summary}"] if self.summary else []
+        return "\n".join(parts + rendered[::-1])
+
+    def describe(self) -> dict:
+        return {
+            "session_id": self.id,
+            "domain": self.scope.domain,
+            "source": self.scope.source,
+            "collections": list(self.scope.collections),
+            "turns": [{"question": turn.question, "answer": turn.answer} for turn in self.turns],
+            "summary": self.summary,
+            "cached_chunks": len(self.chunks),
+            "created_at": self.created_at,
+            "idle_seconds": round(time.time() - self.last_used, 3),
+        }
+
+
+class SessionStore:
+    """Sessions by id, in least-recently-used order, expired after SESSION_TTL_SECONDS idle."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self.evicted = 0
+        self.expired = 0
+        self._sessions: OrderedDict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, scope: "SearchScope") -> ChatSession:
+        session = ChatSession(id=uuid.uuid4().hex, scope=scope)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """The session (marked as used now), or None when it never existed or has expired."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.time()
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def forget_chunks(self, collection: Optional[str] = None) -> None:
+        """Drop cached chunks that may be stale after `collection` (or every collection) changed."""
+        with self._lock:
+            for session in self._sessions.values():
+                if collection is None or collection in session.scope.collections:
+                    session.forget_chunks()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire()
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "cached_chunks": sum(len(session.chunks) for session in self._sessions.values()),
+                "cached_vector_bytes": sum(
+                    vector.nbytes for session in self._sessions.values() for vector in session.vectors.values()
+                ),
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+    def _expire(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        # least recently used first, so the idle ones are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+
+async def _fold(session: ChatSession) -> None:
+    """Fold all but the newest half of the verbatim turns into the rolling summary."""
+    try:
+        folded = session.turns[: len(session.turns) - session_history_turns // 2]
+        try:
+            summary = await generate_response_async(_summary_prompt(session.summary, folded))
+        except Exception as exc:
+            logger.warning("Summarising session %s failed (%s); keeping an extractive summary", session.id, exc)
+            summary = _extractive_summary(session.summary, folded)
+        session.summary = _clip(summary.strip(), session_summary_tokens)
+        # turns appended while we were summarising stay; only the folded ones go
+        del session.turns[: len(folded)]
+    finally:
+        session.folding = None
+
+
+def _summary_prompt(summary: str, turns: list[Turn]) -> str:
+    conversation = "\n".join(f"User: {turn.question}\nVERA: {turn.answer}" for turn in turns)
+    words = int(session_summary_tokens * 0.75)
+    return (
+        "Summarise this conversation between a user and VERA AI, a legal research assistant, in at most "
+        f"{words} words. Keep the acts, sections, parties and facts the user asked about so later questions "
+        "can refer back to them; leave out pleasantries.\n"
+        f"Summary so far: {summary or '[none]'}\n"
+        f"Conversation:\n{conversation}"
+    )
+
+
+def _extractive_summary(summary: str, turns: list[Turn]) -> str:
+    asked = " ".join(f"User asked: {turn.question}" for turn in turns)
+    text = f"{summary} {asked}".strip()
+    # the most recent questions matter most: keep the tail
+    max_chars = session_summary_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else "..." + text[-max_chars:]
+
+
+def _clip(text: str, tokens: int) -> str:
+    max_chars = max(0, tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    space = text.rfind(" ", 0, max_chars)
+    return text[: space if space > 0 else max_chars] + " ..."
+
+
+def _dense_vector(hit: Any) -> Any:
+    vector = getattr(hit, "vector", None)
+    # hybrid collections return every named vector; the dense one is unnamed
+    return vector.get("") if isinstance(vector, dict) else vector
+
+
+def _unit(vector: Any) -> Optional[np.ndarray]:
+    if vector is None or len(vector) == 0:
+        return None
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else None
+
+
+chat_sessions = SessionStore(session_max_sessions, session_ttl_seconds)
@@ -0,0 +1,364 @@
+# collection snapshots
+
+"""
+Export a collection to a directory and restore it into any qdrant without extracting, chunking
+or embedding anything:
+
+    <snapshot>/manifest.json   format version, source collection, point count, embedder, payload columns
+    <snapshot>/vectors.npy     float32 [points, dimensions]; row i is point i (np.load(..., mmap_mode="r"))
+    <snapshot>/payloads.npz    point ids and payload fields, one column per field (utils.columnar)
+    <snapshot>/sparse.npz      BM25 vectors as CSR (indptr / indices / values), when the collection has them
+
+A restore creates the collection with the embedder recorded in the snapshot and streams the
+memory-mapped vectors through qdrant's parallel batch uploader, with HNSW indexing deferred until
+the load has finished. It then rebuilds the ingest manifest and the document registry from the
+payloads, so re-ingesting an unchanged PDF afterwards embeds nothing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from qdrant_client.http.models import OptimizersConfigDiff, SparseVector
+
+from core.config import (
+    hybrid_search_enabled,
+    qdrant_collection,
+    qdrant_quantization,
+    qdrant_vectors_on_disk,
+    snapshot_dir,
+    snapshot_upload_batch_size,
+    snapshot_upload_parallel,
+)
+from core.embedders import EmbeddingSpec, configured_spec
+from core.logger import get_logger
+from core.qdrant_client import (
+    SPARSE_VECTOR_NAME,
+    collection_schema,
+    create_payload_indexes,
+    embedding_spec,
+    forget_collection,
+    get_client,
+    split_vectors,
+)
+from services.answer_cache import invalidate_answers
+from services.chat_sessions import chat_sessions
+from services.document_registry import document_registry
+from services.ingest_manifest import ingest_manifest, point_set_digest
+from utils.columnar import decode_column, decode_columns, encode_column, encode_columns
+from utils.sparse import document_sparse_vector
+
+logger = get_logger("vera.collection_snapshots")
+
+SNAPSHOT_FORMAT = "vera-collection-snapshot"
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+PAYLOADS_FILE = "payloads.npz"
+SPARSE_FILE = "sparse.npz"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def export_collection(collection: str, path: str, *, batch_size: int = 512) -> dict:
+    """Write every point of `collection` to the snapshot directory `path` (which must not exist); returns the manifest."""
+    client = get_client()
+    if not client.collection_exists(collection):
+        raise LookupError(f"Collection '{collection}' not found.")
+    if os.path.exists(path):
+        raise FileExistsError(f"Snapshot '{path}' already exists.")
+
+    info = client.get_collection(collection)
+    embedding = embedding_spec(info)
+    dimensions = info.config.params.vectors.size
+    has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+    total = client.count(collection_name=collection, exact=True).count
+
+    # written next to the target and renamed into place, so a failed export leaves no half snapshot behind
+    staging = f"{path}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    started = time.perf_counter()
+    try:
+        vectors = np.lib.format.open_memmap(
+            os.path.join(staging, VECTORS_FILE), mode="w+", dtype=np.float32, shape=(total, dimensions)
+        )
+        ids: list = []
+        payloads: list[dict] = []
+        indptr, indices, values = [0], [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if len(ids) + len(records) > total:
+                raise RuntimeError(f"Collection '{collection}' grew during the export; retry once ingests have finished.")
+            rows = []
+            for record in records:
+                dense, sparse = split_vectors(record.vector)
+                rows.append(dense)
+                ids.append(record.id)
+                payloads.append(record.payload or {})
+                if has_sparse:
+                    if sparse is not None:
+                        indices.extend(sparse.indices)
+                        values.extend(sparse.values)
+                    indptr.append(len(indices))
+            if rows:
+                vectors[len(ids) - len(rows): len(ids)] = np.asarray(rows, dtype=np.float32)
+            if offset is None:
+                break
+        if len(ids) != total:
+            raise RuntimeError(f"Collection '{collection}' shrank during the export; retry once deletes have finished.")
+        vectors.flush()
+        del vectors
+
+        id_arrays, id_column = encode_column(ids, "id")
+        payload_arrays, columns = encode_columns(payloads)
+        np.savez(os.path.join(staging, PAYLOADS_FILE), **id_arrays, **payload_arrays)
+        if has_sparse:
+            np.savez(
+                os.path.join(staging, SPARSE_FILE),
+                indptr=np.asarray(indptr, dtype=np.int64),
+                indices=np.asarray(indices, dtype=np.uint32),
+                values=np.asarray(values, dtype=np.float32),
+            )
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "collection": collection,
+            "points": total,
+            "dimensions": dimensions,
+            **embedding.as_metadata(),
+            "sparse": has_sparse,
+            "ids": id_column,
+            "columns": columns,
+            "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    elapsed = time.perf_counter() - started
+    logger.info("Exported %s points of '%s' to %s in %.2fs", total, collection, path, elapsed)
+    return {**manifest, "path": path, "bytes": _size(path), "seconds": round(elapsed, 3)}
+
+
+def read_manifest(path: str) -> dict:
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        raise LookupError(f"No snapshot at '{path}'.")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"'{path}' is not a version {SNAPSHOT_VERSION} collection snapshot "
+            f"(format={manifest.get('format')!r}, version={manifest.get('version')!r})."
+        )
+    return manifest
+
+
+def import_collection(
+    path: str,
+    collection: Optional[str] = None,
+    *,
+    replace: bool = False,
+    quantization: str = qdrant_quantization,
+    on_disk: bool = qdrant_vectors_on_disk,
+    hybrid: bool = hybrid_search_enabled,
+    batch_size: int = snapshot_upload_batch_size,
+    parallel: int = snapshot_upload_parallel,
+) -> dict:
+    """
+    Restore the snapshot at `path` into `collection` (default: the collection it was exported from).
+    An existing collection is only overwritten with `replace`. Sparse vectors are computed from the
+    text when the snapshot has none and `hybrid` is on.
+    """
+    manifest = read_manifest(path)
+    target = collection or manifest["collection"]
+    embedding = EmbeddingSpec.from_metadata(manifest)
+    total, dimensions = manifest["points"], manifest["dimensions"]
+
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    if vectors.shape != (total, dimensions) or vectors.dtype != np.float32:
+        raise ValueError(f"'{path}' holds {vectors.dtype} vectors of shape {vectors.shape}, expected float32 {(total, dimensions)}.")
+    with np.load(os.path.join(path, PAYLOADS_FILE)) as columns:
+        ids = decode_column(columns, manifest["ids"], total)
+        payloads = decode_columns(columns, manifest["columns"], total)
+
+    client = get_client()
+    if client.collection_exists(target):
+        if not replace:
+            raise FileExistsError(f"Collection '{target}' already exists; restore with replace to overwrite it.")
+        client.delete_collection(target)
+        ingest_manifest.drop_collection(target)
+        document_registry.delete_collection(target)
+
+    started = time.perf_counter()
+    client.create_collection(
+        collection_name=target,
+        **collection_schema(
+            dimensions=dimensions, quantization=quantization, on_disk=on_disk, hybrid=hybrid, embedding=embedding
+        ),
+    )
+    # building the HNSW graph while points stream in would redo it segment by segment; build it once at the end
+    indexing_threshold = client.get_collection(target).config.optimizer_config.indexing_threshold
+    client.update_collection(target, optimizers_config=OptimizersConfigDiff(indexing_threshold=0))
+    client.upload_collection(
+        collection_name=target,
+        vectors=_named_vectors(path, manifest, vectors, payloads) if hybrid else vectors,
+        payload=payloads,
+        ids=ids,
+        batch_size=batch_size,
+        parallel=max(1, parallel),
+        wait=True,
+    )
+    client.update_collection(target, optimizers_config=OptimizersConfigDiff(indexing_threshold=indexing_threshold))
+    create_payload_indexes(client, target)
+
+    restored = client.count(collection_name=target, exact=True).count
+    if restored != total:
+        raise RuntimeError(f"Restore incomplete: snapshot has {total} points, '{target}' has {restored}.")
+
+    _register_sources(target, ids, payloads, embedding, total)
+    forget_collection(target)
+    invalidate_answers(target)
+    chat_sessions.forget_chunks(target)
+
+    elapsed = time.perf_counter() - started
+    logger.info("Restored %s points into '%s' in %.2fs", total, target, elapsed)
+    configured = configured_spec()
+    if target == qdrant_collection and (embedding.provider, embedding.model) != (configured.provider, configured.model):
+        logger.warning(
+            "'%s' was embedded with %s/%s; set EMBEDDING_PROVIDER to match before serving it",
+            target, embedding.provider, embedding.model,
+        )
+    return {
+        "status": "restored",
+        "collection": target,
+        "points": total,
+        "dimensions": dimensions,
+        **embedding.as_metadata(),
+        "seconds": round(elapsed, 3),
+        "points_per_s": round(total / elapsed, 1) if elapsed else None,
+    }
+
+
+def _named_vectors(path: str, manifest: dict, vectors: np.ndarray, payloads: list[dict]) -> Iterator[dict]:
+    """Dense rows paired with their BM25 vector: the stored one, or computed from the text."""
+    if manifest.get("sparse"):
+        with np.load(os.path.join(path, SPARSE_FILE)) as sparse:
+            indptr, indices, values = sparse["indptr"], sparse["indices"], sparse["values"]
+        for row, (start, end) in enumerate(zip(indptr[:-1].tolist(), indptr[1:].tolist())):
+            yield {
+                "": vectors[row].tolist(),
+                SPARSE_VECTOR_NAME: SparseVector(indices=indices[start:end].tolist(), values=values[start:end].tolist()),
+            }
+    else:
+        for row, payload in enumerate(payloads):
+            yield {"": vectors[row].tolist(), SPARSE_VECTOR_NAME: document_sparse_vector(payload.get("text", ""))}
+
+
+def _register_sources(collection: str, ids: list, payloads: list[dict], embedding: EmbeddingSpec, total: int) -> None:
+    """Rebuild the ingest manifest and the document registry rows of every source in the snapshot."""
+    sources: dict[str, tuple[str, list[str]]] = {}
+    for point_id, payload in zip(ids, payloads):
+        source = payload.get("source")
+        if source:
+            sources.setdefault(source, (payload.get("domain") or "general", []))[1].append(str(point_id))
+    for source, (domain, point_ids) in sources.items():
+        ingest_manifest.replace(collection, source, domain, point_ids)
+        document_registry.record(
+            {
+                "collection": collection,
+                "source": source,
+                "domain": domain,
+                "embed_model": embedding.model,
+                "chunks": len(point_ids),
+                "point_count": len(point_ids),
+                "point_ids_digest": point_set_digest(point_ids),
+                "collection_vectors": total,
+            }
+        )
+
+
+def _size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# ------------ API (snapshots live under SNAPSHOT_DIR, addressed by name) ------------
+
+
+def _snapshot_path(name: str) -> str:
+    if not _NAME_RE.match(name):
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot name '{name}' (letters, digits, '.', '_', '-').")
+    return os.path.join(snapshot_dir, name)
+
+
+def list_snapshots() -> list[dict]:
+    if not os.path.isdir(snapshot_dir):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(snapshot_dir)):
+        path = os.path.join(snapshot_dir, name)
+        try:
+            manifest = read_manifest(path)
+        except (LookupError, ValueError, OSError):
+            continue  # unrelated files, exports in progress
+        snapshots.append(
+            {
+                "name": name,
+                "collection": manifest["collection"],
+                "points": manifest["points"],
+                "dimensions": manifest["dimensions"],
+                "embedding": manifest["embedding"],
+                "created_at": manifest["created_at"],
+                "bytes": _size(path),
+            }
+        )
+    return snapshots
+
+
+def create_snapshot(collection: Optional[str] = None, name: Optional[str] = None) -> dict:
+    """Export `collection` (default: the configured one) to SNAPSHOT_DIR/<name>."""
+    collection = collection or qdrant_collection
+    name = name or f"{collection}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+    path = _snapshot_path(name)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    try:
+        manifest = export_collection(collection, path)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except (FileExistsError, RuntimeError) as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return {"name": name, **{key: manifest[key] for key in ("collection", "points", "dimensions", "embedding", "bytes", "seconds")}}
+
+
+def restore_snapshot(name: str, collection: Optional[str] = None, replace: bool = False) -> dict:
+    """Restore SNAPSHOT_DIR/<name> into `collection` (default: the one it was exported from)."""
+    path = _snapshot_path(name)
+    try:
+        return {"name": name, **import_collection(path, collection, replace=replace)}
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except FileExistsError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
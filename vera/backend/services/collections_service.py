@@ -7,7 +7,11 @@ from typing import Optional
 from fastapi import HTTPException
 
 from core.logger import get_logger
-from core.qdrant_client import client
+from core.qdrant_client import forget_collection, get_client
+from services.answer_cache import invalidate_answers
+from services.chat_sessions import chat_sessions
+from services.document_registry import document_registry
+from services.ingest_manifest import ingest_manifest
 
 logger = get_logger("vera.collections")
 
@@ -15,7 +19,7 @@ logger = get_logger("vera.collections")
 def list_collections() -> list[dict]:
     """Return all available collections in Qdrant."""
     try:
-        response = client.get_collections()
+        response = get_client().get_collections()
         collections = response.collections or []
         return [collection.dict() for collection in collections]
     except Exception as exc:
@@ -26,12 +30,12 @@ def list_collections() -> list[dict]:
 def get_collection(collection_id: str) -> dict:
     """Return information for a specific collection."""
     try:
-        if not client.collection_exists(collection_id):
+        if not get_client().collection_exists(collection_id):
             raise HTTPException(
                 status_code=404,
                 detail=f"Collection '{collection_id}' not found.",
             )
-        info = client.get_collection(collection_id)
+        info = get_client().get_collection(collection_id)
         return info.dict()
     except HTTPException:
         raise
@@ -47,12 +51,17 @@ def delete_collections(collection_id: Optional[str] = None) -> dict:
     """Delete a specific collection or all collections if none provided."""
     try:
         if collection_id:
-            if not client.collection_exists(collection_id):
+            if not get_client().collection_exists(collection_id):
                 raise HTTPException(
                     status_code=404,
                     detail=f"Collection '{collection_id}' not found.",
                 )
-            client.delete_collection(collection_id)
+            get_client().delete_collection(collection_id)
+            invalidate_answers(collection_id)
+            chat_sessions.forget_chunks(collection_id)
+            ingest_manifest.drop_collection(collection_id)
+            forget_collection(collection_id)
+            document_registry.delete_collection(collection_id)
             logger.info("Deleted qdrant collection: %s", collection_id)
             return {
                 "message": f"Deleted collection '{collection_id}'",
@@ -60,7 +69,7 @@ def delete_collections(collection_id: Optional[str] = None) -> dict:
                 "deleted_collections": [collection_id],
             }
 
-        response = client.get_collections()
+        response = get_client().get_collections()
         collections = response.collections or []
         if not collections:
             return {
@@ -72,7 +81,12 @@ def delete_collections(collection_id: Optional[str] = None) -> dict:
         deleted = []
         for collection in collections:
             name = collection.name
-            client.delete_collection(name)
+            get_client().delete_collection(name)
+            invalidate_answers(name)
+            chat_sessions.forget_chunks(name)
+            ingest_manifest.drop_collection(name)
+            forget_collection(name)
+            document_registry.delete_collection(name)
             deleted.append(name)
             logger.info("Deleted qdrant collection: %s", name)
 
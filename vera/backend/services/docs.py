@@ -1,15 +1,38 @@
 # get indexed docs
-from utils.metadata import load_metadata
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import HTTPException
+
 from core.logger import get_logger
+from services.document_registry import document_registry
 
 logger = get_logger("vera.docs")
 
-def get_indexed_docs():
-    try:
-        docs = load_metadata()
-        return docs
 
+def get_indexed_docs(
+    *,
+    collection: Optional[str] = None,
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> dict:
+    """A page of indexed documents, newest first, filtered by collection / domain / source."""
+    try:
+        docs, total = document_registry.list(
+            collection=collection, domain=domain, source=source, limit=limit, offset=offset
+        )
     except Exception as e:
         logger.exception(f"Failed to get indexed docs: {str(e)}")
-        return {"status": "error", "message": "Failed to get indexed docs: Internal server error"}
+        raise HTTPException(status_code=500, detail="Failed to get indexed docs: Internal server error") from e
 
+    next_offset = offset + len(docs)
+    return {
+        "items": docs,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None,
+    }
@@ -0,0 +1,196 @@
+# indexed document registry
+
+"""
+One row per (collection, source) describing the last ingest of that document: chunk counts,
+content hash, point-set digest, timings and domain. sqlite in WAL mode; writes go through one
+locked connection, reads use per-thread connections so listing documents never waits on an ingest.
+
+It also keeps a generation counter per collection, bumped whenever the collection's contents
+change (ingest, delete, restore), so every worker process can tell its cached answers are stale.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+
+from core.config import DATA_DIR, document_registry_path
+from core.logger import get_logger
+
+logger = get_logger("vera.document_registry")
+
+# written by earlier versions: a JSON list holding one entry per collection
+LEGACY_METADATA_FILE = os.path.join(DATA_DIR, "docs_metadata.json")
+
+_COLUMNS = (
+    "collection", "source", "domain", "embed_model",
+    "chunks", "chunks_upserted", "chunks_unchanged", "chunks_deleted",
+    "content_hash", "point_count", "point_ids_digest", "collection_vectors",
+    "timings", "first_indexed_at", "indexed_at",
+)
+
+
+class DocumentRegistry:
+    def __init__(self, path: str):
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._readers = threading.local()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # opened on first use, so importing the module neither touches files nor migrates legacy metadata
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+                    self._import_legacy()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " domain TEXT NOT NULL,"
+            " embed_model TEXT,"
+            " chunks INTEGER NOT NULL DEFAULT 0,"
+            " chunks_upserted INTEGER NOT NULL DEFAULT 0,"
+            " chunks_unchanged INTEGER NOT NULL DEFAULT 0,"
+            " chunks_deleted INTEGER NOT NULL DEFAULT 0,"
+            " content_hash TEXT,"
+            " point_count INTEGER NOT NULL DEFAULT 0,"
+            " point_ids_digest TEXT,"
+            " collection_vectors INTEGER,"
+            " timings TEXT,"
+            " first_indexed_at TEXT NOT NULL,"
+            " indexed_at TEXT NOT NULL,"
+            " PRIMARY KEY (collection, source))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_collection ON documents(collection, indexed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_domain ON documents(domain, indexed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS collection_generations ("
+            " collection TEXT PRIMARY KEY,"
+            " generation INTEGER NOT NULL)"
+        )
+        return conn
+
+    def record(self, document: dict) -> None:
+        """Insert or replace the row of one source; first_indexed_at survives re-ingests."""
+        row = {"indexed_at": _now(), **document}
+        if isinstance(row.get("timings"), dict):
+            row["timings"] = json.dumps(row["timings"])
+        columns = [c for c in _COLUMNS if c in row and c != "first_indexed_at"]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO documents ({', '.join(columns)}, first_indexed_at) "
+                f"VALUES ({', '.join('?' * len(columns))}, ?) "
+                f"ON CONFLICT (collection, source) DO UPDATE SET "
+                + ", ".join(f"{c} = excluded.{c}" for c in columns if c not in ("collection", "source")),
+                [*(row[c] for c in columns), row.get("first_indexed_at", row["indexed_at"])],
+            )
+
+    def list(
+        self,
+        *,
+        collection: Optional[str] = None,
+        domain: Optional[str] = None,
+        source: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """A page of documents (newest first) and the total number matching the filters."""
+        clauses, params = [], []
+        for column, value in (("collection", collection), ("domain", domain), ("source", source)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        reader = self._reader()
+        total = reader.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+        rows = reader.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM documents{where} ORDER BY indexed_at DESC LIMIT ? OFFSET ?",
+            [*params, limit, offset],
+        ).fetchall()
+        return [_document(row) for row in rows], total
+
+    def delete_collection(self, collection: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE collection = ?", (collection,))
+
+    def bump_generation(self, collection: Optional[str] = None) -> None:
+        """Mark `collection` (or every collection) as changed."""
+        with self._lock:
+            if collection is None:
+                self._conn.execute("UPDATE collection_generations SET generation = generation + 1")
+            else:
+                self._conn.execute(
+                    "INSERT INTO collection_generations (collection, generation) VALUES (?, 1) "
+                    "ON CONFLICT (collection) DO UPDATE SET generation = generation + 1",
+                    (collection,),
+                )
+
+    def generations(self, collections: Sequence[str]) -> tuple[int, ...]:
+        """Current generation of each collection, in order (0 for one that never changed)."""
+        rows = self._reader().execute(
+            f"SELECT collection, generation FROM collection_generations "
+            f"WHERE collection IN ({', '.join('?' * len(collections))})",
+            list(collections),
+        ).fetchall()
+        found = dict(rows)
+        return tuple(found.get(collection, 0) for collection in collections)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            # the writer connection creates the schema (and imports legacy metadata) first
+            self._conn
+            conn = sqlite3.connect(self._path, isolation_level=None)
+            self._readers.conn = conn
+        return conn
+
+    def _import_legacy(self) -> None:
+        if not os.path.exists(LEGACY_METADATA_FILE):
+            return
+        try:
+            with open(LEGACY_METADATA_FILE, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            for entry in entries:
+                self.record(
+                    {
+                        "collection": entry["collection"],
+                        "source": entry.get("source") or "unknown",
+                        "domain": entry.get("domain") or "general",
+                        "embed_model": entry.get("embed_model"),
+                        "collection_vectors": entry.get("vectors"),
+                        "indexed_at": entry.get("indexed_at") or _now(),
+                    }
+                )
+            os.replace(LEGACY_METADATA_FILE, LEGACY_METADATA_FILE + ".imported")
+            logger.info("Imported %s entries from %s", len(entries), LEGACY_METADATA_FILE)
+        except Exception as exc:
+            logger.warning("Could not import %s: %s", LEGACY_METADATA_FILE, exc)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _document(row: tuple) -> dict:
+    document = dict(zip(_COLUMNS, row))
+    document["timings"] = json.loads(document["timings"]) if document["timings"] else None
+    return document
+
+
+document_registry = DocumentRegistry(document_registry_path)
@@ -0,0 +1,460 @@
+# background ingestion jobs
+
+"""
+POST /ingest enqueues a job and returns immediately; a bounded pool of asyncio workers runs
+ingest_source() in the background. Job state lives in sqlite so GET /ingest/{job_id} survives
+restarts, and jobs that were queued or running when the process stopped are picked up again,
+resuming after the last batch qdrant acknowledged.
+
+Several processes (uvicorn --workers N) share the job table. A process runs a job only while it
+holds the job's lease (owner + lease_until, renewed every INGEST_JOB_LEASE_SECONDS / 3): a job is
+claimed with one conditional UPDATE, so an interrupted job is resumed by exactly one process.
+Jobs released at shutdown are claimed on the next start-up; jobs of a process that died are
+claimed by any live one once their lease runs out.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+from core.config import (
+    DATA_DIR,
+    ingest_job_db_path,
+    ingest_job_lease_seconds,
+    ingest_job_workers,
+    qdrant_collection,
+)
+from core.logger import get_logger
+from services.ingest_service import (
+    IngestProgress,
+    discard_partial_ingest,
+    ingest_source,
+    persist_upload,
+    source_lock,
+    target_collection,
+)
+
+logger = get_logger("vera.ingest_jobs")
+
+UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+
+ACTIVE_STATUSES = ("queued", "running")
+# progress rows are rewritten at most this often while a job runs (stage changes always persist)
+_PROGRESS_FLUSH_SECONDS = 1.0
+
+_COLUMNS = (
+    "id", "status", "stage", "source", "domain", "collection", "file_path", "url", "stream",
+    "chunks_embedded", "chunks_upserted", "batches_committed",
+    "created_at", "started_at", "finished_at", "error", "result", "owner", "lease_until",
+)
+
+
+class JobStore:
+    """sqlite-backed job table. Safe to share between the event loop and worker threads."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # opened on first use (the queue's start-up), so importing the module touches no files
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " domain TEXT NOT NULL,"
+            " collection TEXT,"
+            " file_path TEXT,"
+            " url TEXT,"
+            " stream INTEGER,"
+            " chunks_embedded INTEGER NOT NULL DEFAULT 0,"
+            " chunks_upserted INTEGER NOT NULL DEFAULT 0,"
+            " batches_committed INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " error TEXT,"
+            " result TEXT,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status)")
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(ingest_jobs)")}
+        if "collection" not in columns:
+            # job tables created before ingest could target a collection; NULL means QDRANT_COLLECTION
+            conn.execute("ALTER TABLE ingest_jobs ADD COLUMN collection TEXT")
+        # tables created before jobs were leased: unowned rows are free to claim
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE ingest_jobs ADD COLUMN owner TEXT")
+        if "lease_until" not in columns:
+            conn.execute("ALTER TABLE ingest_jobs ADD COLUMN lease_until REAL")
+        return conn
+
+    def insert(self, job: dict) -> None:
+        columns = [c for c in _COLUMNS if c in job]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO ingest_jobs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [job[c] for c in columns],
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM ingest_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> list[dict]:
+        query = f"SELECT {', '.join(_COLUMNS)} FROM ingest_jobs"
+        params: list = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def interrupted(self, now: float) -> list[dict]:
+        """Active jobs no live process holds: released at shutdown, or their owner's lease ran out."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM ingest_jobs WHERE status IN ('queued', 'running') "
+                "AND (owner IS NULL OR lease_until IS NULL OR lease_until < ?) ORDER BY created_at ASC",
+                (now,),
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def claim(self, job_id: str, owner: str, lease_until: float, now: float) -> bool:
+        """Take over an interrupted job and queue it again. False if another process got there first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE ingest_jobs SET owner = ?, lease_until = ?, status = 'queued' "
+                "WHERE id = ? AND status IN ('queued', 'running') "
+                "AND (owner IS NULL OR lease_until IS NULL OR lease_until < ?)",
+                (owner, lease_until, job_id, now),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self, owner: str, lease_until: float) -> set[str]:
+        """Extend the leases of `owner`'s active jobs; returns their ids."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingest_jobs SET lease_until = ? WHERE owner = ? AND status IN ('queued', 'running')",
+                (lease_until, owner),
+            )
+            rows = self._conn.execute(
+                "SELECT id FROM ingest_jobs WHERE owner = ? AND status IN ('queued', 'running')", (owner,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def release(self, owner: str) -> None:
+        """Hand `owner`'s unfinished jobs back, so the next process to start picks them up at once."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ingest_jobs SET owner = NULL, lease_until = NULL "
+                "WHERE owner = ? AND status IN ('queued', 'running')",
+                (owner,),
+            )
+
+
+class IngestJobQueue:
+    """Bounded pool of asyncio workers draining a queue of job ids."""
+
+    def __init__(self, store: JobStore, workers: int, lease_seconds: float):
+        self.store = store
+        self.workers = max(1, workers)
+        self.lease_seconds = max(1.0, lease_seconds)
+        # identifies this process's leases in the shared job table
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self._running: dict[str, asyncio.Task] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._worker_tasks) and not all(task.done() for task in self._worker_tasks)
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        await self._claim_interrupted()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"vera-ingest-worker-{n}") for n in range(self.workers)
+        ]
+        self._lease_task = asyncio.create_task(self._keep_leases(), name="vera-ingest-leases")
+
+    async def stop(self) -> None:
+        # running jobs stay 'running' in the store and resume on the next start-up
+        tasks = [*self._worker_tasks, *([self._lease_task] if self._lease_task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks, self._lease_task = [], None
+        await asyncio.to_thread(self.store.release, self.owner)
+
+    async def _claim_interrupted(self) -> None:
+        assert self._queue is not None
+        now = time.time()
+        for job in await asyncio.to_thread(self.store.interrupted, now):
+            claimed = await asyncio.to_thread(self.store.claim, job["id"], self.owner, now + self.lease_seconds, now)
+            if claimed:
+                logger.info("Resuming ingest job %s from batch %s", job["id"], job["batches_committed"])
+                self._queue.put_nowait(job["id"])
+
+    async def _keep_leases(self) -> None:
+        """Renew this process's leases, stop jobs cancelled through another process, adopt orphaned jobs."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                active = await asyncio.to_thread(self.store.renew, self.owner, time.time() + self.lease_seconds)
+                for job_id, task in list(self._running.items()):
+                    if job_id not in active:
+                        job = await asyncio.to_thread(self.store.get, job_id)
+                        if job is not None and job["status"] == "cancelled":
+                            self._cancel_task(task, job)
+                await self._claim_interrupted()
+            except Exception as exc:
+                logger.warning("Could not renew ingest job leases: %s", exc)
+
+    async def submit(
+        self,
+        *,
+        file: Optional[UploadFile],
+        url: Optional[str],
+        domain: str,
+        stream: Optional[bool],
+        collection: Optional[str] = None,
+    ) -> dict:
+        if not file and not url:
+            raise HTTPException(status_code=400, detail="Either 'file' or 'url' must be provided.")
+        collection = target_collection(collection)
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Ingest workers are not running.")
+
+        file_path = await persist_upload(file, directory=UPLOAD_DIR) if file else None
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "stage": "queued",
+            "source": (file.filename or "uploaded_file") if file else url,
+            "domain": domain,
+            "collection": collection,
+            "file_path": file_path,
+            "url": None if file else url,
+            "stream": None if stream is None else int(stream),
+            "created_at": now,
+            "owner": self.owner,
+            "lease_until": now + self.lease_seconds,
+        }
+        await asyncio.to_thread(self.store.insert, job)
+        self._queue.put_nowait(job["id"])
+        return job_status(await asyncio.to_thread(self.store.get, job["id"]))
+
+    async def cancel(self, job_id: str) -> dict:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found.")
+        if job["status"] not in ACTIVE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Ingest job '{job_id}' is already {job['status']}.")
+
+        now = time.time()
+        await asyncio.to_thread(self.store.update, job_id, status="cancelled", finished_at=now)
+        task = self._running.get(job_id)
+        if task is not None:
+            self._cancel_task(task, job)
+        elif job["owner"] in (None, self.owner) or (job["lease_until"] or 0.0) < now:
+            _remove_upload(job)
+        # else another live process runs it: it sees the cancel on its next lease renewal and cleans up
+        return job_status(await asyncio.to_thread(self.store.get, job_id))
+
+    @staticmethod
+    def _cancel_task(task: asyncio.Task, job: dict) -> None:
+        # a task cancelled before it started never reaches _run's own clean-up
+        task.add_done_callback(lambda done: _remove_upload(job) if done.cancelled() else None)
+        task.cancel()
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await asyncio.to_thread(self.store.get, job_id)
+                if job is None or job["status"] != "queued" or job["owner"] != self.owner:
+                    continue  # cancelled while waiting
+                # user cancellations are absorbed inside _run; a CancelledError here means shutdown
+                task = asyncio.create_task(self._run(job))
+                self._running[job_id] = task
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    # a job cancelled before it started; anything else is shutdown
+                    if not task.cancelled() or (await asyncio.to_thread(self.store.get, job_id))["status"] != "cancelled":
+                        raise
+            finally:
+                self._running.pop(job_id, None)
+                self._queue.task_done()
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["id"]
+        started_at = job["started_at"] or time.time()
+        await asyncio.to_thread(self.store.update, job_id, status="running", started_at=started_at)
+        last_flush = {"at": 0.0, "stage": job["stage"]}
+        # progress rows are written off the event loop by a single flusher that always writes the latest values
+        pending: dict = {"fields": None, "task": None}
+
+        async def flush() -> None:
+            while pending["fields"] is not None:
+                fields, pending["fields"] = pending["fields"], None
+                await asyncio.to_thread(self.store.update, job_id, **fields)
+
+        async def flushed() -> None:
+            if pending["task"] is not None:
+                await asyncio.gather(pending["task"], return_exceptions=True)
+
+        def persist(progress: IngestProgress) -> None:
+            now = time.monotonic()
+            if progress.stage == last_flush["stage"] and now - last_flush["at"] < _PROGRESS_FLUSH_SECONDS:
+                return
+            last_flush.update(at=now, stage=progress.stage)
+            pending["fields"] = {
+                "stage": progress.stage,
+                "chunks_embedded": progress.chunks_embedded,
+                "chunks_upserted": progress.chunks_upserted,
+                "batches_committed": progress.batches_committed,
+            }
+            if pending["task"] is None or pending["task"].done():
+                pending["task"] = asyncio.create_task(flush())
+
+        progress = IngestProgress(
+            stage=job["stage"],
+            chunks_embedded=job["chunks_embedded"],
+            chunks_upserted=job["chunks_upserted"],
+            batches_committed=job["batches_committed"],
+            on_update=persist,
+        )
+        # queued behind any other ingest of the same source; the clean-up below is part of the run
+        async with source_lock(job["source"], job["collection"]):
+            try:
+                result = await ingest_source(
+                    path=job["file_path"],
+                    filename=job["source"] if job["file_path"] else None,
+                    url=job["url"],
+                    domain=job["domain"],
+                    stream=None if job["stream"] is None else bool(job["stream"]),
+                    progress=progress,
+                    skip_batches=job["batches_committed"],
+                    collection=job["collection"],
+                )
+                final = {"status": "succeeded", "stage": "done", "result": json.dumps(result)}
+            except asyncio.CancelledError:
+                await flushed()
+                if (await asyncio.to_thread(self.store.get, job_id))["status"] != "cancelled":
+                    # shutdown, not a user cancel: leave it 'running' so it resumes, from the latest batch
+                    await asyncio.to_thread(
+                        self.store.update,
+                        job_id,
+                        chunks_embedded=progress.chunks_embedded,
+                        chunks_upserted=progress.chunks_upserted,
+                        batches_committed=progress.batches_committed,
+                    )
+                    raise
+                final = {"status": "cancelled", "stage": "cancelled"}
+            except HTTPException as exc:
+                final = {"status": "failed", "stage": "failed", "error": str(exc.detail)}
+            except Exception as exc:
+                logger.exception("Ingest job %s failed: %s", job_id, exc)
+                final = {"status": "failed", "stage": "failed", "error": str(exc)}
+
+            await flushed()
+            # a cancelled or failed job won't be resumed: drop the points it upserted so far
+            if final["status"] != "succeeded":
+                try:
+                    await discard_partial_ingest(job["source"], job["collection"])
+                except Exception as exc:
+                    logger.warning("Could not clean up after ingest job %s: %s", job_id, exc)
+
+        await asyncio.to_thread(
+            self.store.update,
+            job_id,
+            chunks_embedded=progress.chunks_embedded,
+            chunks_upserted=progress.chunks_upserted,
+            batches_committed=progress.batches_committed,
+            finished_at=time.time(),
+            **final,
+        )
+        _remove_upload(job)
+        logger.info("Ingest job %s %s", job_id, final["status"])
+
+
+def _remove_upload(job: dict) -> None:
+    if job["file_path"] and os.path.exists(job["file_path"]):
+        os.remove(job["file_path"])
+
+
+def job_status(job: dict) -> dict:
+    """Public view of a job row, with throughput derived from the upsert count."""
+    finished = job["finished_at"] or time.time()
+    elapsed = finished - job["started_at"] if job["started_at"] else 0.0
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "source": job["source"],
+        "domain": job["domain"],
+        "collection": job["collection"] or qdrant_collection,
+        "chunks_embedded": job["chunks_embedded"],
+        "chunks_upserted": job["chunks_upserted"],
+        "elapsed_s": round(elapsed, 3),
+        "chunks_per_s": round(job["chunks_upserted"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "created_at": job["created_at"],
+        "error": job["error"],
+        "result": json.loads(job["result"]) if job["result"] else None,
+    }
+
+
+job_queue = IngestJobQueue(JobStore(ingest_job_db_path), ingest_job_workers, ingest_job_lease_seconds)
+
+
+def get_job(job_id: str) -> dict:
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingest job '{job_id}' not found.")
+    return job_status(job)
+
+
+def list_jobs(status: Optional[str] = None, limit: int = 50) -> list[dict]:
+    return [job_status(job) for job in job_queue.store.list(status=status, limit=limit)]
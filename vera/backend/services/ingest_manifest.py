@@ -0,0 +1,167 @@
+# per-source manifest of indexed points
+
+"""
+Every chunk gets a deterministic point id derived from its source and its text, and the ids
+indexed for each (collection, source) are recorded here. A re-ingest diffs the new chunk ids
+against the manifest: unchanged chunks are neither embedded nor upserted, and chunks that
+disappeared from the document are deleted from qdrant.
+
+Ids are also recorded as pending before each upsert, so the points of an ingest that never finished
+(cancelled, failed, crashed) can still be found and deleted: they are not in the manifest yet.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from core.config import ingest_manifest_path
+from core.logger import get_logger
+
+logger = get_logger("vera.ingest_manifest")
+
+_POINT_NAMESPACE = uuid.UUID("9b7c3f0e-6a51-4f5e-9a86-0c6d2f1e4b27")
+
+
+def chunk_point_id(source: str, text: str) -> str:
+    """Stable qdrant point id for a chunk; identical text within one source maps to one point."""
+    return str(uuid.uuid5(_POINT_NAMESPACE, f"{source}\x00{text}"))
+
+
+def point_set_digest(point_ids: Iterable[str]) -> str:
+    """Order-independent digest of a source's point ids (recorded in the document registry)."""
+    return hashlib.sha256("\n".join(sorted(point_ids)).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SourceManifest:
+    source: str
+    domain: str
+    point_ids: set[str]
+    updated_at: float
+
+
+class IngestManifest:
+    """sqlite-backed (WAL) map of (collection, source) -> point ids."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # opened on first use, so importing the module touches no files
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._open()
+        return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest_sources ("
+            " collection TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " domain TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (collection, source))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest_points ("
+            " collection TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " point_id TEXT NOT NULL,"
+            " PRIMARY KEY (collection, source, point_id)) WITHOUT ROWID"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest_pending ("
+            " collection TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " point_id TEXT NOT NULL,"
+            " PRIMARY KEY (collection, source, point_id)) WITHOUT ROWID"
+        )
+        return conn
+
+    def get(self, collection: str, source: str) -> Optional[SourceManifest]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT domain, updated_at FROM manifest_sources WHERE collection = ? AND source = ?",
+                (collection, source),
+            ).fetchone()
+            if row is None:
+                return None
+            ids = self._conn.execute(
+                "SELECT point_id FROM manifest_points WHERE collection = ? AND source = ?",
+                (collection, source),
+            ).fetchall()
+        return SourceManifest(source=source, domain=row[0], point_ids={r[0] for r in ids}, updated_at=row[1])
+
+    def add_pending(self, collection: str, source: str, point_ids: Iterable[str]) -> None:
+        """Record ids an in-progress ingest is about to upsert."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO manifest_pending (collection, source, point_id) VALUES (?, ?, ?)",
+                ((collection, source, point_id) for point_id in point_ids),
+            )
+
+    def pending(self, collection: str, source: str) -> set[str]:
+        """Ids upserted for a source since its last successful ingest."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id FROM manifest_pending WHERE collection = ? AND source = ?",
+                (collection, source),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def clear_pending(self, collection: str, source: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM manifest_pending WHERE collection = ? AND source = ?", (collection, source)
+            )
+
+    def replace(self, collection: str, source: str, domain: str, point_ids: Iterable[str]) -> None:
+        """Atomically record the full point set of a source after a successful ingest (clears its pending ids)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM manifest_points WHERE collection = ? AND source = ?", (collection, source)
+                )
+                self._conn.execute(
+                    "DELETE FROM manifest_pending WHERE collection = ? AND source = ?", (collection, source)
+                )
+                self._conn.executemany(
+                    "INSERT INTO manifest_points (collection, source, point_id) VALUES (?, ?, ?)",
+                    ((collection, source, point_id) for point_id in point_ids),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO manifest_sources (collection, source, domain, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (collection, source, domain, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def drop_collection(self, collection: str) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM manifest_points WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM manifest_sources WHERE collection = ?", (collection,))
+            self._conn.execute("DELETE FROM manifest_pending WHERE collection = ?", (collection,))
+            self._conn.execute("COMMIT")
+
+
+ingest_manifest = IngestManifest(ingest_manifest_path)
@@ -2,22 +2,82 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
+import queue
+import re
 import tempfile
-import uuid
-from typing import Optional
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, Optional
 
-import pdfplumber
 from fastapi import HTTPException, UploadFile
-from unstructured.partition.auto import partition
-from unstructured.partition.html import partition_html
-from core.config import QDRANT_VECTOR_SIZE, gemini_embedding_model, qdrant_collection
-from core.gemini_client import embed_chunks_batched
-from core.qdrant_client import client, ensure_collection
-from utils.file_chunker import chunk_file
-from utils.metadata import update_metadata
-
-BATCH_SIZE = 50
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSelectorInclude,
+    PointIdsList,
+    PointStruct,
+    SetPayload,
+    SetPayloadOperation,
+)
+from core.config import (
+    ingest_batch_size,
+    ingest_pipeline_depth,
+    ingest_streaming,
+    qdrant_collection,
+    upload_spool_chunk_bytes,
+)
+from core.embedding_cache import get_embedding_cache
+from core.embedders import get_embedder
+from core.logger import get_logger
+from core.metrics import INGEST_CHUNKS, observe, track
+from core.qdrant_client import (
+    SPARSE_VECTOR_NAME,
+    get_async_client,
+    collection_specs,
+    ensure_collection_async,
+    qdrant_semaphore,
+    sparse_collections,
+)
+from services.answer_cache import invalidate_answers
+from services.chat_sessions import chat_sessions
+from services.document_registry import document_registry
+from services.ingest_manifest import chunk_point_id, ingest_manifest, point_set_digest
+from utils.file_chunker import Chunk, chunk_file, iter_batches, iter_chunks
+from utils.keyed_lock import KeyedLock
+from utils.pdf_extract import extract_pdf_text, iter_partitioned_pdf, iter_pdf_pages
+from utils.sparse import document_sparse_vector
+
+logger = get_logger("vera.ingest_service")
+
+BATCH_SIZE = ingest_batch_size
+_COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,254}$")
+# unchanged points whose offsets are checked (and rewritten) per qdrant request on a re-ingest
+_OFFSET_UPDATE_BATCH = 500
+# (collection, source) -> lock held for a whole ingest of that source, see source_lock()
+_source_locks = KeyedLock()
+
+
+@dataclass
+class IngestProgress:
+    """Live progress of one ingest; `on_update` is called after every change (used by the job queue)."""
+
+    stage: str = "queued"
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    # contiguous prefix of batches that qdrant acknowledged; a resumed ingest skips these
+    batches_committed: int = 0
+    on_update: Optional[Callable[["IngestProgress"], None]] = field(default=None, repr=False)
+
+    def update(self, **changes) -> None:
+        for name, value in changes.items():
+            setattr(self, name, value)
+        if self.on_update is not None:
+            self.on_update(self)
 
 
 async def ingest_document(
@@ -25,99 +85,647 @@ async def ingest_document(
     file: Optional[UploadFile] = None,
     url: Optional[str] = None,
     domain: Optional[str] = None,
+    stream: Optional[bool] = None,
+    collection: Optional[str] = None,
 ) -> dict:
     """
     Ingest content from either an uploaded document or a URL.
+    With stream=True (default: INGEST_STREAMING) uploads are extracted page by page and each
+    batch is embedded as soon as it fills, so memory stays flat regardless of document size.
+    `collection` (default: QDRANT_COLLECTION) is created if it doesn't exist yet.
     """
 
     if not file and not url:
         raise HTTPException(status_code=400, detail="Either 'file' or 'url' must be provided.")
+    collection = target_collection(collection)
+
+    source_label = (file.filename or "uploaded_file") if file else url
+    tmp_path: Optional[str] = None
+    try:
+        if file:
+            tmp_path = await persist_upload(file)
+        async with source_lock(source_label, collection):
+            try:
+                return await ingest_source(
+                    path=tmp_path,
+                    filename=file.filename if file else None,
+                    url=url,
+                    domain=domain,
+                    stream=stream,
+                    collection=collection,
+                )
+            except BaseException:
+                try:
+                    await discard_partial_ingest(source_label, collection)
+                except Exception as exc:
+                    logger.warning("Could not clean up the unfinished ingest of '%s': %s", source_label, exc)
+                raise
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def source_lock(source_label: str, collection: Optional[str] = None):
+    """
+    Held around an ingest of one source and the clean-up after it. Two runs at once would each
+    delete the other's freshly upserted points as stale and overwrite its manifest, so ingests of
+    the same (collection, source) in this process queue up here.
+    """
+    return _source_locks.hold((collection or qdrant_collection, source_label))
+
+
+async def ingest_source(
+    *,
+    path: Optional[str] = None,
+    filename: Optional[str] = None,
+    url: Optional[str] = None,
+    domain: Optional[str] = None,
+    stream: Optional[bool] = None,
+    progress: Optional[IngestProgress] = None,
+    skip_batches: int = 0,
+    collection: Optional[str] = None,
+) -> dict:
+    """
+    Ingest a document already on disk (`path`, with its original `filename`) or a URL into
+    `collection` (default: QDRANT_COLLECTION), which is created if it doesn't exist yet.
+    Re-ingesting a source only embeds and upserts the chunks that are new since its last ingest,
+    and deletes the ones that are gone.
+    `skip_batches` resumes an interrupted ingest: chunking is deterministic, so the first
+    `skip_batches` batches are known to be in qdrant already and are not re-embedded.
+    The caller owns `path` and is responsible for removing it, and holds source_lock() for the source.
+    """
 
     source_label: str
     raw_text: str
-    tmp_path: Optional[str] = None
+    collection_touched = False
+    timings: dict[str, float] = {"embed_s": 0.0, "upsert_s": 0.0}
+    started = time.perf_counter()
+    progress = progress or IngestProgress()
+
+    if stream is None:
+        stream = ingest_streaming
+    collection = target_collection(collection)
 
     try:
-        if file:
-            tmp_path = await _persist_upload(file)
-            raw_text = _extract_text_from_file(tmp_path, file.filename)
-            source_label = file.filename or "uploaded_file"
-        else:
-            assert url  # mypy/pyright appeasement
-            raw_text = _extract_text_from_url(url)
-            source_label = url
+        if path and stream:
+            source_label = filename or "uploaded_file"
+            await ensure_collection_async(name=collection, create=True)
+            previous_ids, previous_domain = await _previous_point_ids(source_label, collection)
+
+            progress.update(stage="extracting")
+            pipeline_start = time.perf_counter()
+            collection_touched = True
+            indexed = await _index_chunks(
+                _stream_batches(path, filename, timings),
+                source_label=source_label,
+                collection=collection,
+                domain=domain,
+                timings=timings,
+                progress=progress,
+                previous_ids=previous_ids,
+                skip_batches=skip_batches,
+            )
+            timings["pipeline_s"] = time.perf_counter() - pipeline_start
+            if not indexed.point_ids:
+                raise HTTPException(status_code=400, detail="No textual content could be extracted.")
+            await _reconcile_source(
+                indexed,
+                source_label=source_label,
+                collection=collection,
+                domain=domain,
+                previous_ids=previous_ids,
+                previous_domain=previous_domain,
+                timings=timings,
+            )
+            collection_touched = indexed.changed
+            return await _finish_ingest(indexed, source_label, collection, domain, timings, started, progress)
+
+        progress.update(stage="extracting")
+        stage_start = time.perf_counter()
+        async with track("extract", source="file" if path else "url"):
+            if path:
+                # pdfplumber / unstructured are CPU-bound; keep them off the event loop
+                raw_text = await asyncio.to_thread(_extract_text_from_file, path, filename)
+                source_label = filename or "uploaded_file"
+            else:
+                assert url  # mypy/pyright appeasement
+                raw_text = await asyncio.to_thread(_extract_text_from_url, url)
+                source_label = url
+        timings["extract_s"] = time.perf_counter() - stage_start
 
         if not raw_text.strip():
             raise HTTPException(status_code=400, detail="No textual content could be extracted.")
 
-        chunks = chunk_file(raw_text)
+        progress.update(stage="chunking")
+        stage_start = time.perf_counter()
+        async with track("chunk", chars=len(raw_text)):
+            chunks = await asyncio.to_thread(chunk_file, raw_text)
+        timings["chunk_s"] = time.perf_counter() - stage_start
         if not chunks:
             raise HTTPException(status_code=400, detail="Failed to generate chunks from content.")
 
-        ensure_collection()
+        await ensure_collection_async(name=collection, create=True)
+        previous_ids, previous_domain = await _previous_point_ids(source_label, collection)
+
+        pipeline_start = time.perf_counter()
+        collection_touched = True
+        indexed = await _index_chunks(
+            _batches_from(chunks),
+            source_label=source_label,
+            collection=collection,
+            domain=domain,
+            timings=timings,
+            progress=progress,
+            previous_ids=previous_ids,
+            skip_batches=skip_batches,
+        )
+        timings["pipeline_s"] = time.perf_counter() - pipeline_start
+        await _reconcile_source(
+            indexed,
+            source_label=source_label,
+            collection=collection,
+            domain=domain,
+            previous_ids=previous_ids,
+            previous_domain=previous_domain,
+            timings=timings,
+        )
+        collection_touched = indexed.changed
+        return await _finish_ingest(indexed, source_label, collection, domain, timings, started, progress)
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to ingest content: {exc}") from exc
+    finally:
+        if collection_touched:
+            # answers generated before this ingest may no longer reflect the collection
+            await asyncio.to_thread(invalidate_answers, collection)
+            chat_sessions.forget_chunks(collection)
+
+
+async def _finish_ingest(
+    indexed: IndexedSource,
+    source_label: str,
+    collection: str,
+    domain: Optional[str],
+    timings: dict[str, float],
+    started: float,
+    progress: IngestProgress,
+) -> dict:
+    """Record the document in the registry and build the API response."""
+
+    progress.update(stage="finalizing")
+
+    async with qdrant_semaphore:
+        count_response = await get_async_client().count(collection_name=collection, exact=True)
+    total_vectors = getattr(count_response, "count", len(indexed.point_ids))
+    rounded_timings = _round_timings(timings, started)
+    observe("ingest", rounded_timings["total_s"])
+    INGEST_CHUNKS.labels("upserted").inc(indexed.upserted)
+    INGEST_CHUNKS.labels("unchanged").inc(indexed.unchanged)
+    INGEST_CHUNKS.labels("deleted").inc(indexed.deleted)
+
+    await asyncio.to_thread(
+        document_registry.record,
+        {
+            "collection": collection,
+            "source": source_label,
+            "domain": domain or "general",
+            "embed_model": collection_specs[collection].model,
+            "chunks": len(indexed.point_ids),
+            "chunks_upserted": indexed.upserted,
+            "chunks_unchanged": indexed.unchanged,
+            "chunks_deleted": indexed.deleted,
+            "content_hash": indexed.content.hexdigest(),
+            "point_count": len(indexed.point_ids),
+            # ids are content-derived uuids, so the set is summarised by a digest; the ids are in the manifest
+            "point_ids_digest": point_set_digest(indexed.point_ids),
+            "collection_vectors": total_vectors,
+            "timings": rounded_timings,
+        },
+    )
+
+    cache = get_embedding_cache()
+    return {
+        "status": "success",
+        "message": "content_ingested_successfully",
+        "total_chunks": len(indexed.point_ids),
+        "chunks_upserted": indexed.upserted,
+        "chunks_unchanged": indexed.unchanged,
+        "chunks_deleted": indexed.deleted,
+        "collection_vectors": total_vectors,
+        "collection": collection,
+        "embedding_cache": cache.stats() if cache else None,
+        "timings": rounded_timings,
+    }
+
+
+@dataclass
+class IndexedSource:
+    """Outcome of indexing one document against its previous manifest."""
+
+    point_ids: set[str]
+    upserted: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    # sha256 over the chunk texts in document order
+    content: "hashlib._Hash" = field(default_factory=hashlib.sha256, repr=False)
+    # point id -> (start, end, section) of each unchanged chunk in the new version of the document
+    unchanged_offsets: dict[str, tuple[int, int, Optional[str]]] = field(default_factory=dict, repr=False)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.upserted or self.deleted)
+
+
+async def _index_chunks(
+    batches: AsyncIterator[list[Chunk]],
+    *,
+    source_label: str,
+    collection: str,
+    domain: Optional[str],
+    timings: dict[str, float],
+    progress: IngestProgress,
+    previous_ids: set[str],
+    skip_batches: int = 0,
+) -> IndexedSource:
+    """
+    Embed and upsert chunk batches as a bounded pipeline.
+    Point ids are derived from source + text, so chunks already listed in `previous_ids` are
+    skipped without an embedding call, and repeated chunks within the document collapse to one point.
+    Up to INGEST_PIPELINE_DEPTH batches are in flight at once and each batch is upserted
+    with wait=False as soon as its vectors arrive, so upserts overlap with the next embeddings.
+    A batch holds its slot until upserted, which back-pressures the producer and keeps memory flat.
+    The final batch is upserted with wait=True once every other upsert has been acknowledged;
+    qdrant applies updates in order, so that single call is the consistency barrier.
+    """
 
-        total_points = 0
-        for start in range(0, len(chunks), BATCH_SIZE):
-            batch = chunks[start : start + BATCH_SIZE]
-            vectors = embed_chunks_batched(
-                batch,
-                output_dimensionality=QDRANT_VECTOR_SIZE,
-                task_type="SEMANTIC_SIMILARITY"
+    depth = asyncio.Semaphore(max(1, ingest_pipeline_depth))
+    # chunks are embedded with whatever the (validated) collection was built with
+    spec = collection_specs[collection]
+    embedder = get_embedder(spec.provider)
+    if embedder.model != spec.model:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Collection '{collection}' was embedded with {spec.provider}/{spec.model}, "
+            f"but this server embeds with {spec.provider}/{embedder.model}.",
+        )
+    acknowledged: set[int] = set()
+    indexed = IndexedSource(point_ids=set())
+
+    def committed(index: int, count: int) -> None:
+        acknowledged.add(index)
+        prefix = progress.batches_committed
+        while prefix in acknowledged:
+            prefix += 1
+        progress.update(
+            stage="embedding",
+            chunks_upserted=progress.chunks_upserted + count,
+            batches_committed=prefix,
+        )
+
+    def fresh_chunks(batch: list[Chunk]) -> list[tuple[str, Chunk]]:
+        fresh = []
+        for chunk in batch:
+            indexed.content.update(chunk.text.encode("utf-8") + b"\0")
+            point_id = chunk_point_id(source_label, chunk.text)
+            if point_id in indexed.point_ids:
+                continue
+            indexed.point_ids.add(point_id)
+            if point_id in previous_ids:
+                indexed.unchanged += 1
+                indexed.unchanged_offsets[point_id] = (chunk.start, chunk.end, chunk.section)
+            else:
+                fresh.append((point_id, chunk))
+        return fresh
+
+    async def embed(batch: list[tuple[str, Chunk]]) -> list[PointStruct]:
+        texts = [chunk.text for _, chunk in batch]
+        stage_start = time.perf_counter()
+        vectors = await embedder.embed(texts, dimensions=spec.dimensions, task_type="SEMANTIC_SIMILARITY")
+        timings["embed_s"] += time.perf_counter() - stage_start
+        progress.update(stage="embedding", chunks_embedded=progress.chunks_embedded + len(batch))
+
+        if not vectors or len(vectors[0]) != spec.dimensions:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Embedding dimension mismatch. Expected {spec.dimensions}-d vectors from {spec.provider}, got {len(vectors[0]) if vectors else 0}.",
             )
 
-            if not vectors or len(vectors[0]) != QDRANT_VECTOR_SIZE:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Embedding dimension mismatch. Expected {QDRANT_VECTOR_SIZE}-d vectors from Gemini, got {len(vectors[0]) if vectors else 0}.",
+        hybrid = sparse_collections.get(collection, False)
+        return [
+            PointStruct(
+                id=point_id,
+                vector={"": vector, SPARSE_VECTOR_NAME: document_sparse_vector(chunk.text)} if hybrid else vector,
+                payload={
+                    "text": chunk.text,
+                    "source": source_label,
+                    "domain": domain or "general",
+                    "section": chunk.section,
+                    "start": chunk.start,
+                    "end": chunk.end,
+                },
+            )
+            for vector, (point_id, chunk) in zip(vectors, batch)
+        ]
+
+    async def upsert(points: list[PointStruct], *, wait: bool) -> int:
+        stage_start = time.perf_counter()
+        # recorded first, so the points of a run that never finishes can still be found and deleted
+        await asyncio.to_thread(
+            ingest_manifest.add_pending, collection, source_label, [str(point.id) for point in points]
+        )
+        async with qdrant_semaphore, track("qdrant_upsert", size=len(points), wait=wait):
+            await get_async_client().upsert(collection_name=collection, points=points, wait=wait)
+        timings["upsert_s"] += time.perf_counter() - stage_start
+        return len(points)
+
+    # upserts already sent; a cancelled ingest waits for them so its clean-up's delete lands after them
+    sent: set[asyncio.Task] = set()
+
+    async def embed_then_upsert(index: int, batch: list[tuple[str, Chunk]]) -> int:
+        try:
+            points = await embed(batch)
+            sending = asyncio.create_task(upsert(points, wait=False))
+            sent.add(sending)
+            sending.add_done_callback(sent.discard)
+            count = await asyncio.shield(sending)
+            committed(index, count)
+            return count
+        finally:
+            depth.release()
+
+    # hold one batch back so the last one can be upserted with wait=True as the barrier
+    tasks: set[asyncio.Task] = set()
+    held: Optional[list[tuple[str, Chunk]]] = None
+    held_index = -1
+    try:
+        async for index, batch in _aenumerate(batches):
+            fresh = fresh_chunks(batch)
+            if index < skip_batches:
+                # already in qdrant from an interrupted run
+                continue
+            if not fresh:
+                committed(index, 0)
+                continue
+            if held is not None:
+                await depth.acquire()
+                tasks.add(asyncio.create_task(embed_then_upsert(held_index, held)))
+                # collect finished batches; surfaces failures before the whole document is read
+                for finished in [t for t in tasks if t.done()]:
+                    tasks.discard(finished)
+                    indexed.upserted += finished.result()
+            held, held_index = fresh, index
+
+        if held is None:
+            return indexed
+
+        last_points = await embed(held)
+        indexed.upserted += sum(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*sent, return_exceptions=True)
+        aclose = getattr(batches, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        raise
+
+    progress.update(stage="upserting")
+    barrier_start = time.perf_counter()
+    count = await upsert(last_points, wait=True)
+    committed(held_index, count)
+    indexed.upserted += count
+    timings["barrier_s"] = time.perf_counter() - barrier_start
+    return indexed
+
+
+async def _previous_point_ids(source_label: str, collection: str) -> tuple[set[str], Optional[str]]:
+    """
+    Point ids (and domain) recorded for this source by its last ingest. Sources indexed before
+    the manifest existed carry random ids, so those are looked up in qdrant by payload instead.
+    """
+
+    manifest = await asyncio.to_thread(ingest_manifest.get, collection, source_label)
+    if manifest is not None:
+        return manifest.point_ids, manifest.domain
+
+    legacy: set[str] = set()
+    source_filter = Filter(must=[FieldCondition(key="source", match=MatchValue(value=source_label))])
+    offset = None
+    while True:
+        async with qdrant_semaphore:
+            records, offset = await get_async_client().scroll(
+                collection_name=collection,
+                scroll_filter=source_filter,
+                limit=1000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False,
+            )
+        legacy.update(str(record.id) for record in records)
+        if offset is None:
+            return legacy, None
+
+
+async def _reconcile_source(
+    indexed: IndexedSource,
+    *,
+    source_label: str,
+    collection: str,
+    domain: Optional[str],
+    previous_ids: set[str],
+    previous_domain: Optional[str],
+    timings: dict[str, float],
+) -> None:
+    """
+    Delete chunks that left the document, move unchanged ones to their new offsets (an edit earlier
+    in the document shifts them) and retag them on a domain change, then save the manifest.
+    """
+
+    domain = domain or "general"
+    stage_start = time.perf_counter()
+    # pending ids include points left behind by earlier runs that were cancelled or failed
+    pending = await asyncio.to_thread(ingest_manifest.pending, collection, source_label)
+    stale = (previous_ids | pending) - indexed.point_ids
+    if stale:
+        async with qdrant_semaphore, track("qdrant_delete", size=len(stale)):
+            await get_async_client().delete(
+                collection_name=collection,
+                points_selector=PointIdsList(points=list(stale)),
+                wait=True,
+            )
+        indexed.deleted = len(stale)
+
+    unchanged = previous_ids & indexed.point_ids
+    if unchanged and previous_domain is not None and previous_domain != domain:
+        async with qdrant_semaphore:
+            await get_async_client().set_payload(
+                collection_name=collection,
+                payload={"domain": domain},
+                points=list(unchanged),
+                wait=True,
+            )
+    await _update_offsets(indexed.unchanged_offsets, collection)
+    timings["reconcile_s"] = time.perf_counter() - stage_start
+
+    await asyncio.to_thread(ingest_manifest.replace, collection, source_label, domain, indexed.point_ids)
+
+
+async def _update_offsets(offsets: dict[str, tuple[int, int, Optional[str]]], collection: str) -> None:
+    """Rewrite start / end / section of the unchanged points whose stored values no longer match."""
+
+    point_ids = list(offsets)
+    fields = PayloadSelectorInclude(include=["start", "end", "section"])
+    for first in range(0, len(point_ids), _OFFSET_UPDATE_BATCH):
+        part = point_ids[first : first + _OFFSET_UPDATE_BATCH]
+        async with qdrant_semaphore:
+            records = await get_async_client().retrieve(
+                collection_name=collection, ids=part, with_payload=fields, with_vectors=False
+            )
+        operations = []
+        for record in records:
+            start, end, section = offsets[str(record.id)]
+            payload = record.payload or {}
+            if (payload.get("start"), payload.get("end"), payload.get("section")) != (start, end, section):
+                operations.append(
+                    SetPayloadOperation(
+                        set_payload=SetPayload(
+                            payload={"start": start, "end": end, "section": section}, points=[record.id]
+                        )
+                    )
+                )
+        if operations:
+            async with qdrant_semaphore, track("qdrant_set_offsets", size=len(operations)):
+                await get_async_client().batch_update_points(
+                    collection_name=collection, update_operations=operations, wait=True
                 )
 
-            points = [
-                {
-                    "id": str(uuid.uuid4()),
-                    "vector": vector,
-                    "payload": {
-                        "text": chunk,
-                        "source": source_label,
-                        "domain": domain or "general",
-                    },
-                }
-                for vector, chunk in zip(vectors, batch)
-            ]
-
-            client.upsert(collection_name=qdrant_collection, points=points, wait=True)
-            total_points += len(points)
-
-        count_response = client.count(collection_name=qdrant_collection, exact=True)
-        total_vectors = getattr(count_response, "count", total_points)
-
-        update_metadata(
-            collection=qdrant_collection,
-            vectors=total_vectors,
-            embed_model=gemini_embedding_model,
-            domain=domain or "general",
-            source=source_label,
+
+async def discard_partial_ingest(source_label: str, collection: Optional[str] = None) -> int:
+    """
+    Delete the points an unfinished ingest of `source_label` upserted that its last successful
+    ingest doesn't list; call it when an ingest is cancelled or fails rather than interrupted.
+    """
+
+    collection = collection or qdrant_collection
+
+    manifest = await asyncio.to_thread(ingest_manifest.get, collection, source_label)
+    pending = await asyncio.to_thread(ingest_manifest.pending, collection, source_label)
+    orphans = pending - (manifest.point_ids if manifest else set())
+    if orphans:
+        async with qdrant_semaphore, track("qdrant_delete", size=len(orphans)):
+            await get_async_client().delete(
+                collection_name=collection,
+                points_selector=PointIdsList(points=list(orphans)),
+                wait=True,
+            )
+        await asyncio.to_thread(invalidate_answers, collection)
+        chat_sessions.forget_chunks(collection)
+        logger.info("Deleted %s points of an unfinished ingest of '%s'", len(orphans), source_label)
+    await asyncio.to_thread(ingest_manifest.clear_pending, collection, source_label)
+    return len(orphans)
+
+
+def target_collection(collection: Optional[str]) -> str:
+    """The collection an ingest writes to: QDRANT_COLLECTION unless a valid name is given."""
+    if not collection:
+        return qdrant_collection
+    if not _COLLECTION_NAME_RE.match(collection):
+        raise HTTPException(
+            status_code=400,
+            detail="Collection names use letters, digits, '.', '_' and '-' (at most 255 characters).",
         )
+    return collection
 
-        return {
-            "status": "success",
-            "message": "content_ingested_successfully",
-            "total_chunks": total_points,
-            "collection_vectors": total_vectors,
-            "collection": qdrant_collection,
-        }
 
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to ingest content: {exc}") from exc
+async def _aenumerate(items: AsyncIterator[list[Chunk]]) -> AsyncIterator[tuple[int, list[Chunk]]]:
+    index = 0
+    async for item in items:
+        yield index, item
+        index += 1
+
+
+async def _batches_from(chunks: list[Chunk]) -> AsyncIterator[list[Chunk]]:
+    for start in range(0, len(chunks), BATCH_SIZE):
+        yield chunks[start : start + BATCH_SIZE]
+
+
+async def _stream_batches(
+    path: str,
+    original_name: Optional[str],
+    timings: dict[str, float],
+) -> AsyncIterator[list[Chunk]]:
+    """
+    Extract and chunk a document in a worker thread and yield batches as they fill.
+    A bounded hand-off queue means extraction pauses while the embedding pipeline is saturated.
+    """
+
+    handoff: queue.Queue = queue.Queue(maxsize=max(1, ingest_pipeline_depth))
+    stop = threading.Event()
+    done = object()
+
+    def hand_off(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def take() -> object:
+        # polls so a consumer cancelled mid-wait doesn't leave this thread blocked on an empty queue
+        while not stop.is_set():
+            try:
+                return handoff.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return done
+
+    def produce() -> None:
+        stage_start = time.perf_counter()
+        try:
+            pages = _iter_text_from_file(path, original_name)
+            for batch in iter_batches(iter_chunks(pages), BATCH_SIZE):
+                if not hand_off(batch):
+                    return
+            hand_off(done)
+        except BaseException as exc:
+            hand_off(exc)
+        finally:
+            # covers extraction + chunking, which are interleaved in streaming mode
+            timings["extract_s"] = time.perf_counter() - stage_start
+            observe("extract_chunk_stream", timings["extract_s"])
+
+    producer = threading.Thread(target=produce, name="vera-ingest-extract", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = await asyncio.to_thread(take)
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
     finally:
-        if file and tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        stop.set()
+
+
+def _round_timings(timings: dict[str, float], started: float) -> dict[str, float]:
+    rounded = {name: round(value, 3) for name, value in timings.items()}
+    rounded["total_s"] = round(time.perf_counter() - started, 3)
+    return rounded
 
 
-async def _persist_upload(file: UploadFile) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=_infer_suffix(file.filename)) as tmp:
-        tmp.write(await file.read())
+async def persist_upload(file: UploadFile, directory: Optional[str] = None) -> str:
+    """Spool the upload to disk in fixed-size pieces instead of reading it into memory at once."""
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=_infer_suffix(file.filename), dir=directory) as tmp:
+        while piece := await file.read(upload_spool_chunk_bytes):
+            await asyncio.to_thread(tmp.write, piece)
         return tmp.name
 
 
@@ -137,21 +745,47 @@ def _extract_text_from_file(path: str, original_name: Optional[str]) -> str:
         if text.strip():
             return text
         # fall back to unstructured if pdfplumber yielded nothing
+        return "\n".join(iter_partitioned_pdf(path))
+
+    # unstructured takes seconds to import; only pay for it when a non-PDF actually arrives
+    from unstructured.partition.auto import partition
 
     elements = partition(filename=path)
     return "\n".join(element.text for element in elements if getattr(element, "text", None))
 
 
 def _extract_text_from_pdf(path: str) -> str:
-    text_chunks = []
-    with pdfplumber.open(path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            if page_text:
-                text_chunks.append(page_text)
-    return "\n".join(text_chunks)
+    # page ranges are extracted in a process pool and reassembled in order
+    return extract_pdf_text(path)
+
+
+def _iter_text_from_file(path: str, original_name: Optional[str]) -> Iterator[str]:
+    """Streaming twin of _extract_text_from_file."""
+    suffix = ""
+    if original_name and "." in original_name:
+        suffix = original_name.rsplit(".", 1)[-1].lower()
+
+    if suffix == "pdf":
+        produced = False
+        for page_text in iter_pdf_pages(path):
+            if page_text.strip():
+                produced = True
+            yield page_text
+        if produced:
+            return
+        # fall back to unstructured if pdfplumber yielded nothing
+        yield from iter_partitioned_pdf(path)
+        return
+
+    from unstructured.partition.auto import partition
+
+    for element in partition(filename=path):
+        if getattr(element, "text", None):
+            yield element.text
 
 
 def _extract_text_from_url(url: str) -> str:
+    from unstructured.partition.html import partition_html
+
     elements = partition_html(url=url)
     return "\n".join(element.text for element in elements if getattr(element, "text", None))
\ No newline at end of file
@@ -2,76 +2,703 @@
 
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
 
-from core.config import QDRANT_VECTOR_SIZE, qdrant_collection
-from core.gemini_client import embed_chunks_batched, generate_response
+from fastapi import HTTPException
+from qdrant_client.http.models import FieldCondition, Filter, MatchValue, QueryRequest
+
+from core.config import (
+    chat_batch_concurrency,
+    chat_batch_max_questions,
+    chat_batch_search_size,
+    context_candidates,
+    context_mmr_lambda,
+    context_token_budget,
+    fanout_max_collections,
+    fanout_timeout_seconds,
+    hybrid_dense_top_k,
+    hybrid_dense_weight,
+    hybrid_rrf_k,
+    hybrid_sparse_top_k,
+    hybrid_sparse_weight,
+    qdrant_collection,
+    retrieval_top_k,
+)
+from core.embed_batcher import query_batcher
+from core.embedders import EmbeddingSpec, get_embedder
+from core.gemini_client import (
+    EmbeddingError,
+    GenerationError,
+    generate_response_async,
+    stream_response_async,
+)
 from core.logger import get_logger
-from core.qdrant_client import client, ensure_collection
+from core.metrics import CACHE_LOOKUPS, CONTEXT_TOKENS, FANOUT_FAILURES, QUERY_FALLBACKS, track
+from core.qdrant_client import (
+    SPARSE_VECTOR_NAME,
+    collection_specs,
+    get_async_client,
+    dense_search_params,
+    ensure_collection_async,
+    qdrant_semaphore,
+    sparse_collections,
+)
+from services.answer_cache import CachedAnswer, answer_cache, collection_key
+from services.chat_sessions import ChatSession, chat_sessions
+from utils.context_packer import estimate_tokens, pack_context
+from utils.fusion import reciprocal_rank_fusion
+from utils.sparse import query_sparse_vector
 
 logger = get_logger("vera.query_service")
 
-TOP_K = 3
+TOP_K = retrieval_top_k
+# hits the context packer chooses TOP_K passages from
+CANDIDATES = max(TOP_K, context_candidates)
 
 
-async def handle_query(question: str) -> dict:
-    """Handle a user query and return a response from LLM call."""
-    try:
-        ensure_collection()
+@dataclass(frozen=True)
+class SearchScope:
+    """
+    Where a question is searched: one or more collections (searched concurrently), and optional
+    payload filters served by the collections' keyword indexes.
+    """
 
-        # Use QUESTION_ANSWERING task type for queries (optimized for Q&A)
-        embeddings = embed_chunks_batched(
-            [question], 
-            batch_size=1, 
-            task_type="QUESTION_ANSWERING",
-            output_dimensionality=QDRANT_VECTOR_SIZE
+    domain: Optional[str] = None
+    source: Optional[str] = None
+    collections: tuple[str, ...] = (qdrant_collection,)
+
+    def filter(self) -> Optional[Filter]:
+        conditions = [
+            FieldCondition(key=key, match=MatchValue(value=value))
+            for key, value in (("domain", self.domain), ("source", self.source))
+            if value
+        ]
+        return Filter(must=conditions) if conditions else None
+
+    @property
+    def cache_key(self) -> str:
+        # answers are only reused for questions asked with the same filters
+        return "" if self.filter() is None else f"domain={self.domain or ''}|source={self.source or ''}"
+
+
+@dataclass
+class Retrieval:
+    """Outcome of the embed -> search -> answer cache (or pack) steps shared by every chat endpoint."""
+
+    question: str
+    scope: SearchScope = field(default_factory=SearchScope)
+    # what is embedded and searched when it differs from the question (a follow-up in a session)
+    search_text: Optional[str] = None
+    # the conversation so far, for the prompt (sessions only)
+    history: str = ""
+    # answered from the session's cached chunks without a search
+    reused: bool = False
+    # the question embedded once per embedder among the scope's collections
+    vectors: dict[EmbeddingSpec, list[float]] = field(default_factory=dict)
+    # the vector of the scope's first collection; keys the answer cache
+    query_vector: Optional[list[float]] = None
+    cache_version: Optional[tuple] = None
+    # every hit considered for the context, and the ones packed into it
+    candidates: list = field(default_factory=list)
+    hits: list = field(default_factory=list)
+    chunks: List[str] = field(default_factory=list)
+    cached: Optional[CachedAnswer] = None
+    fallback_reason: Optional[str] = None
+
+
+def search_scope(
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+) -> SearchScope:
+    """Validate the request's filters; no collections means the configured one."""
+    names = tuple(dict.fromkeys(name for name in collections or () if name)) or (qdrant_collection,)
+    if len(names) > fanout_max_collections:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {fanout_max_collections} collections per question, got {len(names)}.",
         )
-        if not embeddings or len(embeddings[0]) != QDRANT_VECTOR_SIZE:
-            logger.error("Embedding vector dimension mismatch for question.")
-            return _fallback_response(question, reason="embedding_mismatch")
+    return SearchScope(domain, source, names)
+
+
+def create_session(
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+) -> dict:
+    """Start a chat session; its scope applies to every turn that doesn't name its own."""
+    session = chat_sessions.create(search_scope(domain, source, collections))
+    return session.describe()
 
-        query_vector = embeddings[0]
 
-        results = client.search(
-            collection_name=qdrant_collection,
-            query_vector=query_vector,
-            limit=TOP_K,
+def get_session(session_id: str) -> dict:
+    return _open_session(session_id).describe()
+
+
+def delete_session(session_id: str) -> dict:
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Chat session '{session_id}' not found or expired.")
+    return {"status": "deleted", "session_id": session_id}
+
+
+def _open_session(
+    session_id: str,
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+) -> ChatSession:
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Chat session '{session_id}' not found or expired.")
+    if domain or source or collections:
+        session.rescope(search_scope(domain, source, collections))
+    return session
+
+
+async def handle_query(
+    question: str,
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+    session_id: Optional[str] = None,
+) -> dict:
+    """
+    Handle a user query and return a response from LLM call.
+    domain/source restrict retrieval; `collections` searches several collections at once.
+    With `session_id` the question is a turn of that conversation (see services.chat_sessions).
+    """
+    if session_id is None:
+        scope = search_scope(domain, source, collections)
+        try:
+            return await _answer(await _retrieve(question, scope))
+        except Exception as exc:
+            logger.exception("Query service failed: %s", exc)
+            return await _fallback_response(question, reason="exception", error=str(exc))
+
+    session = _open_session(session_id, domain, source, collections)
+    async with session.lock:
+        try:
+            retrieval = await _retrieve_turn(question, session)
+            result = await _answer(retrieval)
+        except Exception as exc:
+            logger.exception("Query service failed: %s", exc)
+            result = await _fallback_response(question, reason="exception", error=str(exc), history=session.history())
+            retrieval = None
+        if result.get("answer"):
+            session.add_turn(question, result["answer"])
+    return {**result, "session_id": session.id, "reused_context": bool(retrieval and retrieval.reused)}
+
+
+def batch_query(
+    questions: List[str],
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+) -> AsyncIterator[str]:
+    """
+    Answer many questions as NDJSON, one `{"index", "question", "answer", "sources", ...}` line
+    per question in completion order. All questions are embedded in as few calls as possible and
+    searched through Qdrant's batch API; at most CHAT_BATCH_CONCURRENCY generations run at once.
+    """
+    if not questions:
+        raise HTTPException(status_code=400, detail="'questions' must not be empty.")
+    if len(questions) > chat_batch_max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {chat_batch_max_questions} questions per batch, got {len(questions)}.",
         )
+    return _batch_lines(questions, search_scope(domain, source, collections))
 
-        retrieved_chunks: List[str] = [
-            hit.payload.get("text", "")
-            for hit in results
-            if hit.payload and hit.payload.get("text")
-        ]
 
-        if not retrieved_chunks:
-            return _fallback_response(question, reason="no_context")
+async def _batch_lines(questions: List[str], scope: SearchScope) -> AsyncIterator[str]:
+    try:
+        retrievals = await _retrieve_many(questions, scope)
+    except Exception as exc:
+        logger.exception("Batch retrieval failed: %s", exc)
+        retrievals = [Retrieval(question=question, scope=scope, fallback_reason="exception") for question in questions]
+
+    limit = asyncio.Semaphore(chat_batch_concurrency)
+
+    async def answer(index: int, retrieval: Retrieval) -> dict:
+        async with limit:
+            try:
+                result = await _answer(retrieval)
+            except Exception as exc:
+                logger.exception("Query service failed: %s", exc)
+                result = await _fallback_response(retrieval.question, reason="exception", error=str(exc))
+        return {"index": index, "question": retrieval.question, **result}
+
+    tasks = [asyncio.create_task(answer(index, retrieval)) for index, retrieval in enumerate(retrievals)]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield json.dumps(await completed) + "\n"
+    finally:
+        # the client went away: don't keep generating answers nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+async def _answer(retrieval: Retrieval) -> dict:
+    if retrieval.cached:
+        return {"answer": retrieval.cached.answer, "sources": retrieval.cached.sources, "cached": True}
+    if retrieval.fallback_reason:
+        return await _fallback_response(retrieval.question, reason=retrieval.fallback_reason, history=retrieval.history)
+
+    answer = await generate_response_async(_build_prompt(retrieval.question, retrieval.chunks, retrieval.history))
+    _remember_answer(retrieval, answer)
+    return {"answer": answer, "sources": retrieval.chunks}
+
+
+def stream_query(
+    question: str,
+    *,
+    domain: Optional[str] = None,
+    source: Optional[str] = None,
+    collections: Optional[List[str]] = None,
+    session_id: Optional[str] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one question: a `sources` event as soon as retrieval finishes,
+    then `token` events as gemini produces them, then `done` (or `error`).
+    If the client goes away the generator stops, which closes the upstream generation stream.
+    """
+    # validated before the response starts, so a bad request (or unknown session) is still a plain 4xx
+    if session_id is not None:
+        session = _open_session(session_id, domain, source, collections)
+        return _session_events(question, session, is_disconnected)
+    return _stream_events(question, search_scope(domain, source, collections), is_disconnected)
+
+
+async def _session_events(
+    question: str,
+    session: ChatSession,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+) -> AsyncIterator[str]:
+    async with session.lock:
+        try:
+            retrieval = await _retrieve_turn(question, session)
+        except Exception as exc:
+            logger.exception("Query service failed: %s", exc)
+            retrieval = Retrieval(question=question, scope=session.scope, fallback_reason="exception")
+            retrieval.history = session.history()
+
+        # a turn the client abandoned mid-answer never completes, so it isn't added to the conversation
+        events = _stream_events(
+            question,
+            session.scope,
+            is_disconnected,
+            retrieval=retrieval,
+            on_answer=lambda answer: session.add_turn(question, answer),
+            extra={"session_id": session.id, "reused_context": retrieval.reused},
+        )
+        async for event in events:
+            yield event
+
+
+async def _stream_events(
+    question: str,
+    scope: SearchScope,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+    *,
+    retrieval: Optional[Retrieval] = None,
+    on_answer: Optional[Callable[[str], None]] = None,
+    extra: Optional[dict] = None,
+) -> AsyncIterator[str]:
+    """`on_answer` gets the full answer once it has been streamed; `extra` is added to the sources event."""
+    if retrieval is None:
+        try:
+            retrieval = await _retrieve(question, scope)
+        except Exception as exc:
+            logger.exception("Query service failed: %s", exc)
+            retrieval = Retrieval(question=question, scope=scope, fallback_reason="exception")
+    extra = extra or {}
+
+    if retrieval.cached:
+        yield _sse("sources", {"sources": retrieval.cached.sources, "cached": True, **extra})
+        yield _sse("token", {"text": retrieval.cached.answer})
+        if on_answer is not None:
+            on_answer(retrieval.cached.answer)
+        yield _sse("done", {"cached": True})
+        return
+
+    if retrieval.fallback_reason:
+        QUERY_FALLBACKS.labels(retrieval.fallback_reason).inc()
+        yield _sse("sources", {"sources": [], "fallback": True, "reason": retrieval.fallback_reason, **extra})
+        prompt = _fallback_prompt(question, retrieval.history)
+    else:
+        yield _sse("sources", {"sources": retrieval.chunks, **extra})
+        prompt = _build_prompt(question, retrieval.chunks, retrieval.history)
+
+    parts: list[str] = []
+    try:
+        async for text in stream_response_async(prompt):
+            if is_disconnected is not None and await is_disconnected():
+                logger.info("Client disconnected mid-stream; cancelling generation")
+                return
+            parts.append(text)
+            yield _sse("token", {"text": text})
+    except GenerationError as exc:
+        yield _sse("error", {"message": str(exc)})
+        return
+
+    if not retrieval.fallback_reason:
+        _remember_answer(retrieval, "".join(parts))
+    if on_answer is not None and parts:
+        on_answer("".join(parts))
+    yield _sse("done", {"fallback": bool(retrieval.fallback_reason)})
+
+
+async def _retrieve(question: str, scope: SearchScope) -> Retrieval:
+    return (await _retrieve_many([question], scope))[0]
+
+
+async def _retrieve_many(questions: List[str], scope: SearchScope) -> List[Retrieval]:
+    retrievals = [Retrieval(question=question, scope=scope) for question in questions]
+    cache_collection = collection_key(scope.collections)
+
+    targets, embeddings = await _embed_for_scope(questions, scope)
+    # a fan-out missing its first collection answers from the rest, but doesn't touch the answer cache
+    primary = targets.get(scope.collections[0])
+
+    # capture the collection version before retrieval so an ingest racing with this query
+    # can't leave a stale answer cache entry behind
+    cache_version = await asyncio.to_thread(answer_cache.version, cache_collection) if answer_cache else None
+    for index, retrieval in enumerate(retrievals):
+        retrieval.vectors = {spec: vectors[index] for spec, vectors in embeddings.items()}
+        retrieval.query_vector = retrieval.vectors.get(primary)
+        if retrieval.query_vector is not None:
+            retrieval.cache_version = cache_version
 
+    results = await _search_many(retrievals, targets, scope) if targets else [[] for _ in retrievals]
+    for retrieval, hits in zip(retrievals, results):
+        hits = [hit for hit in hits if hit.payload and hit.payload.get("text")]
+        # near-duplicate questions that retrieved the same points reuse the earlier answer
+        if answer_cache and retrieval.cache_version is not None and hits:
+            retrieval.cached = answer_cache.lookup(
+                cache_collection,
+                retrieval.query_vector,
+                [str(hit.id) for hit in hits],
+                scope.cache_key,
+                version=retrieval.cache_version,
+            )
+            CACHE_LOOKUPS.labels("answer", "hit" if retrieval.cached else "miss").inc()
+            if retrieval.cached:
+                retrieval.candidates = hits
+                continue
+        _pack(retrieval, hits)
+        if not retrieval.chunks:
+            retrieval.fallback_reason = "no_context"
+    return retrievals
+
+
+async def _retrieve_turn(question: str, session: ChatSession) -> Retrieval:
+    """
+    Retrieval for one turn of a session. The first turn is an ordinary question (the answer cache
+    applies); a follow-up is searched together with the previous question and draws on the chunks
+    earlier turns retrieved. Its answer depends on the conversation, so it bypasses the answer cache.
+    """
+    if not session.has_history:
+        retrieval = await _retrieve(question, session.scope)
+        session.remember_hits(retrieval.candidates, retrieval.query_vector)
+        return retrieval
+
+    scope = session.scope
+    retrieval = Retrieval(question=question, scope=scope, search_text=session.search_text(question))
+    retrieval.history = session.history()
+    targets, embeddings = await _embed_for_scope([retrieval.search_text], scope)
+    retrieval.vectors = {spec: vectors[0] for spec, vectors in embeddings.items()}
+    retrieval.query_vector = retrieval.vectors.get(targets.get(scope.collections[0]))
+
+    cached = session.cached_hits(retrieval.query_vector)
+    retrieval.reused = session.reusable(retrieval.query_vector)
+    CACHE_LOOKUPS.labels("session_chunks", "hit" if retrieval.reused else "miss").inc()
+    if retrieval.reused:
+        candidates = fresh = cached
+    else:
+        fresh = (await _search_many([retrieval], targets, scope))[0] if targets else []
+        # fresh hits win over cached copies of the same point; cached ones were rescored against this search
+        seen = {str(hit.id) for hit in fresh}
+        candidates = sorted(
+            fresh + [hit for hit in cached if str(hit.id) not in seen],
+            key=lambda hit: hit.score or 0.0,
+            reverse=True,
+        )[:CANDIDATES]
+    session.remember_hits(fresh, retrieval.query_vector)
+
+    _pack(retrieval, [hit for hit in candidates if hit.payload and hit.payload.get("text")])
+    if not retrieval.chunks:
+        retrieval.fallback_reason = "no_context"
+    return retrieval
+
+
+async def _embed_for_scope(
+    texts: List[str],
+    scope: SearchScope,
+) -> tuple[dict[str, EmbeddingSpec], dict[EmbeddingSpec, List[list[float]]]]:
+    """The scope's usable collections with their embedder, and `texts` embedded once per embedder."""
+    targets = await _collection_specs(scope)
+    embeddings = await _embed_questions(texts, targets)
+    return {name: spec for name, spec in targets.items() if spec in embeddings}, embeddings
+
+
+async def _collection_specs(scope: SearchScope) -> dict[str, EmbeddingSpec]:
+    """
+    Validate the scope's collections and look up the embedder each was built with. A single
+    collection must validate; in a fan-out one that fails or is too slow is left out.
+    """
+    if len(scope.collections) == 1:
+        name = scope.collections[0]
+        await ensure_collection_async(name=name)
+        return {name: collection_specs[name]}
+
+    async def check(name: str) -> Optional[EmbeddingSpec]:
+        try:
+            await asyncio.wait_for(ensure_collection_async(name=name), timeout=fanout_timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Collection '%s' timed out after %.2fs; answering without it", name, fanout_timeout_seconds)
+            FANOUT_FAILURES.labels("timeout").inc()
+            return None
+        except Exception as exc:
+            logger.warning("Collection '%s' failed (%s); answering without it", name, exc)
+            FANOUT_FAILURES.labels("error").inc()
+            return None
+        return collection_specs.get(name)
+
+    specs = await asyncio.gather(*(check(name) for name in scope.collections))
+    return {name: spec for name, spec in zip(scope.collections, specs) if spec is not None}
+
+
+async def _embed_questions(
+    questions: List[str],
+    targets: dict[str, EmbeddingSpec],
+) -> dict[EmbeddingSpec, List[list[float]]]:
+    """
+    Embed the questions once per distinct embedder among `targets`, concurrently. With several
+    embedders one that fails only drops its collections; if every embedder fails the error propagates.
+    """
+    specs = list(dict.fromkeys(targets.values()))
+
+    async def embed(spec: EmbeddingSpec) -> List[list[float]]:
+        # Use QUESTION_ANSWERING task type for queries (optimized for Q&A)
+        # concurrent requests share provider calls through the micro-batcher
+        async with track("query_embed", provider=spec.provider, questions=len(questions)):
+            vectors = await query_batcher.embed(
+                get_embedder(spec.provider), questions, dimensions=spec.dimensions, task_type="QUESTION_ANSWERING"
+            )
+        if len(vectors) != len(questions) or any(len(vector) != spec.dimensions for vector in vectors):
+            logger.error("Embedding vector dimension mismatch for %s/%s.", spec.provider, spec.model)
+            raise EmbeddingError(f"{spec.provider} returned vectors that don't match {spec.dimensions} dimensions")
+        return vectors
+
+    if len(specs) == 1:
+        return {specs[0]: await embed(specs[0])}
+
+    results = await asyncio.gather(*(embed(spec) for spec in specs), return_exceptions=True)
+    embeddings = {spec: result for spec, result in zip(specs, results) if not isinstance(result, BaseException)}
+    for spec, result in zip(specs, results):
+        if isinstance(result, BaseException):
+            logger.warning("Embedding with %s failed (%s); answering without its collections", spec.provider, result)
+            FANOUT_FAILURES.labels("error").inc()
+    if specs and not embeddings:
+        raise results[0]
+    return embeddings
+
+
+def _pack(retrieval: Retrieval, hits: list) -> None:
+    """Keep the hits that made it into the context; the packed passages become the prompt's chunks."""
+    retrieval.candidates = hits
+    with track("pack_context", candidates=len(hits)):
+        passages = pack_context(hits, top_k=TOP_K, token_budget=context_token_budget, mmr_lambda=context_mmr_lambda)
+    retrieval.hits = [hit for passage in passages for hit in passage.hits]
+    retrieval.chunks = [passage.text for passage in passages]
+    CONTEXT_TOKENS.labels("selected").inc(sum(estimate_tokens(hit.payload["text"]) for hit in retrieval.hits))
+    CONTEXT_TOKENS.labels("packed").inc(sum(estimate_tokens(chunk) for chunk in retrieval.chunks))
+
+
+async def _search_many(
+    pending: List[Retrieval],
+    targets: dict[str, EmbeddingSpec],
+    scope: SearchScope,
+) -> List[list]:
+    """
+    Top CANDIDATES hits per question across the validated `targets`, each searched with the
+    question vector of its own embedder. Several collections are searched concurrently; one that
+    fails or exceeds FANOUT_TIMEOUT_SECONDS is left out rather than failing or delaying the whole
+    query. Every collection's hits carry cosine-scale scores (see _cosine_scaled), so they are
+    merged on score; cosine scores of collections built with different embedders are only roughly comparable.
+    """
+    payload_filter = scope.filter()
+
+    def queries(spec: EmbeddingSpec) -> List[tuple[str, list[float]]]:
+        return [(retrieval.search_text or retrieval.question, retrieval.vectors[spec]) for retrieval in pending]
+
+    if len(scope.collections) == 1:
+        name, spec = next(iter(targets.items()))
+        return await _search_collection(name, queries(spec), payload_filter)
+
+    async def search(name: str, spec: EmbeddingSpec) -> List[list]:
+        try:
+            hits = await asyncio.wait_for(
+                _search_collection(name, queries(spec), payload_filter), timeout=fanout_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Collection '%s' timed out after %.2fs; answering without it", name, fanout_timeout_seconds)
+            FANOUT_FAILURES.labels("timeout").inc()
+            return [[] for _ in pending]
+        except Exception as exc:
+            logger.warning("Collection '%s' failed (%s); answering without it", name, exc)
+            FANOUT_FAILURES.labels("error").inc()
+            return [[] for _ in pending]
+        return hits
+
+    per_collection = await asyncio.gather(*(search(name, spec) for name, spec in targets.items()))
+    return [
+        sorted((hit for hits in question_hits for hit in hits), key=lambda hit: hit.score, reverse=True)[:CANDIDATES]
+        for question_hits in zip(*per_collection)
+    ]
+
+
+async def _search_collection(
+    name: str,
+    queries: List[tuple[str, list[float]]],
+    payload_filter: Optional[Filter],
+) -> List[list]:
+    """
+    Dense search per question, plus a sparse BM25 leg when the collection supports it, sent
+    through Qdrant's batch query API (CHAT_BATCH_SEARCH_SIZE requests per call). The legs of
+    each question are merged with weighted reciprocal-rank fusion into its top CANDIDATES hits.
+    `payload_filter` applies to every leg; the collection has been validated by the caller.
+    """
+    hybrid = sparse_collections.get(name, False)
+    legs = [_query_requests(question, vector, payload_filter, hybrid) for question, vector in queries]
+    requests = [request for question_legs in legs for request in question_legs]
+
+    async def query(batch: List[QueryRequest]) -> list:
+        async with qdrant_semaphore, track("qdrant_search", collection=name, requests=len(batch)):
+            return await get_async_client().query_batch_points(collection_name=name, requests=batch)
+
+    responses = await asyncio.gather(
+        *(query(requests[i:i + chat_batch_search_size]) for i in range(0, len(requests), chat_batch_search_size))
+    )
+    ranked = iter([response.points for batch in responses for response in batch])
+
+    results = []
+    for question_legs in legs:
+        if len(question_legs) == 1:
+            results.append(next(ranked))
+        else:
+            dense_hits, sparse_hits = next(ranked), next(ranked)
+            fused = reciprocal_rank_fusion(
+                [dense_hits, sparse_hits],
+                [hybrid_dense_weight, hybrid_sparse_weight],
+                k=hybrid_rrf_k,
+                limit=CANDIDATES,
+            )
+            results.append(_cosine_scaled(fused, dense_hits))
+    return results
+
+
+def _cosine_scaled(fused: list, dense_hits: list) -> list:
+    """
+    Give the i-th fused hit the collection's i-th best dense cosine similarity. RRF scores only
+    order hits within one collection; this keeps that order while putting hybrid hits on the same
+    scale as a dense-only collection, whose i-th hit scores exactly that.
+    """
+    if not fused:
+        return fused
+    scores = [hit.score for hit in dense_hits] or [0.0]
+    # fewer dense than fused hits (a small or narrowly filtered collection): the tail gets the lowest
+    return [
+        hit.model_copy(update={"score": scores[min(rank, len(scores) - 1)]})
+        for rank, hit in enumerate(fused)
+    ]
+
+
+def _query_requests(
+    question: str,
+    query_vector: list[float],
+    payload_filter: Optional[Filter],
+    hybrid: bool,
+) -> List[QueryRequest]:
+    dense = QueryRequest(
+        query=query_vector,
+        filter=payload_filter,
+        limit=CANDIDATES,
+        params=dense_search_params(),
+        with_payload=True,
+        # MMR compares candidates by their dense vectors
+        with_vector=context_mmr_lambda < 1.0,
+    )
+    if not hybrid:
+        return [dense]
+
+    sparse_query = query_sparse_vector(question)
+    if not sparse_query.indices:
+        return [dense]
+
+    dense.limit = max(CANDIDATES, hybrid_dense_top_k)
+    sparse = QueryRequest(
+        query=sparse_query,
+        using=SPARSE_VECTOR_NAME,
+        filter=payload_filter,
+        limit=hybrid_sparse_top_k,
+        with_payload=True,
+    )
+    return [dense, sparse]
+
+
+def _build_prompt(question: str, retrieved_chunks: List[str], history: str = "") -> str:
+    with track("prompt", chunks=len(retrieved_chunks)):
         context = "\n\n".join(retrieved_chunks).strip()
-        prompt = (
-            "You are VERA AI, a legal research assistant. You are given a question and a "
-            "context. Answer strictly based on the context provided. If the context is not "
-            'relevant to the question, answer with "I\'m sorry, I don\'t have any information on that topic".\n'
-            f"Question: {question}\n"
-            f"Context: {context or '[no context]'}"
+    return (
+        "You are VERA AI, a legal research assistant. You are given a question and a "
+        "context. Answer strictly based on the context provided. If the context is not "
+        'relevant to the question, answer with "I\'m sorry, I don\'t have any information on that topic".\n'
+        + _conversation(history)
+        + f"Question: {question}\n"
+        f"Context: {context or '[no context]'}"
+    )
+
+
+def _fallback_prompt(question: str, history: str = "") -> str:
+    return f"You are VERA AI, a legal assistant. {_conversation(history)}Provide the best possible answer to:\n{question}"
+
+
+def _conversation(history: str) -> str:
+    # a follow-up is read in the light of the earlier turns; the context still decides the answer
+    return f"Conversation so far (for reference only):\n{history}\n" if history else ""
+
+
+def _remember_answer(retrieval: Retrieval, answer: str) -> None:
+    # follow-ups in a session have no cache version: their answers depend on the conversation
+    if answer_cache and answer and retrieval.query_vector is not None and retrieval.cache_version is not None:
+        answer_cache.store(
+            collection=collection_key(retrieval.scope.collections),
+            version=retrieval.cache_version,
+            question=retrieval.question,
+            question_vector=retrieval.query_vector,
+            point_ids=[str(hit.id) for hit in retrieval.candidates],
+            answer=answer,
+            sources=retrieval.chunks,
+            scope=retrieval.scope.cache_key,
         )
 
-        answer = generate_response(prompt)
-        return {"answer": answer, "sources": retrieved_chunks}
 
-    except Exception as exc:
-        logger.exception("Query service failed: %s", exc)
-        return _fallback_response(question, reason="exception", error=str(exc))
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
-def _fallback_response(question: str, *, reason: str, error: str | None = None) -> dict:
+async def _fallback_response(question: str, *, reason: str, error: str | None = None, history: str = "") -> dict:
     """
     Provide a graceful fallback by making a plain LLM call without context.
     """
+    QUERY_FALLBACKS.labels(reason).inc()
     try:
-        answer = generate_response(
-            f"You are VERA AI, a legal assistant. Provide the best possible answer to:\n{question}"
-        )
+        answer = await generate_response_async(_fallback_prompt(question, history))
         response = {"answer": answer, "sources": [], "fallback": True, "reason": reason}
         if error:
             response["error"] = error
@@ -0,0 +1,56 @@
+# readiness probe
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from core.embedders import get_embedder
+from core.gemini_client import warm_gemini
+from core.logger import get_logger
+from core.qdrant_client import ensure_collection_async, sparse_collections
+from core.config import qdrant_collection
+from services.ingest_jobs import job_queue
+
+logger = get_logger("vera.readiness")
+
+_CHECK_TIMEOUT_SECONDS = 5.0
+
+
+async def _check(name: str, probe: Callable[[], Awaitable[object]]) -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(probe(), timeout=_CHECK_TIMEOUT_SECONDS)
+        status = {"ok": True}
+    except Exception as exc:
+        logger.warning("Readiness check '%s' failed: %s", name, exc)
+        status = {"ok": False, "error": str(exc) or type(exc).__name__}
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return status
+
+
+async def check_readiness() -> tuple[bool, dict]:
+    """
+    Re-validate the collection schema and open connections to qdrant, the embedder and gemini
+    (generation), so the first real request after a deploy does not pay for them. Returns (ready, report).
+    """
+
+    embedder = get_embedder()
+    qdrant, embedding, gemini = await asyncio.gather(
+        _check("qdrant", lambda: ensure_collection_async(force=True)),
+        _check("embedder", embedder.warm),
+        _check("gemini", warm_gemini),
+    )
+    qdrant["collection"] = qdrant_collection
+    qdrant["hybrid"] = sparse_collections.get(qdrant_collection, False)
+    embedding["provider"] = embedder.name
+    embedding["model"] = embedder.model
+    checks = {
+        "qdrant": qdrant,
+        "embedder": embedding,
+        "gemini": gemini,
+        "ingest_workers": {"ok": job_queue.running},
+    }
+    ready = all(check["ok"] for check in checks.values())
+    return ready, {"status": "ready" if ready else "not_ready", "checks": checks}
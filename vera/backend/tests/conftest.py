@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# the app reads its configuration at import time: point it at throwaway state and the offline embedder
+os.environ.update(
+    {
+        "VERA_DATA_DIR": tempfile.mkdtemp(prefix="vera-tests-"),
+        "EMBEDDING_PROVIDER": "local",
+        "EMBEDDING_DIMENSIONS": "256",
+        "EMBEDDING_CACHE_ENABLED": "false",
+        "GEMINI_API_KEY": "test",
+        "QDRANT_COLLECTION": "vera_test",
+        "TRACE_SAMPLE_RATE": "0",
+    }
+)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    """In-memory Qdrant behind the app's clients, with no collection state carried between tests."""
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+
+    import core.qdrant_client as qdrant_module
+
+    monkeypatch.setattr(qdrant_module, "client", QdrantClient(location=":memory:"))
+    monkeypatch.setattr(qdrant_module, "async_client", AsyncQdrantClient(location=":memory:"))
+    qdrant_module.forget_collection()
+    yield qdrant_module
+    qdrant_module.forget_collection()
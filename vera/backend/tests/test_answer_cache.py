@@ -0,0 +1,53 @@
+from services.answer_cache import AnswerCache, collection_key
+from services.document_registry import DocumentRegistry
+
+LAWS = collection_key(["laws"])
+
+
+def _cache(generations=None) -> AnswerCache:
+    cache = AnswerCache(threshold=0.95, max_entries=10, ttl_seconds=0, match_top_n=2, generations=generations)
+    cache.store(
+        collection=LAWS,
+        version=cache.version(LAWS),
+        question="what is section 420 IPC",
+        question_vector=[1.0, 0.0],
+        point_ids=["s420-a", "s420-b", "s415"],
+        answer="Cheating.",
+        sources=["420. Cheating.—..."],
+    )
+    return cache
+
+
+def test_similar_question_with_same_retrieval_hits():
+    cached = _cache().lookup(LAWS, [0.99, 0.05], ["s420-b", "s420-a", "s300"])
+    assert cached is not None and cached.answer == "Cheating."
+
+
+def test_similar_question_with_different_retrieval_misses():
+    cache = _cache()
+    assert cache.lookup(LAWS, [0.99, 0.05], ["s302-a", "s302-b", "s420-a"]) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_dissimilar_question_misses():
+    assert _cache().lookup(LAWS, [0.0, 1.0], ["s420-a", "s420-b"]) is None
+
+
+def test_change_in_another_process_invalidates(tmp_path):
+    # two workers: separate caches over one registry file
+    path = str(tmp_path / "documents.sqlite3")
+    worker = _cache(DocumentRegistry(path).generations)
+    other = DocumentRegistry(path)
+    assert worker.lookup(LAWS, [1.0, 0.0], ["s420-a", "s420-b"]) is not None
+
+    other.bump_generation("unrelated")
+    assert worker.lookup(LAWS, [1.0, 0.0], ["s420-a", "s420-b"]) is not None
+
+    other.bump_generation("laws")
+    assert worker.lookup(LAWS, [1.0, 0.0], ["s420-a", "s420-b"]) is None
+    assert worker.stats()["entries"] == 0
+
+
+def test_collection_keys_do_not_collide():
+    assert collection_key(["a+b"]) != collection_key(["a", "b"])
+    assert collection_key(["b", "a"]) == collection_key(["a", "b"])
@@ -0,0 +1,41 @@
+import uuid
+
+from qdrant_client.http.models import PointStruct
+
+from core.embedders import configured_spec
+from core.qdrant_client import collection_schema
+from services.collection_snapshots import export_collection, import_collection
+from services.ingest_manifest import ingest_manifest
+
+
+def test_export_and_import_round_trip(qdrant, tmp_path):
+    client = qdrant.get_client()
+    spec = configured_spec()
+    client.create_collection(collection_name="laws", **collection_schema(dimensions=spec.dimensions, hybrid=False))
+    # payload keys missing or null on some points, in every column kind
+    payloads = [
+        {"text": "Whoever cheats ...", "source": "ipc.pdf", "domain": "law", "start": 0, "section": "Section 420"},
+        {"text": "Whoever commits murder ...", "source": "ipc.pdf", "domain": "law", "start": None, "score": 0.5},
+        {"text": "Equality before law.", "source": "constitution.pdf", "tags": ["art", 14], "flag": True},
+    ]
+    points = [
+        PointStruct(id=str(uuid.uuid4()), vector=[float(i + 1)] + [0.0] * (spec.dimensions - 1), payload=payload)
+        for i, payload in enumerate(payloads)
+    ]
+    client.upsert(collection_name="laws", points=points, wait=True)
+
+    manifest = export_collection("laws", str(tmp_path / "laws"))
+    assert manifest["points"] == 3
+
+    result = import_collection(str(tmp_path / "laws"), "laws_restored", hybrid=False, parallel=1)
+    assert result["points"] == 3
+
+    restored = {
+        str(record.id): record
+        for record in client.scroll(collection_name="laws_restored", limit=10, with_vectors=True)[0]
+    }
+    for point in points:
+        record = restored[point.id]
+        assert record.payload == {k: v for k, v in point.payload.items() if v is not None}
+        assert record.vector[0] > 0
+    assert len(ingest_manifest.get("laws_restored", "ipc.pdf").point_ids) == 2
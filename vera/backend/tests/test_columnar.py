@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils.columnar import decode_columns, encode_columns
+
+
+def _round_trip(rows: list[dict]) -> list[dict]:
+    arrays, columns = encode_columns(rows)
+    return decode_columns(arrays, columns, len(rows))
+
+
+@pytest.mark.parametrize(
+    ("kind", "values"),
+    [
+        ("int", [1, -2, 2**40]),
+        ("category", ["ipc", "ipc", "ipc", "constitution"]),
+        ("string", ["Section 1", "Section 2", "Section 3"]),
+        ("json", [1.5, True, [1, 2], {"a": "b"}, "mixed"]),
+    ],
+)
+def test_null_and_missing_values_round_trip(kind, values):
+    rows = []
+    for value in values:
+        rows += [{"key": value}, {"key": None}, {"other": 0}]
+    arrays, columns = encode_columns(rows)
+    assert columns[0]["kind"] == kind
+
+    expected = [{k: v for k, v in row.items() if v is not None} for row in rows]
+    assert _round_trip(rows) == expected
+
+
+def test_json_column_missing_on_some_points():
+    rows = [{"a": [1, 2]}, {"b": 1}]
+    assert _round_trip(rows) == rows
+
+
+def test_round_trip_through_npz(tmp_path):
+    rows = [{"text": "x", "start": 0, "tags": ["a"]}, {"text": "", "start": None}, {}]
+    arrays, columns = encode_columns(rows)
+    np.savez(tmp_path / "payloads.npz", **arrays)
+    with np.load(tmp_path / "payloads.npz") as loaded:
+        assert decode_columns(loaded, columns, len(rows)) == [{"text": "x", "start": 0, "tags": ["a"]}, {"text": ""}, {}]
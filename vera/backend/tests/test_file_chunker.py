@@ -0,0 +1,69 @@
+import time
+
+from utils.file_chunker import chunk_file, iter_chunks
+
+
+def _sections(text: str) -> list[tuple[str, str]]:
+    chunks = list(iter_chunks([text]))
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end] == chunk.text
+    return [(chunk.section, chunk.text) for chunk in chunks]
+
+
+def test_numbered_sections_with_body_on_heading_line():
+    text = (
+        "1. Short title.—This Act may be called the Indian Penal Code.\n"
+        "2. Extent.—It extends to the whole of India.\n"
+        "3. Commencement.—It shall come into force on such date as may be notified."
+    )
+    assert _sections(text) == [
+        ("Section 1", "1. Short title.—This Act may be called the Indian Penal Code."),
+        ("Section 2", "2. Extent.—It extends to the whole of India."),
+        ("Section 3", "3. Commencement.—It shall come into force on such date as may be notified."),
+    ]
+    assert len(chunk_file(text)) == 3
+
+
+def test_preamble_before_numbered_sections():
+    text = (
+        "THE INDIAN PENAL CODE\n"
+        "1. Short title.—This Act may be called the Indian Penal Code.\n"
+        "2. Extent.—It extends to the whole of India."
+    )
+    assert _sections(text) == [
+        (None, "THE INDIAN PENAL CODE"),
+        ("Section 1", "1. Short title.—This Act may be called the Indian Penal Code."),
+        ("Section 2", "2. Extent.—It extends to the whole of India."),
+    ]
+
+
+def test_section_after_continuation_line_is_kept():
+    text = (
+        "420. Cheating.—Whoever cheats and thereby dishonestly induces the person deceived\n"
+        "shall be punished with imprisonment and shall also be liable to fine.\n"
+        "421. Dishonest removal.—Whoever dishonestly removes any property shall be punished."
+    )
+    assert _sections(text) == [
+        (
+            "Section 420",
+            "420. Cheating.—Whoever cheats and thereby dishonestly induces the person deceived\n"
+            "shall be punished with imprisonment and shall also be liable to fine.",
+        ),
+        ("Section 421", "421. Dishonest removal.—Whoever dishonestly removes any property shall be punished."),
+    ]
+
+
+def test_long_single_line_is_linear():
+    # a PDF line with tabs rather than spaces between sentences: no space to stop a backward word search
+    def seconds(chars: int) -> float:
+        text = "Ab.\t" * (chars // 4)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            chunks = list(iter_chunks([text]))
+            best = min(best, time.perf_counter() - started)
+        assert chunks and all(text[chunk.start : chunk.end] == chunk.text for chunk in chunks)
+        return best
+
+    # 8x the input: ~8x the time when linear, ~64x when quadratic
+    assert seconds(320_000) < 20 * seconds(40_000)
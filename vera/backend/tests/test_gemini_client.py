@@ -0,0 +1,48 @@
+import asyncio
+import types
+
+import core.gemini_client as gemini
+from core.embedding_cache import EmbeddingCache
+
+
+class _EmbedModels:
+    def __init__(self):
+        self.configs = []
+
+    def _result(self, contents, config):
+        self.configs.append(config)
+        return types.SimpleNamespace(embeddings=[types.SimpleNamespace(values=[1.0, 0.0]) for _ in contents])
+
+    def embed_content(self, *, model, contents, config=None):
+        return self._result(contents, config)
+
+    async def aembed_content(self, *, model, contents, config=None):
+        return self._result(contents, config)
+
+
+def _fake_client(monkeypatch) -> _EmbedModels:
+    models = _EmbedModels()
+    aio = types.SimpleNamespace(models=types.SimpleNamespace(embed_content=models.aembed_content))
+    monkeypatch.setattr(gemini, "get_embedding_client", lambda: types.SimpleNamespace(models=models, aio=aio))
+    return models
+
+
+def test_task_type_is_sent_to_the_api(monkeypatch):
+    models = _fake_client(monkeypatch)
+
+    gemini.embed_chunks_batched(["a chunk"], task_type="SEMANTIC_SIMILARITY", output_dimensionality=2)
+    asyncio.run(gemini.embed_chunks_batched_async(["a question"], task_type="QUESTION_ANSWERING"))
+
+    assert [config.task_type for config in models.configs] == ["SEMANTIC_SIMILARITY", "QUESTION_ANSWERING"]
+    assert models.configs[0].output_dimensionality == 2
+
+
+def test_cached_vectors_are_kept_apart_by_task_type(monkeypatch, tmp_path):
+    models = _fake_client(monkeypatch)
+    monkeypatch.setattr(gemini, "get_embedding_cache", lambda: EmbeddingCache(str(tmp_path / "cache.db"), 100))
+
+    for task_type in ("SEMANTIC_SIMILARITY", "QUESTION_ANSWERING", "QUESTION_ANSWERING"):
+        asyncio.run(gemini.embed_chunks_batched_async(["same text"], task_type=task_type))
+
+    # the second question was served from the cache; the task types were not mixed up
+    assert [config.task_type for config in models.configs] == ["SEMANTIC_SIMILARITY", "QUESTION_ANSWERING"]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from services.ingest_jobs import IngestJobQueue, JobStore
+
+
+def _store(tmp_path) -> JobStore:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    now = time.time()
+    for job_id, status, owner, lease_until in (
+        ("released", "running", None, None),
+        ("orphaned", "running", "dead:1", now - 5),
+        ("leased", "running", "live:2", now + 60),
+        ("done", "succeeded", None, None),
+    ):
+        store.insert({
+            "id": job_id, "status": status, "stage": "embedding", "source": f"{job_id}.pdf",
+            "domain": "law", "created_at": now, "owner": owner, "lease_until": lease_until,
+        })
+    return store
+
+
+def test_only_unheld_jobs_are_interrupted(tmp_path):
+    store = _store(tmp_path)
+    assert [job["id"] for job in store.interrupted(time.time())] == ["released", "orphaned"]
+
+
+def test_claim_is_exclusive(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    assert store.claim("orphaned", "a", now + 60, now)
+    assert not store.claim("orphaned", "b", now + 60, now)
+    assert not store.claim("leased", "b", now + 60, now)
+    assert not store.claim("done", "b", now + 60, now)
+    assert store.get("orphaned")["status"] == "queued"
+
+
+def test_processes_starting_together_resume_each_job_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    _store(tmp_path)
+
+    async def claim_all() -> list[list[str]]:
+        queues = [IngestJobQueue(JobStore(path), workers=1, lease_seconds=60) for _ in range(4)]
+        for queue in queues:
+            queue._queue = asyncio.Queue()
+        await asyncio.gather(*(queue._claim_interrupted() for queue in queues))
+        return [[queue._queue.get_nowait() for _ in range(queue._queue.qsize())] for queue in queues]
+
+    claimed = [job_id for ids in asyncio.run(claim_all()) for job_id in ids]
+    assert sorted(claimed) == ["orphaned", "released"]
+
+
+def test_release_and_renew(tmp_path):
+    store = _store(tmp_path)
+    now = time.time()
+    assert store.renew("live:2", now + 120) == {"leased"}
+    store.release("live:2")
+    assert "leased" in {job["id"] for job in store.interrupted(now)}
@@ -0,0 +1,99 @@
+import asyncio
+import io
+
+from fastapi import UploadFile
+from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+import services.ingest_service as ingest_service
+from services.ingest_manifest import ingest_manifest
+
+
+def _act(version: str, sections: int = 120) -> str:
+    return "\n".join(
+        f"{n}. Section {n} of the {version} Act.—Whoever commits offence {n} under version {version} "
+        f"shall be punished with imprisonment which may extend to {n} years, or with fine."
+        for n in range(1, sections + 1)
+    )
+
+
+def _lines(path: str, original_name=None):
+    with open(path, encoding="utf-8") as f:
+        yield from f.read().split("\n")
+
+
+async def _points(qdrant, collection: str, source: str) -> set[str]:
+    records, _ = await qdrant.get_async_client().scroll(
+        collection_name=collection,
+        scroll_filter=Filter(must=[FieldCondition(key="source", match=MatchValue(value=source))]),
+        limit=10_000,
+    )
+    return {str(record.id) for record in records}
+
+
+def test_concurrent_ingests_of_one_source_leave_a_consistent_manifest(qdrant, monkeypatch):
+    # plain-text "documents" read line by line, and an embedder slow enough for the runs to interleave
+    monkeypatch.setattr(ingest_service, "_iter_text_from_file", _lines)
+    embedder = ingest_service.get_embedder("local")
+    original_embed = embedder.embed
+
+    async def slow_embed(texts, **kwargs):
+        await asyncio.sleep(0.01)
+        return await original_embed(texts, **kwargs)
+
+    monkeypatch.setattr(embedder, "embed", slow_embed)
+    monkeypatch.setattr(ingest_service, "BATCH_SIZE", 8)
+
+    async def ingest(version: str) -> dict:
+        upload = UploadFile(file=io.BytesIO(_act(version).encode("utf-8")), filename="penal_code.txt")
+        return await ingest_service.ingest_document(file=upload, domain="law", stream=True)
+
+    async def run() -> tuple[set[str], set[str]]:
+        await asyncio.gather(ingest("old"), ingest("new"))
+        collection = qdrant.qdrant_collection
+        manifest = await asyncio.to_thread(ingest_manifest.get, collection, "penal_code.txt")
+        assert not await asyncio.to_thread(ingest_manifest.pending, collection, "penal_code.txt")
+        return manifest.point_ids, await _points(qdrant, collection, "penal_code.txt")
+
+    listed, stored = asyncio.run(run())
+    assert listed and listed == stored
+
+
+def test_failed_ingest_leaves_no_points_behind(qdrant, monkeypatch):
+    monkeypatch.setattr(ingest_service, "_iter_text_from_file", _lines)
+    monkeypatch.setattr(ingest_service, "BATCH_SIZE", 8)
+    embedder = ingest_service.get_embedder("local")
+    original_embed = embedder.embed
+    calls = []
+
+    async def failing_embed(texts, **kwargs):
+        calls.append(len(texts))
+        if len(calls) == 4:
+            raise RuntimeError("embedding provider down")
+        return await original_embed(texts, **kwargs)
+
+    monkeypatch.setattr(embedder, "embed", failing_embed)
+
+    async def run() -> set[str]:
+        client = qdrant.get_async_client()
+        original_upsert = client.upsert
+
+        async def slow_upsert(*args, **kwargs):
+            async def on_the_wire():
+                await asyncio.sleep(0.2)
+                return await original_upsert(*args, **kwargs)
+
+            # a request the server already has: cancelling the caller doesn't stop it from being applied
+            return await asyncio.shield(on_the_wire())
+
+        monkeypatch.setattr(client, "upsert", slow_upsert)
+        upload = UploadFile(file=io.BytesIO(_act("failing").encode("utf-8")), filename="failing.txt")
+        try:
+            await ingest_service.ingest_document(file=upload, domain="law", stream=True)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("the ingest should have failed")
+        await asyncio.sleep(0.3)
+        return await _points(qdrant, qdrant.qdrant_collection, "failing.txt")
+
+    assert asyncio.run(run()) == set()
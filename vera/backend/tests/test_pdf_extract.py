@@ -0,0 +1,24 @@
+import os
+
+import pdfplumber.page
+
+from utils.pdf_extract import iter_pdf_pages
+
+PDF = os.path.join(os.path.dirname(__file__), "..", "..", "pdfs_", "information_technology_act_2000_updated.pdf")
+
+
+def test_serial_extraction_is_lazy(monkeypatch):
+    extracted = []
+    original = pdfplumber.page.Page.extract_text
+
+    def extract_text(page, *args, **kwargs):
+        extracted.append(page.page_number)
+        return original(page, *args, **kwargs)
+
+    monkeypatch.setattr(pdfplumber.page.Page, "extract_text", extract_text)
+
+    pages = iter_pdf_pages(PDF, workers=1)
+    first = next(pages)
+    assert first and len(extracted) <= 2
+    pages.close()
+
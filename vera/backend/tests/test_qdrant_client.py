@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+from qdrant_client.http.models import PointStruct
+
+
+def test_validation_locks_are_dropped(qdrant):
+    async def run() -> None:
+        await qdrant.ensure_collection_async()
+        for n in range(20):
+            with pytest.raises(LookupError):
+                await qdrant.ensure_collection_async(name=f"missing-{n}")
+        await qdrant.ensure_collection_async(name="created", create=True)
+        assert await qdrant.get_async_client().collection_exists("created")
+
+    asyncio.run(run())
+    assert len(qdrant._validate_locks) == 0
+
+
+def test_existing_collection_is_kept(qdrant):
+    dense = [1.0] * qdrant.QDRANT_VECTOR_SIZE
+    vector = {"": dense} if qdrant.hybrid_search_enabled else dense
+
+    async def run() -> int:
+        await qdrant.ensure_collection_async()
+        await qdrant.get_async_client().upsert(
+            collection_name=qdrant.qdrant_collection,
+            points=[PointStruct(id=1, vector=vector, payload={"text": "x"})],
+            wait=True,
+        )
+        await qdrant.ensure_collection_async(force=True)
+        return (await qdrant.get_async_client().count(qdrant.qdrant_collection)).count
+
+    assert asyncio.run(run()) == 1
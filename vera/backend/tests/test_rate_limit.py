@@ -0,0 +1,145 @@
+import asyncio
+import types
+
+import pytest
+
+from core import rate_limit
+from core.rate_limit import RateLimiter, _Bucket, retry_after
+
+
+class _ApiError(Exception):
+    def __init__(self, message="", code=None, headers=None, details=None):
+        super().__init__(message)
+        self.code = code
+        self.response = types.SimpleNamespace(headers=headers) if headers is not None else None
+        self.details = details
+
+
+def test_bucket_refills_at_the_quota_rate():
+    bucket = _Bucket(60)  # one request a second, one second of burst
+    start = bucket.updated
+
+    assert bucket.reserve(1, start) == 0.0
+    # the bucket is empty: the next call waits a full second, the one after that two
+    assert bucket.reserve(1, start) == pytest.approx(1.0)
+    assert bucket.reserve(1, start) == pytest.approx(2.0)
+    # three seconds later the debt is paid off and one second's worth has come back
+    assert bucket.reserve(1, start + 3) == 0.0
+    assert bucket.reserve(1, start + 3) == pytest.approx(1.0)
+
+
+def test_bucket_never_holds_more_than_its_burst():
+    bucket = _Bucket(60)
+    start = bucket.updated
+
+    # an hour idle still only refills one second of quota
+    assert bucket.reserve(1, start + 3600) == 0.0
+    assert bucket.reserve(1, start + 3600) == pytest.approx(1.0)
+
+
+def test_oversized_reservation_waits_for_a_full_bucket():
+    bucket = _Bucket(600)  # ten tokens of burst
+    start = bucket.updated
+
+    assert bucket.reserve(1_000, start) == 0.0
+    assert bucket.reserve(10, start) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (_ApiError(headers={"retry-after": "7"}), 7.0),
+        (_ApiError(headers={"retry-after": "-3"}), 0.0),
+        (
+            _ApiError(details=[types.SimpleNamespace(retry_delay=types.SimpleNamespace(seconds=4, nanos=500_000_000))]),
+            4.5,
+        ),
+        (_ApiError('429 RESOURCE_EXHAUSTED {"@type": "RetryInfo", "retryDelay": "12s"}'), 12.0),
+        (_ApiError("retry_delay {\n  seconds: 30\n}"), 30.0),
+        # a malformed header falls through to the message
+        (_ApiError('"retryDelay": "2.5s"', headers={"retry-after": "soon"}), 2.5),
+        (_ApiError("503 Service Unavailable"), None),
+    ],
+)
+def test_retry_after_reads_every_hint_format(error, expected):
+    assert retry_after(error) == expected
+
+
+def test_pause_holds_back_every_caller(monkeypatch):
+    monkeypatch.setattr(rate_limit, "PAUSE_JITTER", 0.0)
+    limiter = RateLimiter("test")
+
+    assert limiter._reserve(0) == 0.0
+    limiter.pause(5.0)
+    for _ in range(3):
+        assert limiter._reserve(0) == pytest.approx(5.0, abs=0.1)
+    # a shorter pause doesn't cut a longer one short
+    limiter.pause(1.0)
+    assert limiter._reserve(0) == pytest.approx(5.0, abs=0.1)
+
+
+def test_reservations_during_a_pause_are_paced_from_its_end(monkeypatch):
+    monkeypatch.setattr(rate_limit, "PAUSE_JITTER", 0.0)
+    limiter = RateLimiter("test", requests_per_minute=60)
+
+    limiter.pause(5.0)
+    assert limiter._reserve(0) == pytest.approx(5.0, abs=0.1)
+    assert limiter._reserve(0) == pytest.approx(6.0, abs=0.1)
+
+
+def test_throttled_call_pauses_the_limiter():
+    from core.gemini_client import _retry_delay
+
+    limiter = RateLimiter("test")
+    delay = _retry_delay(limiter, _ApiError(code=429, headers={"retry-after": "3"}), 0, 5, 1.0)
+
+    assert 3.0 <= delay <= 3.3
+    assert limiter._reserve(0) >= 2.9
+    # other retryable failures back off the one caller only
+    other = RateLimiter("other")
+    assert _retry_delay(other, _ApiError(code=503), 0, 5, 1.0) is not None
+    assert other._reserve(0) == 0.0
+
+
+def test_stream_waits_for_quota_without_holding_a_slot(monkeypatch):
+    import core.gemini_client as gemini
+
+    class _Stream:
+        def __init__(self):
+            self.pieces = iter(["an ", "answer"])
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return types.SimpleNamespace(text=next(self.pieces))
+            except StopIteration:
+                raise StopAsyncIteration
+
+    class _Model:
+        async def generate_content_async(self, prompt, stream=False):
+            return _Stream()
+
+    async def scenario():
+        semaphore = asyncio.Semaphore(1)
+        limiter = RateLimiter("generate")
+        monkeypatch.setattr(gemini, "generate_semaphore", semaphore)
+        monkeypatch.setattr(gemini, "generate_limiter", limiter)
+        monkeypatch.setattr(gemini, "get_generative_model", lambda: _Model())
+        monkeypatch.setattr(rate_limit, "PAUSE_JITTER", 0.0)
+
+        limiter.pause(0.3)
+        stream = asyncio.ensure_future(_collect(gemini.stream_response_async("question")))
+        await asyncio.sleep(0.1)
+        # the stream is waiting out the pause; the connection slot is free for others
+        assert not stream.done()
+        assert not semaphore.locked()
+        assert await stream == "an answer"
+        assert not semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+async def _collect(pieces) -> str:
+    return "".join([piece async for piece in pieces])
@@ -0,0 +1,171 @@
+# collection layout migration
+
+"""
+Rebuild a qdrant collection into a new vector layout without calling the embedding API.
+
+Gemini embeddings are Matryoshka vectors, so a 768/1536-d embedding is the leading slice of the
+3072-d one: shrinking the dimension is a truncation of the stored vectors. Quantization and on-disk
+settings are collection config. The embedder recorded in the source's metadata carries over; only gemini
+vectors can be truncated (the local n-gram embedder hashes into the full dimension). Sparse BM25 vectors are copied, or computed from the payload text
+when the source collection predates hybrid search.
+
+    cd vera/backend
+    python -m tools.migrate_collection --dimensions 768 --quantization binary --in-place
+    python -m tools.migrate_collection --source vera_docs --target vera_docs_scalar --quantization scalar
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from qdrant_client.http.models import PointStruct  # noqa: E402
+
+from core.config import (  # noqa: E402
+    QDRANT_VECTOR_SIZE,
+    QUANTIZATION_MODES,
+    SUPPORTED_VECTOR_SIZES,
+    hybrid_search_enabled,
+    qdrant_collection,
+    qdrant_quantization,
+    qdrant_vectors_on_disk,
+)
+from core.logger import get_logger  # noqa: E402
+from core.qdrant_client import (  # noqa: E402
+    SPARSE_VECTOR_NAME,
+    collection_schema,
+    create_payload_indexes,
+    embedding_spec,
+    get_client,
+    split_vectors,
+)
+from utils.sparse import document_sparse_vector  # noqa: E402
+
+logger = get_logger("vera.migrate_collection")
+
+
+def _truncate(vector: list[float], dimensions: int) -> list[float]:
+    # qdrant normalizes for cosine distance, so the truncated prefix needs no rescaling here
+    return vector[:dimensions]
+
+
+def copy_collection(
+    source: str,
+    target: str,
+    *,
+    dimensions: int,
+    quantization: str,
+    on_disk: bool,
+    hybrid: bool,
+    batch_size: int = 256,
+) -> int:
+    """Create `target` with the requested layout and copy every point of `source` into it."""
+
+    client = get_client()
+    info = client.get_collection(source)
+    source_dim = info.config.params.vectors.size
+    embedding = embedding_spec(info)
+    if dimensions > source_dim:
+        raise SystemExit(
+            f"Cannot grow vectors from {source_dim} to {dimensions} dimensions without re-embedding."
+        )
+    if dimensions != source_dim and embedding.provider != "gemini":
+        raise SystemExit(
+            f"'{source}' was embedded with {embedding.provider}/{embedding.model}, whose vectors can't be truncated; "
+            "re-ingest into a new collection instead."
+        )
+    if client.collection_exists(target):
+        raise SystemExit(f"Target collection '{target}' already exists.")
+
+    client.create_collection(
+        collection_name=target,
+        **collection_schema(
+            dimensions=dimensions,
+            quantization=quantization,
+            on_disk=on_disk,
+            hybrid=hybrid,
+            embedding=replace(embedding, dimensions=dimensions),
+        ),
+    )
+    create_payload_indexes(client, target)
+    logger.info(
+        "Copying '%s' (%s-d) -> '%s' (%s-d, quantization=%s, on_disk=%s, hybrid=%s)",
+        source, source_dim, target, dimensions, quantization, on_disk, hybrid,
+    )
+
+    copied, offset, started = 0, None, time.perf_counter()
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = []
+        for record in records:
+            dense, sparse = split_vectors(record.vector)
+            dense = _truncate(dense, dimensions)
+            if hybrid:
+                if sparse is None:
+                    sparse = document_sparse_vector((record.payload or {}).get("text", ""))
+                vector = {"": dense, SPARSE_VECTOR_NAME: sparse}
+            else:
+                vector = dense
+            points.append(PointStruct(id=record.id, vector=vector, payload=record.payload))
+
+        if points:
+            client.upsert(collection_name=target, points=points, wait=offset is None)
+            copied += len(points)
+            logger.info("Copied %s points (%.0f points/s)", copied, copied / (time.perf_counter() - started))
+        if offset is None:
+            break
+
+    expected = client.count(collection_name=source, exact=True).count
+    actual = client.count(collection_name=target, exact=True).count
+    if actual != expected:
+        raise SystemExit(f"Copy incomplete: '{source}' has {expected} points, '{target}' has {actual}.")
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=qdrant_collection)
+    parser.add_argument("--target", default=None, help="defaults to '<source>_migrated'")
+    parser.add_argument("--dimensions", type=int, choices=SUPPORTED_VECTOR_SIZES, default=QDRANT_VECTOR_SIZE)
+    parser.add_argument("--quantization", choices=QUANTIZATION_MODES, default=qdrant_quantization)
+    parser.add_argument("--on-disk", dest="on_disk", action=argparse.BooleanOptionalAction, default=qdrant_vectors_on_disk)
+    parser.add_argument("--hybrid", action=argparse.BooleanOptionalAction, default=hybrid_search_enabled)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="replace the source collection: copy to a temporary collection, recreate the source from it, drop the temporary one",
+    )
+    args = parser.parse_args()
+
+    layout = dict(dimensions=args.dimensions, quantization=args.quantization, on_disk=args.on_disk, hybrid=args.hybrid)
+
+    if not args.in_place:
+        target = args.target or f"{args.source}_migrated"
+        copied = copy_collection(args.source, target, batch_size=args.batch_size, **layout)
+        print(f"Copied {copied} points into '{target}'. Set QDRANT_COLLECTION={target} (and EMBEDDING_DIMENSIONS / "
+              f"QDRANT_QUANTIZATION to match) to switch over.")
+        return
+
+    client = get_client()
+    staging = f"{args.source}__migrating"
+    copy_collection(args.source, staging, batch_size=args.batch_size, **layout)
+    client.delete_collection(args.source)
+    copied = copy_collection(staging, args.source, batch_size=args.batch_size, **layout)
+    client.delete_collection(staging)
+    print(f"Rebuilt '{args.source}' in place ({copied} points). Make sure EMBEDDING_DIMENSIONS / QDRANT_QUANTIZATION match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# collection snapshot export / import
+
+"""
+Dump a qdrant collection to a snapshot directory (float32 vectors.npy + columnar payload sidecar)
+and load it back into any qdrant, with no PDF extraction, chunking or embedding API calls. Use it to
+rebuild an environment, or to seed test and benchmark collections (benchmarks.bench_service --snapshot).
+
+    cd vera/backend
+    python -m tools.snapshot_collection export --collection vera_docs --output snapshots/vera_docs
+    python -m tools.snapshot_collection import snapshots/vera_docs                     # into vera_docs
+    python -m tools.snapshot_collection import snapshots/vera_docs --collection vera_test --replace
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.config import (  # noqa: E402
+    QUANTIZATION_MODES,
+    hybrid_search_enabled,
+    qdrant_collection,
+    qdrant_quantization,
+    qdrant_vectors_on_disk,
+    snapshot_dir,
+    snapshot_upload_batch_size,
+    snapshot_upload_parallel,
+)
+from services.collection_snapshots import export_collection, import_collection  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write a collection to a snapshot directory")
+    export.add_argument("--collection", default=qdrant_collection)
+    export.add_argument("--output", default=None, help="snapshot directory (default: SNAPSHOT_DIR/<collection>-<time>)")
+    export.add_argument("--batch-size", type=int, default=512, help="points per scroll request")
+
+    restore = commands.add_parser("import", help="load a snapshot directory into a collection")
+    restore.add_argument("snapshot")
+    restore.add_argument("--collection", default=None, help="defaults to the collection the snapshot was taken from")
+    restore.add_argument("--replace", action="store_true", help="drop the collection first if it exists")
+    restore.add_argument("--quantization", choices=QUANTIZATION_MODES, default=qdrant_quantization)
+    restore.add_argument("--on-disk", dest="on_disk", action=argparse.BooleanOptionalAction, default=qdrant_vectors_on_disk)
+    restore.add_argument("--hybrid", action=argparse.BooleanOptionalAction, default=hybrid_search_enabled)
+    restore.add_argument("--batch-size", type=int, default=snapshot_upload_batch_size)
+    restore.add_argument("--parallel", type=int, default=snapshot_upload_parallel, help="upload processes")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            output = args.output or os.path.join(snapshot_dir, f"{args.collection}-{stamp}")
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            manifest = export_collection(args.collection, output, batch_size=args.batch_size)
+            print(f"Exported {manifest['points']} points of '{args.collection}' to {output} "
+                  f"({manifest['bytes'] / 2**20:.1f} MiB, {manifest['seconds']}s)")
+        else:
+            result = import_collection(
+                args.snapshot,
+                args.collection,
+                replace=args.replace,
+                quantization=args.quantization,
+                on_disk=args.on_disk,
+                hybrid=args.hybrid,
+                batch_size=args.batch_size,
+                parallel=args.parallel,
+            )
+            print(json.dumps(result, indent=2))
+    except (LookupError, FileExistsError, ValueError, RuntimeError) as exc:
+        raise SystemExit(str(exc))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# columnar payload encoding
+
+"""
+Packs a list of JSON-like dicts into a few numpy arrays per key, and back; used for the payload
+sidecar of collection snapshots. A column's kind is inferred from the values it holds:
+
+- int:      int64 values
+- category: strings with few distinct values (source, domain): int32 codes into a value list
+- string:   UTF-8 bytes of every value concatenated, plus int64 offsets (Arrow's layout)
+- json:     anything else, JSON-encoded and stored like a string
+
+Nulls and missing keys are recorded in a boolean `valid` mask (category codes use -1 instead);
+both decode to a missing key.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+# a string column with more distinct values than this (or than half its rows) is stored as plain strings
+CATEGORY_MAX_VALUES = 4096
+
+_INT64_RANGE = (-(2**63), 2**63 - 1)
+
+
+def encode_column(values: Sequence[Any], prefix: str) -> tuple[dict[str, np.ndarray], dict]:
+    """Arrays named `<prefix>.<part>` for one column, and the spec needed to decode them."""
+    live = [value for value in values if value is not None]
+    arrays: dict[str, np.ndarray] = {}
+    spec: dict[str, Any] = {"prefix": prefix}
+
+    if all(isinstance(v, int) and not isinstance(v, bool) and _INT64_RANGE[0] <= v <= _INT64_RANGE[1] for v in live):
+        spec["kind"] = "int"
+        arrays[f"{prefix}.values"] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif all(isinstance(v, str) for v in live):
+        distinct = list(dict.fromkeys(live))
+        if len(distinct) <= CATEGORY_MAX_VALUES and 2 * len(distinct) <= len(live):
+            spec["kind"] = "category"
+            spec["values"] = distinct
+            index = {value: code for code, value in enumerate(distinct)}
+            arrays[f"{prefix}.codes"] = np.array([-1 if v is None else index[v] for v in values], dtype=np.int32)
+            return arrays, spec
+        spec["kind"] = "string"
+        arrays.update(_encode_strings(values, prefix))
+    else:
+        spec["kind"] = "json"
+        arrays.update(_encode_strings([None if v is None else json.dumps(v) for v in values], prefix))
+
+    if len(live) < len(values):
+        arrays[f"{prefix}.valid"] = np.array([value is not None for value in values], dtype=bool)
+    return arrays, spec
+
+
+def decode_column(arrays: Any, spec: dict, rows: int) -> list[Any]:
+    """The values of one column (None where it was null or missing); `arrays` maps names to arrays."""
+    prefix, kind = spec["prefix"], spec["kind"]
+    if kind == "category":
+        values = spec["values"]
+        return [None if code < 0 else values[code] for code in arrays[f"{prefix}.codes"].tolist()]
+
+    if kind == "int":
+        decoded: list[Any] = arrays[f"{prefix}.values"].tolist()
+    else:
+        decoded = _decode_strings(arrays, prefix)
+
+    # masked first: null rows of a json column hold "", which isn't JSON
+    valid_name = f"{prefix}.valid"
+    if valid_name in arrays:
+        decoded = [value if valid else None for value, valid in zip(decoded, arrays[valid_name].tolist())]
+    if kind == "json":
+        decoded = [None if value is None else json.loads(value) for value in decoded]
+    if len(decoded) != rows:
+        raise ValueError(f"column '{prefix}' has {len(decoded)} rows, expected {rows}")
+    return decoded
+
+
+def encode_columns(rows: Sequence[dict]) -> tuple[dict[str, np.ndarray], list[dict]]:
+    """One column per key that appears in any row; returns the arrays and the column specs (with names)."""
+    keys = list(dict.fromkeys(key for row in rows for key in row))
+    arrays: dict[str, np.ndarray] = {}
+    columns = []
+    for position, key in enumerate(keys):
+        # array names are positional, so any key (even with dots or slashes) round-trips
+        column_arrays, spec = encode_column([row.get(key) for row in rows], f"c{position}")
+        arrays.update(column_arrays)
+        columns.append({"name": key, **spec})
+    return arrays, columns
+
+
+def decode_columns(arrays: Any, columns: list[dict], rows: int) -> list[dict]:
+    decoded = [(spec["name"], decode_column(arrays, spec, rows)) for spec in columns]
+    return [
+        {name: values[i] for name, values in decoded if values[i] is not None}
+        for i in range(rows)
+    ]
+
+
+def _encode_strings(values: Sequence[Optional[str]], prefix: str) -> dict[str, np.ndarray]:
+    encoded = [b"" if value is None else value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return {
+        f"{prefix}.data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{prefix}.offsets": offsets,
+    }
+
+
+def _decode_strings(arrays: Any, prefix: str) -> list[str]:
+    blob = arrays[f"{prefix}.data"].tobytes()
+    offsets = arrays[f"{prefix}.offsets"].tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
@@ -0,0 +1,220 @@
+# context packer
+
+"""
+Turns retrieved hits into the passages that go into the prompt.
+
+1. MMR picks `top_k` hits that are relevant but not near-duplicates of each other
+   (needs the hits' dense vectors; without them selection is by relevance alone).
+2. Hits from the same source are ordered by their document offsets: the overlap a chunk shares
+   with its predecessor is dropped and adjacent chunks become one passage. Hits without offsets
+   (ingested before chunks carried them) are de-overlapped by matching text instead.
+3. Passages, best first, are packed into a token budget; the last one may be cut at a sentence.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from utils.file_chunker import CHARS_PER_TOKEN
+
+# chunks this close (in characters) are adjacent: only the whitespace the chunker stripped lies between
+ADJACENT_GAP = 2
+# text overlaps shorter than this between offset-less chunks are coincidence, not chunk overlap
+MIN_TEXT_OVERLAP = 20
+# don't bother cutting a passage down to fewer tokens than this to fill the budget
+MIN_PASSAGE_TOKENS = 32
+
+
+@dataclass
+class Passage:
+    text: str
+    source: Optional[str]
+    section: Optional[str]
+    start: Optional[int]
+    end: Optional[int]
+    # position of the best contributing hit in the MMR selection (0 = most relevant)
+    rank: int
+    hits: list = field(default_factory=list)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def pack_context(
+    hits: Sequence[Any],
+    *,
+    top_k: int,
+    token_budget: int,
+    mmr_lambda: float = 1.0,
+) -> list[Passage]:
+    """Select, de-overlap, merge and budget `hits` (ranked, with a `text` payload) into passages."""
+    selected = mmr_select(_dedupe(hits), top_k, mmr_lambda)
+    return _fit_budget(_merge(selected), token_budget)
+
+
+def mmr_select(hits: Sequence[Any], top_k: int, mmr_lambda: float) -> list[Any]:
+    """
+    Maximal marginal relevance: repeatedly take the hit maximising
+    lambda * relevance - (1 - lambda) * max cosine similarity to the hits already taken.
+    Relevance is the hit's score scaled to [0, 1]; hits without a dense vector never count as redundant.
+    """
+    if len(hits) <= top_k or mmr_lambda >= 1.0:
+        return list(hits[:top_k])
+
+    top_score = max((hit.score or 0.0) for hit in hits) or 1.0
+    relevance = np.array([(hit.score or 0.0) / top_score for hit in hits])
+    vectors = [_unit_vector(hit) for hit in hits]
+    redundancy = np.zeros(len(hits))
+    remaining = list(range(len(hits)))
+    chosen: list[int] = []
+
+    while remaining and len(chosen) < top_k:
+        best = max(remaining, key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy[i])
+        chosen.append(best)
+        remaining.remove(best)
+        if vectors[best] is None:
+            continue
+        for i in remaining:
+            # fan-out hits from collections with another embedder / dimension can't be compared
+            if vectors[i] is not None and vectors[i].shape == vectors[best].shape:
+                redundancy[i] = max(redundancy[i], float(vectors[i] @ vectors[best]))
+
+    return [hits[i] for i in chosen]
+
+
+def _unit_vector(hit: Any) -> Optional[np.ndarray]:
+    vector = getattr(hit, "vector", None)
+    if isinstance(vector, dict):
+        # hybrid collections return every named vector; the dense one is unnamed
+        vector = vector.get("")
+    # a list from qdrant, or a numpy array for hits served from a chat session's cache
+    if vector is None or len(vector) == 0:
+        return None
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else None
+
+
+def _dedupe(hits: Sequence[Any]) -> list[Any]:
+    seen, unique = set(), []
+    for hit in hits:
+        text = hit.payload["text"]
+        if text not in seen:
+            seen.add(text)
+            unique.append(hit)
+    return unique
+
+
+def _merge(selected: Sequence[Any]) -> list[Passage]:
+    passages = [
+        Passage(
+            text=hit.payload["text"],
+            source=hit.payload.get("source"),
+            section=hit.payload.get("section"),
+            start=hit.payload.get("start"),
+            end=hit.payload.get("end"),
+            rank=rank,
+            hits=[hit],
+        )
+        for rank, hit in enumerate(selected)
+    ]
+
+    by_source: dict[Optional[str], list[Passage]] = {}
+    for passage in passages:
+        by_source.setdefault(passage.source, []).append(passage)
+
+    merged: list[Passage] = []
+    for group in by_source.values():
+        with_offsets = sorted((p for p in group if p.start is not None and p.end is not None), key=lambda p: p.start)
+        merged.extend(_merge_by_offsets(with_offsets))
+        merged.extend(_merge_by_text([p for p in group if p.start is None or p.end is None]))
+    return sorted(merged, key=lambda p: p.rank)
+
+
+def _merge_by_offsets(passages: list[Passage]) -> list[Passage]:
+    merged: list[Passage] = []
+    for passage in passages:
+        previous = merged[-1] if merged else None
+        if previous is None or passage.start > previous.end + ADJACENT_GAP:
+            merged.append(passage)
+            continue
+        overlap = max(0, previous.end - passage.start)
+        if passage.end > previous.end:
+            confirmed = previous.text.endswith(passage.text[:overlap])
+        else:
+            confirmed = passage.text in previous.text
+        if not confirmed:
+            # offsets that disagree with the text (a point indexed before an edit): keep it whole
+            merged.append(passage)
+            continue
+        if passage.end > previous.end:
+            # chunk text is an exact slice of the document: its first (previous.end - start) chars are overlap
+            tail = passage.text[overlap:]
+            separator = " " if passage.start > previous.end else ""
+            previous.text = previous.text + separator + tail
+            previous.end = passage.end
+        previous.section = previous.section or passage.section
+        previous.rank = min(previous.rank, passage.rank)
+        previous.hits.extend(passage.hits)
+    return merged
+
+
+def _merge_by_text(passages: list[Passage]) -> list[Passage]:
+    merged: list[Passage] = []
+    for passage in passages:
+        for other in merged:
+            if passage.text in other.text:
+                joined = other.text
+            elif other.text in passage.text:
+                joined = passage.text
+            elif (size := _text_overlap(other.text, passage.text)) >= MIN_TEXT_OVERLAP:
+                joined = other.text + passage.text[size:]
+            elif (size := _text_overlap(passage.text, other.text)) >= MIN_TEXT_OVERLAP:
+                joined = passage.text + other.text[size:]
+            else:
+                continue
+            other.text = joined
+            other.rank = min(other.rank, passage.rank)
+            other.hits.extend(passage.hits)
+            break
+        else:
+            merged.append(passage)
+    return merged
+
+
+def _text_overlap(first: str, second: str) -> int:
+    """Length of the longest suffix of `first` that is a prefix of `second` (bounded by half a chunk)."""
+    for size in range(min(len(first), len(second)) // 2, MIN_TEXT_OVERLAP - 1, -1):
+        if first.endswith(second[:size]):
+            return size
+    return 0
+
+
+def _fit_budget(passages: list[Passage], token_budget: int) -> list[Passage]:
+    packed: list[Passage] = []
+    remaining = token_budget
+    for passage in passages:
+        tokens = estimate_tokens(passage.text)
+        if tokens <= remaining:
+            packed.append(passage)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_PASSAGE_TOKENS:
+            passage.text = _truncate(passage.text, remaining * CHARS_PER_TOKEN)
+            packed.append(passage)
+        break
+    return packed
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut at the last sentence end that fits, else the last word boundary."""
+    window = text[:max_chars]
+    sentence = max(window.rfind(". "), window.rfind(".\n"))
+    if sentence >= max_chars // 2:
+        return window[: sentence + 1]
+    space = window.rfind(" ")
+    return window[:space] if space > 0 else window
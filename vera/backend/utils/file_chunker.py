@@ -1,13 +1,14 @@
 # file chunker
-def chunk_file(text: str, chunk_size: int = 1000, chunk_overlap: int = 150):
-    """Split text into overlapping chunks for embeddings.
-        Works at the sentence level and preserves context continuity.
 
-        Returns: a list of text chunks
-        Raises: ValueError if text is empty or chunking fails
-    """
+"""
+Structure-aware chunking for statutes.
+
+Text is consumed line by line as a stream and cut into units (sentence pieces that keep their
+trailing whitespace), so every chunk is an exact slice of the document and carries its offsets.
+Part / Chapter / Section / Article headings start a new chunk and label it; inside a section,
+chunks fill up to the size budget and prefer to end on a sentence boundary. Overlap is carried
+in whole words. Every character is handled a bounded number of times, so chunking is linear.
 
-    """
     | Parameter       | Recommended Value                           |
     | --------------- | ------------------------------------------- |
     | Chunk length    | **~800–1,000 characters (~150–250 tokens)** |
@@ -15,34 +16,332 @@ def chunk_file(text: str, chunk_size: int = 1000, chunk_overlap: int = 150):
     | Embedding model | `gemini-embedding-001`                      |
     | Batch size      | 50 chunks per call                          |
     | Retrieval top-K | 3–5 most similar chunks                     |
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, TypeVar
+
+from core.config import (
+    chunk_overlap as default_chunk_overlap,
+    chunk_size as default_chunk_size,
+    chunk_size_unit as default_chunk_size_unit,
+)
+
+T = TypeVar("T")
+
+SIZE_UNITS = ("chars", "tokens")
+# rough Gemini tokenizer ratio for English legal prose
+CHARS_PER_TOKEN = 4
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    # offsets of `text` in the document, i.e. "\n".join(pieces); end is exclusive
+    start: int
+    end: int
+    # e.g. "Chapter XVII > Section 420"; None before the first heading
+    section: Optional[str] = None
+
+
+# ---- headings ---------------------------------------------------------------------------------
+
+_NUMERAL = r"([IVXLCDM]+[A-Z]?|\d+[A-Z]{0,3})"
+_PART_RE = re.compile(rf"^(?:PART|Part)\s+{_NUMERAL}\b")
+_CHAPTER_RE = re.compile(rf"^(?:CHAPTER|Chapter)\s+{_NUMERAL}\b")
+_SECTION_RE = re.compile(r"^(?:SECTION|Section|Sec\.)\s+(\d+[A-Z]{0,3})\b")
+_ARTICLE_RE = re.compile(r"^(?:ARTICLE|Article|Art\.)\s+(\d+[A-Z]{0,3})\b")
+# body headings of Indian acts: "420. Cheating and dishonestly inducing ...—Whoever cheats ..."
+# (optionally behind an amendment marker such as "2[153AA."); contents pages have no dash
+_NUMBERED_RE = re.compile(r"^(?:\d+\[)?(\d{1,4}[A-Z]{0,3})\.\s*(?=\D)[^—–]{1,200}?[—–]")
+# explicit headings are short lines; longer ones are prose that happens to start with "Part ..."
+_MAX_HEADING_CHARS = 80
+
+
+class _Outline:
+    """Tracks the Part > Chapter > Section position of the stream."""
 
+    def __init__(self) -> None:
+        self.part: Optional[str] = None
+        self.chapter: Optional[str] = None
+        self.section: Optional[str] = None
+        # what bare numbered headings are called: the IPC lists "SECTIONS", the Constitution "ARTICLES"
+        self.numbered_kind = "Section"
+
+    @property
+    def label(self) -> Optional[str]:
+        return " > ".join(level for level in (self.part, self.chapter, self.section) if level) or None
+
+    def heading(self, line: str) -> Optional[tuple[str, str, int]]:
+        """(level, label, length) if the stripped line opens a new structural unit.
+            length is how much of the line is heading; a numbered heading ends at its dash
+            and the section text after it is body.
+        """
+        if line in ("ARTICLES", "Articles"):
+            self.numbered_kind = "Article"
+            return None
+        if line in ("SECTIONS", "Sections"):
+            self.numbered_kind = "Section"
+            return None
+
+        if len(line) <= _MAX_HEADING_CHARS:
+            for pattern, level, name in (
+                (_PART_RE, "part", "Part"),
+                (_CHAPTER_RE, "chapter", "Chapter"),
+                (_SECTION_RE, "section", "Section"),
+                (_ARTICLE_RE, "section", "Article"),
+            ):
+                match = pattern.match(line)
+                if match:
+                    return level, f"{name} {match.group(1)}", len(line)
+
+        match = _NUMBERED_RE.match(line)
+        if match:
+            return "section", f"{self.numbered_kind} {match.group(1)}", match.end()
+        return None
+
+    def enter(self, level: str, label: str) -> None:
+        if level == "part":
+            self.part, self.chapter, self.section = label, None, None
+        elif level == "chapter":
+            self.chapter, self.section = label, None
+        else:
+            self.section = label
+            if label.startswith("Article"):
+                self.numbered_kind = "Article"
+            elif label.startswith("Section"):
+                self.numbered_kind = "Section"
+
+
+# ---- sentence units ---------------------------------------------------------------------------
+
+_SENTENCE_END_RE = re.compile(r"[.?!;][\"'”’)\]]*\s+")
+_ABBREVIATIONS = frozenset(
     """
+    sec secs s ss sub-s sub-ss art arts cl cls no nos ch para paras i.e e.g viz etc ibid cf vs v
+    rs mr mrs ms dr govt ltd co ord reg regs
+    """.split()
+)
+# longer "words" before a period are never abbreviations
+_MAX_WORD_CHARS = 16
 
-    if not text or not text.strip():
-        raise ValueError("No text available to chunk. Empty file ?")
-    
-    try:
-        sentences = text.split(".")
-        if not sentences or len(sentences) == 0:
-            raise ValueError("Failed to split text into sentences.")
-        chunks, current_chunk = [], ""
-
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) < chunk_size:
-                current_chunk += sentence + "."
+
+@dataclass
+class _Unit:
+    text: str
+    start: int
+    ends_sentence: bool = False
+    heading: bool = False
+
+
+def _sentence_units(line: str, start: int) -> Iterator[_Unit]:
+    """Split one line (including its trailing newline) into contiguous units at sentence ends."""
+    cursor = 0
+    for match in _SENTENCE_END_RE.finditer(line):
+        if line[match.start()] == "." and not _is_sentence_period(line, match.start(), match.end()):
+            continue
+        yield _Unit(line[cursor : match.end()], start + cursor, ends_sentence=True)
+        cursor = match.end()
+    if cursor < len(line):
+        yield _Unit(line[cursor:], start + cursor)
+
+
+def _is_sentence_period(line: str, dot: int, after: int) -> bool:
+    # "Sec. 420", "i.e. the", "No. 5" are not sentence ends
+    if after < len(line) and line[after].islower():
+        return False
+    # walk back over the word only (bounded), so long lines without spaces stay linear
+    word_start, floor = dot, max(0, dot - _MAX_WORD_CHARS)
+    while word_start > floor and not line[word_start - 1].isspace() and line[word_start - 1] != "(":
+        word_start -= 1
+    word = line[word_start:dot].lower()
+    return bool(word) and word not in _ABBREVIATIONS
+
+
+def _split_long(unit: _Unit, budget: int) -> Iterator[_Unit]:
+    """Cut a unit longer than the budget at word boundaries."""
+    text, offset = unit.text, 0
+    while len(text) - offset > budget:
+        cut = text.rfind(" ", offset, offset + budget)
+        cut = cut + 1 if cut > offset else offset + budget
+        yield _Unit(text[offset:cut], unit.start + offset, heading=unit.heading)
+        offset = cut
+    yield _Unit(text[offset:], unit.start + offset, ends_sentence=unit.ends_sentence, heading=unit.heading)
+
+
+# ---- packing ----------------------------------------------------------------------------------
+
+
+class _ChunkBuilder:
+    def __init__(self, budget: int, overlap: int):
+        self.budget = budget
+        self.overlap = overlap
+        self.units: list[_Unit] = []
+        self.size = 0
+        # leading units carried over from the previous chunk
+        self.carried = 0
+        self.has_body = False
+
+    def add(self, unit: _Unit, section: Optional[str]) -> Iterator[Chunk]:
+        for piece in _split_long(unit, self.budget) if len(unit.text) > self.budget else (unit,):
+            while self.size + len(piece.text) > self.budget and self.has_body:
+                if self.carried == len(self.units):
+                    # only overlap left and it does not leave room: drop it rather than repeat it
+                    self._reset()
+                    break
+                yield from self._emit(section)
+            self.units.append(piece)
+            self.size += len(piece.text)
+            if not piece.heading and piece.text.strip():
+                self.has_body = True
+
+    def after_heading(self) -> bool:
+        return bool(self.units) and self.units[-1].heading
+
+    def boundary(self, section: Optional[str]) -> Iterator[Chunk]:
+        """Close the current chunk at a heading. Pending headings without body text are kept."""
+        if self.has_body:
+            chunk = self._chunk(self.units, section)
+            if chunk:
+                yield chunk
+            self._reset()
+
+    def _emit(self, section: Optional[str]) -> Iterator[Chunk]:
+        # prefer the last sentence end, unless it would leave the chunk less than half full
+        cut, length, best = len(self.units), 0, None
+        for index, unit in enumerate(self.units):
+            length += len(unit.text)
+            if unit.ends_sentence and index >= self.carried and length >= self.budget // 2:
+                best = index + 1
+        if best is not None:
+            cut = best
+
+        emitted, remaining = self.units[:cut], self.units[cut:]
+        chunk = self._chunk(emitted, section)
+        if chunk:
+            yield chunk
+
+        carry = self._overlap_units(emitted)
+        self.units = carry + remaining
+        self.size = sum(len(unit.text) for unit in self.units)
+        self.carried = len(carry)
+        self.has_body = any(not unit.heading and unit.text.strip() for unit in self.units)
+
+    def _overlap_units(self, emitted: list[_Unit]) -> list[_Unit]:
+        """Trailing whole words of the emitted chunk, at most `overlap` characters."""
+        carry: list[_Unit] = []
+        room = self.overlap
+        for unit in reversed(emitted):
+            if len(unit.text) <= room:
+                carry.append(unit)
+                room -= len(unit.text)
+                continue
+            space = unit.text.find(" ", len(unit.text) - room)
+            if space != -1 and space + 1 < len(unit.text):
+                carry.append(_Unit(unit.text[space + 1 :], unit.start + space + 1, ends_sentence=unit.ends_sentence))
+            break
+        carry.reverse()
+        return carry
+
+    def _reset(self) -> None:
+        self.units, self.size, self.carried, self.has_body = [], 0, 0, False
+
+    @staticmethod
+    def _chunk(units: list[_Unit], section: Optional[str]) -> Optional[Chunk]:
+        if not units:
+            return None
+        raw = "".join(unit.text for unit in units)
+        text = raw.strip()
+        if not text:
+            return None
+        start = units[0].start + (len(raw) - len(raw.lstrip()))
+        return Chunk(text=text, start=start, end=start + len(text), section=section)
+
+
+def _budget(size: int, unit: str) -> int:
+    if unit not in SIZE_UNITS:
+        raise ValueError(f"Unknown chunk size unit '{unit}'. Expected one of {SIZE_UNITS}.")
+    return size * CHARS_PER_TOKEN if unit == "tokens" else size
+
+
+def iter_chunks(
+    pieces: Iterable[str],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    unit: Optional[str] = None,
+) -> Iterator[Chunk]:
+    """Stream chunks from text pieces (e.g. PDF pages), which are treated as joined by newlines.
+        chunk_size / chunk_overlap are in `unit`s: "chars" or approximate "tokens"
+        (defaults: CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_SIZE_UNIT).
+    """
+
+    unit = unit or default_chunk_size_unit
+    budget = max(1, _budget(chunk_size or default_chunk_size, unit))
+    overlap = _budget(default_chunk_overlap if chunk_overlap is None else chunk_overlap, unit)
+    builder = _ChunkBuilder(budget, min(overlap, budget // 2))
+    outline = _Outline()
+
+    offset = 0
+    for piece in pieces:
+        for line in piece.split("\n"):
+            line += "\n"
+            stripped = line.strip()
+            heading = outline.heading(stripped)
+            if heading is not None:
+                level, label, length = heading
+                yield from builder.boundary(outline.label)
+                outline.enter(level, label)
+                # "420. Cheating.—Whoever cheats ...": the text after the dash is the section's body
+                cut = len(line) - len(line.lstrip()) + length
+                if not line[cut:].strip():
+                    cut = len(line)
+                yield from builder.add(_Unit(line[:cut], offset, heading=True), outline.label)
+                for sentence in _sentence_units(line[cut:], offset + cut):
+                    yield from builder.add(sentence, outline.label)
+            elif builder.after_heading() and stripped.isupper():
+                # title line under a heading ("CHAPTER X" / "OF CONTEMPTS OF ...")
+                yield from builder.add(_Unit(line, offset, heading=True), outline.label)
             else:
-                chunks.append(current_chunk.strip())
-                # carry overlap for context continuity
-                current_chunk = current_chunk[-chunk_overlap:] + sentence + "."
+                for sentence in _sentence_units(line, offset):
+                    yield from builder.add(sentence, outline.label)
+            offset += len(line)
+
+    yield from builder.boundary(outline.label)
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
 
-        if not chunks:
-            raise ValueError("failed to create any chunks from text.")
+def chunk_file(
+    text: str,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    unit: Optional[str] = None,
+) -> list[Chunk]:
+    """Split a whole document into chunks (see iter_chunks).
+
+        Returns: a list of Chunk
+        Raises: ValueError if text is empty or no chunks come out
+    """
+
+    if not text or not text.strip():
+        raise ValueError("No text available to chunk. Empty file ?")
 
-        return chunks
+    chunks = list(iter_chunks([text], chunk_size, chunk_overlap, unit))
+    if not chunks:
+        raise ValueError("failed to create any chunks from text.")
+    return chunks
 
-    except Exception as e:
-        raise ValueError(f"Error during chunking: {str(e)}")
 
+def iter_batches(chunks: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+    """Group a chunk stream into lists of at most batch_size, skipping empty chunks."""
+    batch: list[T] = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
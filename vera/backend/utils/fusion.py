@@ -0,0 +1,38 @@
+# rank fusion
+
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[Sequence[Any]],
+    weights: Sequence[float],
+    *,
+    k: int = 60,
+    limit: int | None = None,
+) -> list[Any]:
+    """
+    Weighted reciprocal-rank fusion of several ranked hit lists (anything with an `.id`).
+    score(d) = sum_i weight_i / (k + rank_i(d)), rank starting at 1.
+    The first occurrence of each id is kept, with its `score` replaced by the fused score.
+    """
+
+    fused: dict[Any, float] = {}
+    first_hit: dict[Any, Any] = {}
+    for hits, weight in zip(ranked_lists, weights):
+        for rank, hit in enumerate(hits, start=1):
+            fused[hit.id] = fused.get(hit.id, 0.0) + weight / (k + rank)
+            first_hit.setdefault(hit.id, hit)
+
+    ordered = sorted(fused, key=fused.get, reverse=True)
+    if limit is not None:
+        ordered = ordered[:limit]
+
+    results = []
+    for point_id in ordered:
+        hit = first_hit[point_id]
+        if hasattr(hit, "model_copy"):
+            hit = hit.model_copy(update={"score": fused[point_id]})
+        results.append(hit)
+    return results
@@ -0,0 +1,35 @@
+# keyed asyncio locks
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLock:
+    """
+    One asyncio lock per key, created on first use and dropped once nobody holds or waits for it,
+    so keys taken from requests (collection names, sources) don't accumulate.
+    """
+
+    def __init__(self) -> None:
+        # key -> [lock, holders + waiters]
+        self._locks: dict[Hashable, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
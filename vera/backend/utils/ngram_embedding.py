@@ -0,0 +1,82 @@
+# hashed character n-gram embeddings
+
+"""
+Dense vectors computed on the CPU, without a model file or a network call.
+
+Text is lower-cased and reduced to words separated by single spaces. Every character 3-, 4- and
+5-gram is hashed (a polynomial over its bytes, finished with the splitmix64 mixer) to a bucket of the
+output vector and a sign; bucket counts are damped with log1p and the vector is L2-normalised.
+Similar wording gives similar vectors, so cosine search behaves like fuzzy lexical matching: good for
+statute-style corpora where the question reuses the document's terms, weaker on paraphrase.
+
+A whole batch is encoded at once: the texts are concatenated into one byte array, n-grams are taken
+as strided windows over it (dropping those that straddle two texts) and counted with one bincount.
+The hashing scheme is part of the model: changing it requires a new NGRAM_MODEL name.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NGRAM_MODEL = "hashed-char-ngrams-v1"
+NGRAM_SIZES = (3, 4, 5)
+
+_NON_WORD = re.compile(r"[\W_]+")
+_BASE = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _normalize(text: str) -> bytes:
+    # the padding spaces let word starts and ends form n-grams of their own
+    return f" {_NON_WORD.sub(' ', text.lower()).strip()} ".encode("utf-8")
+
+
+def _hash_windows(windows: np.ndarray, size: int) -> np.ndarray:
+    """64-bit hash per row of `windows` (uint64 arithmetic wraps, which is what we want)."""
+    h = np.full(len(windows), np.uint64(size), dtype=np.uint64)
+    for column in range(size):
+        h = h * _BASE + windows[:, column]
+    h ^= h >> np.uint64(30)
+    h *= _MIX_1
+    h ^= h >> np.uint64(27)
+    h *= _MIX_2
+    h ^= h >> np.uint64(31)
+    return h
+
+
+def encode(texts: Sequence[str], dimensions: int) -> np.ndarray:
+    """(len(texts), dimensions) float32 matrix of unit vectors, one row per text."""
+    docs = [_normalize(text) for text in texts]
+    lengths = np.fromiter((len(doc) for doc in docs), dtype=np.int64, count=len(docs))
+    data = np.frombuffer(b"".join(docs), dtype=np.uint8).astype(np.uint64)
+    owner = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+
+    slots, signs = [], []
+    for size in NGRAM_SIZES:
+        if len(data) < size:
+            continue
+        starts = np.arange(len(data) - size + 1)
+        inside = owner[starts] == owner[starts + size - 1]
+        h = _hash_windows(sliding_window_view(data, size)[inside], size)
+        rows = owner[starts[inside]]
+        slots.append(rows * dimensions + (h % np.uint64(dimensions)).astype(np.int64))
+        signs.append(np.where(h >> np.uint64(63), 1.0, -1.0))
+
+    if slots:
+        counts = np.bincount(
+            np.concatenate(slots), weights=np.concatenate(signs), minlength=len(docs) * dimensions
+        ).reshape(len(docs), dimensions)
+    else:
+        counts = np.zeros((len(docs), dimensions))
+
+    vectors = (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    # text without a single n-gram still needs a valid (non-zero) vector for cosine distance
+    empty = norms == 0
+    vectors[empty, 0], norms[empty] = 1.0, 1.0
+    return vectors / norms[:, None]
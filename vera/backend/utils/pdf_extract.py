@@ -0,0 +1,185 @@
+# multi-process pdf text extraction
+
+"""
+pdfplumber's layout analysis is CPU-bound, so large PDFs are split into page ranges and
+extracted in a process pool. Results are always reassembled in page order.
+The unstructured partition() fallback (for scanned PDFs) is split the same way.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Iterator, Optional
+
+import pdfplumber
+
+from core.config import pdf_extract_pages_per_task, pdf_extract_workers
+from core.logger import get_logger
+
+logger = get_logger("vera.pdf_extract")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def extract_workers() -> int:
+    return pdf_extract_workers if pdf_extract_workers > 0 else (os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Shared pool so worker start-up is paid once per process, not per document."""
+    global _pool
+    if _pool is not None and _pool._max_workers != workers:
+        shutdown_pool()
+    if _pool is None:
+        # spawn, not fork: the server process has live threads and event loops
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def count_pdf_pages(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _page_ranges(total: int, per_task: int) -> list[tuple[int, int]]:
+    return [(start, min(start + per_task, total)) for start in range(0, total, per_task)]
+
+
+def _ordered(
+    executor: Executor,
+    fn: Callable[..., list[str]],
+    jobs: list[tuple],
+    window: int,
+) -> Iterator[str]:
+    """Run jobs in the pool with at most `window` outstanding, yielding results in job order."""
+    pending: deque = deque()
+    jobs_iter = iter(jobs)
+    for job in jobs_iter:
+        pending.append(executor.submit(fn, *job))
+        if len(pending) >= window:
+            break
+    try:
+        while pending:
+            texts = pending.popleft().result()
+            next_job = next(jobs_iter, None)
+            if next_job is not None:
+                pending.append(executor.submit(fn, *next_job))
+            yield from texts
+    finally:
+        # consumer stopped early (error / cancelled ingest): drop the look-ahead
+        for future in pending:
+            future.cancel()
+
+
+# ------------- pdfplumber -------------
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[str]:
+    """Worker: text of pages [start, stop), empty pages dropped."""
+    texts = []
+    with pdfplumber.open(path, pages=list(range(start + 1, stop + 1))) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text() or ""
+            page.close()
+            if page_text:
+                texts.append(page_text)
+    return texts
+
+
+def _iter_pages(path: str) -> Iterator[str]:
+    """In-process: text of one page at a time, each page closed before the next is read."""
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text() or ""
+            page.close()
+            if page_text:
+                yield page_text
+
+
+def iter_pdf_pages(path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield page texts in order. Small documents (or workers=1) are read lazily in-process, page
+    by page; larger ones are fanned out across the pool with a bounded look-ahead window, so
+    pages stream out as soon as the leading range is done.
+    """
+    workers = workers or extract_workers()
+    per_task = max(1, pdf_extract_pages_per_task)
+
+    if workers > 1:
+        total = count_pdf_pages(path)
+        if total > per_task:
+            ranges = [(path, start, stop) for start, stop in _page_ranges(total, per_task)]
+            logger.info("Extracting %s pages from %s in %s ranges across %s workers", total, path, len(ranges), workers)
+            yield from _ordered(_get_pool(workers), _extract_page_range, ranges, window=workers * 2)
+            return
+
+    yield from _iter_pages(path)
+
+
+def extract_pdf_text(path: str, workers: Optional[int] = None) -> str:
+    return "\n".join(iter_pdf_pages(path, workers))
+
+
+# ------------- unstructured fallback -------------
+
+def _partition_file(path: str) -> list[str]:
+    """Worker: element texts from unstructured's partition()."""
+    from unstructured.partition.auto import partition
+
+    return [element.text for element in partition(filename=path) if getattr(element, "text", None)]
+
+
+def iter_partitioned_pdf(path: str, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Parallel unstructured partition() for PDFs pdfplumber could not read (e.g. scans).
+    The PDF is split into page-range files with pypdf (in requirements.txt); if it is missing
+    we partition serially and say so.
+    """
+    workers = workers or extract_workers()
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        PdfReader = None
+        if workers > 1:
+            logger.warning("pypdf is not installed; partitioning %s serially instead of in %s workers", path, workers)
+
+    if PdfReader is None or workers <= 1:
+        yield from _partition_file(path)
+        return
+
+    reader = PdfReader(path)
+    ranges = _page_ranges(len(reader.pages), max(1, pdf_extract_pages_per_task))
+    if len(ranges) <= 1:
+        yield from _partition_file(path)
+        return
+
+    split_dir = tempfile.mkdtemp(prefix="vera_split_")
+    try:
+        parts = []
+        for index, (start, stop) in enumerate(ranges):
+            writer = PdfWriter()
+            for page_number in range(start, stop):
+                writer.add_page(reader.pages[page_number])
+            part_path = os.path.join(split_dir, f"part_{index:05d}.pdf")
+            with open(part_path, "wb") as fh:
+                writer.write(fh)
+            parts.append((part_path,))
+
+        logger.info("Partitioning %s in %s page ranges across %s workers", path, len(parts), workers)
+        yield from _ordered(_get_pool(workers), _partition_file, parts, window=workers * 2)
+    finally:
+        shutil.rmtree(split_dir, ignore_errors=True)
@@ -0,0 +1,57 @@
+# sparse (BM25) vectors for lexical retrieval
+
+"""
+Legal queries hinge on exact tokens ("Section 66A", "Article 21", "302") that dense embeddings
+blur together. Each chunk also gets a sparse vector of BM25 term-frequency weights; qdrant applies
+the IDF part server-side (Modifier.IDF), so the sparse leg of a search scores like BM25.
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.http.models import SparseVector
+
+# BM25 parameters. Chunk lengths are bounded by the chunker, so a fixed average length is close enough.
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_AVG_DOC_TOKENS = 160
+
+# keeps section/article numbers such as "66a", "124a", "21" intact
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    """
+    a an and are as at be been by for from has have in is it its of on or that the this to was were
+    which with shall may any such not no but if than then there these those so under upon
+    what who whom how when where why does do did can could would should will
+    """.split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def _term_index(token: str) -> int:
+    # stable across processes and restarts (unlike hash()); collisions are rare and harmless
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def document_sparse_vector(text: str) -> SparseVector:
+    """BM25 term weights for a chunk (the document side)."""
+    tokens = tokenize(text)
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / BM25_AVG_DOC_TOKENS)
+    weights: dict[int, float] = {}
+    for token, tf in Counter(tokens).items():
+        index = _term_index(token)
+        weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + length_norm)
+    return SparseVector(indices=list(weights), values=list(weights.values()))
+
+
+def query_sparse_vector(text: str) -> SparseVector:
+    """Each distinct query term counts once; qdrant's IDF modifier does the weighting."""
+    indices = sorted({_term_index(token) for token in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))